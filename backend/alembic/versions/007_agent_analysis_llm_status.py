@@ -0,0 +1,34 @@
+"""Add analysis_key and llm_insights_status to agent_analyses
+
+Revision ID: 007_agent_analysis_llm_status
+Revises: 006_audit_logs
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '007_agent_analysis_llm_status'
+down_revision = '006_audit_logs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # agent_analyses is created by init_db(), so it may already carry the new columns
+    inspector = sa.inspect(op.get_bind())
+    if 'agent_analyses' not in inspector.get_table_names():
+        return
+    columns = {c['name'] for c in inspector.get_columns('agent_analyses')}
+    
+    if 'analysis_key' not in columns:
+        op.add_column('agent_analyses', sa.Column('analysis_key', sa.String(length=36), nullable=True))
+        op.create_index(op.f('ix_agent_analyses_analysis_key'), 'agent_analyses', ['analysis_key'], unique=True)
+    if 'llm_insights_status' not in columns:
+        op.add_column('agent_analyses', sa.Column('llm_insights_status', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_agent_analyses_analysis_key'), table_name='agent_analyses')
+    op.drop_column('agent_analyses', 'llm_insights_status')
+    op.drop_column('agent_analyses', 'analysis_key')
@@ -0,0 +1,22 @@
+"""Add risk_tolerance to users
+
+Revision ID: 008_user_risk_tolerance
+Revises: 007_agent_analysis_llm_status
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '008_user_risk_tolerance'
+down_revision = '007_agent_analysis_llm_status'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('risk_tolerance', sa.String(length=10), server_default='medium', nullable=True))
+
+
+def downgrade():
+    op.drop_column('users', 'risk_tolerance')
@@ -0,0 +1,40 @@
+"""Add decision_records table
+
+Revision ID: 009_decision_records
+Revises: 008_user_risk_tolerance
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '009_decision_records'
+down_revision = '008_user_risk_tolerance'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('decision_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('crop', sa.String(length=50), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('confidence', sa.Float(), nullable=False),
+        sa.Column('risk_level', sa.String(length=10), nullable=False),
+        sa.Column('current_price', sa.Float(), nullable=True),
+        sa.Column('expected_price', sa.Float(), nullable=True),
+        sa.Column('bullish_score', sa.Float(), nullable=True),
+        sa.Column('bearish_score', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_decision_records_crop'), 'decision_records', ['crop'], unique=False)
+    op.create_index(op.f('ix_decision_records_created_at'), 'decision_records', ['created_at'], unique=False)
+    op.create_index(op.f('ix_decision_records_id'), 'decision_records', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_decision_records_id'), table_name='decision_records')
+    op.drop_index(op.f('ix_decision_records_created_at'), table_name='decision_records')
+    op.drop_index(op.f('ix_decision_records_crop'), table_name='decision_records')
+    op.drop_table('decision_records')
@@ -0,0 +1,31 @@
+"""Add input_fingerprint to agent_analyses
+
+Revision ID: 010_agent_analysis_fingerprint
+Revises: 009_decision_records
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '010_agent_analysis_fingerprint'
+down_revision = '009_decision_records'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # agent_analyses is created by init_db(), so it may already carry the new column
+    inspector = sa.inspect(op.get_bind())
+    if 'agent_analyses' not in inspector.get_table_names():
+        return
+    columns = {c['name'] for c in inspector.get_columns('agent_analyses')}
+    
+    if 'input_fingerprint' not in columns:
+        op.add_column('agent_analyses', sa.Column('input_fingerprint', sa.String(length=64), nullable=True))
+        op.create_index(op.f('ix_agent_analyses_input_fingerprint'), 'agent_analyses', ['input_fingerprint'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_agent_analyses_input_fingerprint'), table_name='agent_analyses')
+    op.drop_column('agent_analyses', 'input_fingerprint')
@@ -0,0 +1,267 @@
+import fcntl
+import glob
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.logging_config import logger
+
+
+def _process_tag() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class BatchWriter:
+    """
+    Background writer that groups items and hands them to ``flush_fn`` in batches.
+
+    ``submit`` never blocks the caller: items wait in a bounded queue and a daemon
+    thread flushes whenever ``max_batch`` items are waiting or ``flush_interval``
+    seconds have passed. A batch that fails is kept and retried, ahead of newer
+    items, on every later flush until it is written. Kept items count against
+    ``max_queue``; once queued and kept items fill it, new items are dropped and
+    counted, so a slow or unavailable database degrades history rather than
+    request latency or memory.
+
+    With ``spool_path`` every accepted item is also appended (as a JSON line) to a
+    local journal before ``submit`` returns. Each process journals to its own file
+    next to ``spool_path`` (``x.spool`` becomes ``x.<host>-<pid>.spool``) and holds an
+    exclusive lock on it while open, so several workers can share one directory.
+    The journal is truncated whenever everything this process submitted has been
+    written, so after a crash it holds what may not have reached ``flush_fn``;
+    ``recover()`` resubmits the journals of every process that no longer holds its
+    lock. ``flush_fn`` must therefore tolerate seeing an item twice. Lines reach
+    the OS on every submit but are not fsynced, so they survive a process crash
+    rather than a power loss.
+
+    Usage:
+        writer = BatchWriter("decisions", lambda rows: save(rows))
+        writer.submit({"crop": "onion", ...})
+        writer.stop()  # Drains what is queued
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush_fn: Callable[[List[Any]], None],
+        max_batch: int = 500,
+        flush_interval: float = 5.0,
+        max_queue: int = 10000,
+        spool_path: Optional[str] = None
+    ):
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._flush_fn = flush_fn
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self.spool_path = spool_path
+        self._spool_lock = threading.Lock()
+        self._spool_file = None
+        self._spool_file_path: Optional[str] = None
+        self._unwritten = 0  # Spooled items not yet written
+        self._retry: List[List[Any]] = []  # Failed batches, oldest first
+        self._retry_items = 0
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_at: Optional[float] = None
+
+    def submit(self, item: Any) -> bool:
+        self._ensure_started()
+        try:
+            if self._retry_items and self._queue.qsize() + self._retry_items >= self._queue.maxsize:
+                raise queue.Full
+            if self.spool_path is None:
+                self._queue.put_nowait(item)
+            else:
+                with self._spool_lock:
+                    self._queue.put_nowait(item)
+                    self._spool(item)
+                    self._unwritten += 1
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"BatchWriter[{self.name}] queue full - dropped {self.dropped} items so far")
+            return False
+
+        if self._queue.qsize() >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def recover(self) -> int:
+        """Resubmit items that exited processes left in their spools."""
+        if self.spool_path is None:
+            return 0
+
+        root, ext = os.path.splitext(self.spool_path)
+        # The bare spool_path is the single shared journal older versions wrote
+        paths = [self.spool_path] + sorted(glob.glob(f"{glob.escape(root)}.*{ext}"))
+
+        lines = []
+        for path in paths:
+            lines.extend(self._claim_spool(path))
+
+        items = []
+        for line in lines:
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                pass  # Torn last line from a crash mid-write
+
+        recovered = sum(self.submit(item) for item in items)
+        if recovered:
+            logger.info(f"BatchWriter[{self.name}] recovered {recovered} spooled items")
+        return recovered
+
+    def flush(self) -> int:
+        """Write everything queued so far, retrying failed batches first; returns how many items were written."""
+        written = 0
+        with self._flush_lock:
+            retry, self._retry, self._retry_items = self._retry, [], 0
+            for batch in retry:
+                if self._write(batch):
+                    written += len(batch)
+
+            while True:
+                batch = self._drain(self.max_batch)
+                if not batch:
+                    return written
+                if self._write(batch):
+                    written += len(batch)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+        with self._spool_lock:
+            self._close_spool()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retrying": self._retry_items,
+            "batches": self.batches,
+            "spooled": self._unwritten if self.spool_path else None,
+            "spool_file": self._spool_file_path,
+            "last_flush_age_seconds": round(time.monotonic() - self.last_flush_at, 1) if self.last_flush_at else None,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"batch-writer-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Woken early by submit() once a full batch is waiting
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _drain(self, limit: int) -> List[Any]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Any]) -> bool:
+        ok = False
+        try:
+            self._flush_fn(batch)
+            self.written += len(batch)
+            self.batches += 1
+            ok = True
+        except Exception as e:
+            self.failed += len(batch)
+            self._retry.append(batch)
+            self._retry_items += len(batch)
+            logger.error(f"BatchWriter[{self.name}] failed to write {len(batch)} items, will retry: {e}")
+        finally:
+            self.last_flush_at = time.monotonic()
+
+        if ok and self.spool_path is not None:
+            self._settle_spool(len(batch))
+        return ok
+
+    @staticmethod
+    def _claim_spool(path: str) -> List[str]:
+        """Read and remove a journal whose owner is gone; a live owner still holds its lock."""
+        try:
+            f = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            return []
+
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return []
+            lines = f.readlines()
+            os.remove(path)
+        return lines
+
+    def _open_spool(self):
+        root, ext = os.path.splitext(self.spool_path)
+        path = f"{root}.{_process_tag()}{ext}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        while True:
+            f = open(path, "a", encoding="utf-8")
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # recover() in another process may have claimed the file between open and lock
+            try:
+                if os.stat(path).st_ino == os.fstat(f.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            f.close()
+
+        self._spool_file = f
+        self._spool_file_path = path
+
+    def _spool(self, item: Any):
+        if self._spool_file is None:
+            self._open_spool()
+
+        self._spool_file.write(json.dumps(item, default=str) + "\n")
+        self._spool_file.flush()
+
+    def _settle_spool(self, count: int):
+        with self._spool_lock:
+            self._unwritten = max(0, self._unwritten - count)
+
+            # Everything submitted so far is in the database: start a fresh journal
+            if self._unwritten == 0 and self._spool_file is not None:
+                self._spool_file.truncate(0)
+                self._spool_file.seek(0)
+
+    def _close_spool(self):
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
@@ -124,6 +124,51 @@ class CacheManager:
             )
             return False
     
+    def get_raw(self, namespace: str, key: str) -> Optional[bytes]:
+        if not self.is_available():
+            return None
+        
+        try:
+            return self._client.get(self._make_key(namespace, key))
+        except Exception as e:
+            logger.error(
+                f"Cache GET error: {namespace}:{key}",
+                exc_info=e,
+                endpoint="cache"
+            )
+            return None
+    
+    def set_raw(self, namespace: str, key: str, value: bytes, ttl: int = 3600) -> bool:
+        """Store pre-serialized bytes (e.g. NumPy buffers) without JSON encoding"""
+        if not self.is_available():
+            return False
+        
+        try:
+            self._client.setex(self._make_key(namespace, key), timedelta(seconds=ttl), value)
+            return True
+        except Exception as e:
+            logger.error(
+                f"Cache SET error: {namespace}:{key}",
+                exc_info=e,
+                endpoint="cache"
+            )
+            return False
+    
+    def incr(self, namespace: str, key: str, amount: int = 1) -> Optional[int]:
+        """Atomic counter shared by every worker; None when Redis is unavailable"""
+        if not self.is_available():
+            return None
+        
+        try:
+            return self._client.incrby(self._make_key(namespace, key), amount)
+        except Exception as e:
+            logger.error(
+                f"Cache INCR error: {namespace}:{key}",
+                exc_info=e,
+                endpoint="cache"
+            )
+            return None
+    
     def delete(self, namespace: str, key: str) -> bool:
         if not self.is_available():
             return False
@@ -15,6 +15,24 @@ class Settings(BaseSettings):
     # Limits: 30 RPM, 14,400 RPD (free tier)
     GROQ_API_KEY: Optional[str] = None
     
+    # Seconds the background Gemini call may take before the template explanation is kept
+    LLM_INSIGHTS_DEADLINE_SECONDS: float = 8.0
+    
+    # Write-behind for agent analyses: rows are bulk-inserted per batch or interval,
+    # and journaled until they are in the database, one spool file per process next to this path
+    ANALYSIS_WRITE_BATCH_SIZE: int = 200
+    ANALYSIS_WRITE_INTERVAL_SECONDS: float = 2.0
+    ANALYSIS_WRITE_MAX_PENDING: int = 10000
+    ANALYSIS_SPOOL_PATH: Optional[str] = "logs/agent_analyses.spool"
+    
+    # Yield model artifact written by scripts/train_yield_model.py; outside production a
+    # missing one is trained in-process on the first prediction
+    YIELD_MODEL_PATH: str = "artifacts/yield_model.joblib"
+    YIELD_MODEL_WARMUP: bool = True
+    # Per-hectare single predictions, keyed by crop and rounded inputs
+    YIELD_CACHE_SIZE: int = 10000
+    YIELD_CACHE_TTL_SECONDS: float = 3600
+    
 
     # External API Keys
 
@@ -97,7 +97,7 @@ def get_pool_status():
 
 
 def init_db():
-    from app.models import user, price_data, prediction_history, agent_analysis, notification
+    from app.models import user, price_data, prediction_history, agent_analysis, notification, decision_record
     
     # Import all models to ensure they're registered
     Base.metadata.create_all(bind=engine)
@@ -1,3 +1,5 @@
+import asyncio
+import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
@@ -8,6 +10,10 @@ from slowapi.errors import RateLimitExceeded
 from app.routers import weather, chatbot, prices, yield_prediction, agent, notifications, admin, errors, alerts, profile, health
 from app.api.v1.endpoints import auth
 from app.services.scheduler_service import scheduler_service
+from app.services.agent_service import smart_agent
+from app.services.decision_engine import decision_engine
+from app.services.analysis_store import analysis_store
+from app.services.yield_service import yield_service
 from app.database import init_db
 from app.core.config import settings
 from app.core.env_validator import validate_environment
@@ -185,6 +191,21 @@ async def startup_event():
         
         # Start scheduler if not in testing
         if settings.ENVIRONMENT != "testing":
+            # Load the yield model before traffic arrives rather than on the first prediction.
+            # Production refuses to start without a trained artifact; elsewhere a missing one
+            # is trained on the first prediction rather than during startup
+            if settings.YIELD_MODEL_WARMUP:
+                if settings.ENVIRONMENT == "production":
+                    await asyncio.to_thread(yield_service.warmup, True)
+                elif os.path.exists(yield_service.artifact_path):
+                    await asyncio.to_thread(yield_service.warmup)
+            
+            try:
+                # Analyses accepted before a crash are still in the spool
+                analysis_store.recover()
+            except Exception as e:
+                logger.error(f"Analysis spool recovery failed: {str(e)}")
+            
             try:
                 scheduler_service.start()
                 logger.info("Autonomous agent scheduler started successfully")
@@ -214,6 +235,23 @@ async def shutdown_event():
         except Exception as e:
             logger.warning(f"Scheduler shutdown warning: {str(e)}")
         
+        try:
+            smart_agent.shutdown()
+        except Exception as e:
+            logger.warning(f"Agent shutdown warning: {str(e)}")
+        
+        try:
+            analysis_store.stop()
+            logger.info("Pending analyses flushed")
+        except Exception as e:
+            logger.warning(f"Analysis store shutdown warning: {str(e)}")
+        
+        try:
+            decision_engine.shutdown()
+            logger.info("Decision history flushed")
+        except Exception as e:
+            logger.warning(f"Decision engine shutdown warning: {str(e)}")
+        
         try:
             cache_manager.close()
             logger.info("Cache connection closed")
@@ -6,5 +6,6 @@ from app.models.notification import Notification
 from app.models.price_alert import PriceAlert
 from app.models.user_crop import UserCrop
 from app.models.audit_log import AuditLog
+from app.models.decision_record import DecisionRecord
 
-__all__ = ["Base", "PriceData", "PredictionHistory", "User", "Notification", "PriceAlert", "UserCrop", "AuditLog"]
+__all__ = ["Base", "PriceData", "PredictionHistory", "User", "Notification", "PriceAlert", "UserCrop", "AuditLog", "DecisionRecord"]
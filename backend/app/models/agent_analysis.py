@@ -26,8 +26,15 @@ class AgentAnalysis(Base):
     # Market signals (stored as JSON)
     market_signals = Column(JSON)
     
-    # LLM insights
+    # LLM insights (template text until the background LLM call lands)
     llm_insights = Column(Text, nullable=True)
+    llm_insights_status = Column(String(20), nullable=True)  # pending, ready, fallback
+    
+    # Public handle for polling the insights of one analysis
+    analysis_key = Column(String(36), unique=True, index=True, nullable=True)
+    
+    # Hash of what the analysis was computed from; daily monitoring skips pairs whose inputs did not change
+    input_fingerprint = Column(String(64), index=True, nullable=True)
     
     # Metadata
     analysis_duration = Column(Float)  # seconds
@@ -50,5 +57,7 @@ class AgentAnalysis(Base):
             },
             "market_signals": self.market_signals,
             "llm_insights": self.llm_insights,
+            "llm_insights_status": self.llm_insights_status,
+            "analysis_key": self.analysis_key,
             "timestamp": self.created_at.isoformat()
         }
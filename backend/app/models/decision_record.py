@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class DecisionRecord(Base):
+    """Compact audit row for every decision the engine makes (written in batches)."""
+    __tablename__ = "decision_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    crop = Column(String(50), index=True, nullable=False)
+    action = Column(String(10), nullable=False)  # SELL_NOW, WAIT, HOLD
+    confidence = Column(Float, nullable=False)
+    risk_level = Column(String(10), nullable=False)
+    current_price = Column(Float, nullable=True)
+    expected_price = Column(Float, nullable=True)
+    bullish_score = Column(Float, nullable=True)
+    bearish_score = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<DecisionRecord(crop={self.crop}, action={self.action}, date={self.created_at})>"
@@ -17,6 +17,7 @@ class User(Base):
     favorite_crops = Column(JSON, nullable=True, default=list)  # ["Rice", "Wheat"]
     preferred_language = Column(String, default="en")  # en, hi, ta, te, bn
     notification_enabled = Column(Boolean, default=True)
+    risk_tolerance = Column(String(10), default="medium", server_default="medium")  # low, medium, high
     
     # New user account fields
     user_type = Column(String, default="FARMER")  # FARMER, TRADER, ADMIN
@@ -15,6 +15,7 @@ from app.models.prediction_history import PredictionHistory
 from app.models.audit_log import AuditLog
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.cache import cache_manager
+from app.services.llm_insight_cache import llm_insight_cache
 from app.core.audit import log_admin_action
 
 # Rate limiter for admin endpoints
@@ -68,6 +69,10 @@ class PlatformStats(BaseModel):
     total_analyses: int
     analyses_today: int
     total_predictions: int
+    llm_cache_hits: int = 0
+    llm_cache_misses: int = 0
+    llm_cache_hit_ratio: float = 0.0
+    llm_tokens_saved: int = 0  # Estimated
 
 
 class SystemLog(BaseModel):
@@ -131,12 +136,19 @@ async def get_platform_stats(
     # Total predictions
     total_predictions = db.query(func.count(PredictionHistory.id)).scalar()
     
+    # LLM explanation cache
+    llm_cache = llm_insight_cache.stats()
+    
     return PlatformStats(
         total_users=total_users or 0,
         active_users=active_users or 0,
         total_analyses=total_analyses or 0,
         analyses_today=analyses_today or 0,
-        total_predictions=total_predictions or 0
+        total_predictions=total_predictions or 0,
+        llm_cache_hits=llm_cache["hits"],
+        llm_cache_misses=llm_cache["misses"],
+        llm_cache_hit_ratio=llm_cache["hit_ratio"],
+        llm_tokens_saved=llm_cache["tokens_saved"]
     )
 
 
@@ -2,8 +2,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 from app.database import get_db
 from app.services.agent_service import smart_agent
@@ -12,6 +12,9 @@ from app.models.agent_analysis import AgentAnalysis
 
 router = APIRouter()
 
+# Upper bound on items per batch request
+MAX_BATCH_ITEMS = 20
+
 
 class AnalysisRequest(BaseModel):
     crop: str
@@ -19,13 +22,18 @@ class AnalysisRequest(BaseModel):
     days: Optional[int] = 7  # Prediction period (7, 30, 90, 180 days)
 
 
+class BatchAnalysisRequest(BaseModel):
+    items: List[AnalysisRequest] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
 @router.post("/analyze")
 async def analyze_crop(request: AnalysisRequest):
     user_prefs = {
         'risk_tolerance': 'medium'  # Can be stored in user model later
     }
     
-    analysis = smart_agent.analyze_crop(
+    # Shared across users until the crop's prices or the city's forecast change
+    analysis = await smart_agent.analyze_crop_shared(
         crop=request.crop,
         city=request.city,
         user_preferences=user_prefs,
@@ -35,6 +43,31 @@ async def analyze_crop(request: AnalysisRequest):
     return analysis
 
 
+@router.post("/analyze/batch")
+async def analyze_crops_batch(request: BatchAnalysisRequest):
+    user_prefs = {
+        'risk_tolerance': 'medium'  # Can be stored in user model later
+    }
+    
+    items = [
+        {'crop': item.crop, 'city': item.city or "Delhi", 'days': item.days or 7}
+        for item in request.items
+    ]
+    
+    return await smart_agent.analyze_batch_async(items, user_preferences=user_prefs)
+
+
+@router.get("/analysis/{analysis_key}/insights")
+async def get_analysis_insights(analysis_key: str):
+    # Poll until status leaves 'pending'; 'fallback' means the template text is final
+    insights = smart_agent.get_insights(analysis_key)
+    
+    if insights is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    return insights
+
+
 @router.get("/status")
 async def agent_status(db: Session = Depends(get_db)):
     # Get total analyses count
@@ -8,6 +8,7 @@ from app.database import get_db
 from app.models.price_alert import PriceAlert
 from app.models.user import User
 from app.api.v1.endpoints.auth import get_current_user
+from app.services.alert_index import price_alert_index
 from pydantic import BaseModel, Field
 
 
@@ -82,6 +83,9 @@ async def create_alert(
     db.commit()
     db.refresh(db_alert)
     
+    # Keep the threshold index in step so the next check sees the alert
+    price_alert_index.upsert(db_alert)
+    
     return db_alert
 
 
@@ -140,6 +144,8 @@ async def update_alert(
     db.commit()
     db.refresh(alert)
     
+    price_alert_index.upsert(alert)
+    
     return alert
 
 
@@ -161,4 +167,6 @@ async def delete_alert(
     db.delete(alert)
     db.commit()
     
+    price_alert_index.remove(alert_id)
+    
     return None
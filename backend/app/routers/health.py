@@ -1,7 +1,13 @@
 
+import os
+import resource
+import sys
 from fastapi import APIRouter, status
 from typing import Dict, Any
 from app.database import get_pool_status
+from app.services.decision_engine import decision_engine
+from app.services.analysis_store import analysis_store
+from app.services.yield_service import yield_service
 
 router = APIRouter(tags=["Health"])
 
@@ -83,6 +89,39 @@ async def readiness_check():
         }
 
 
+@router.get("/health/memory")
+async def memory_health():
+    
+    # Linux reports ru_maxrss in KB, macOS in bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    
+    process = {"peak_rss_mb": round(peak_mb, 1)}
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        process["rss_mb"] = round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError):
+        pass  # Not Linux
+    
+    # PSS splits shared pages (such as memory-mapped models) between the processes mapping them
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    process["pss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                    break
+    except (OSError, ValueError):
+        pass
+    
+    return {
+        "process": process,
+        "decision_engine": decision_engine.memory_stats(),
+        "analysis_writes": analysis_store.stats(),
+        "yield_model": yield_service.memory_stats()
+    }
+
+
 @router.get("/health/live")
 async def liveness_check():
     
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal
 from datetime import date
 
 from app.database import get_db
@@ -20,6 +20,7 @@ class UserProfileUpdate(BaseModel):
     location: str | None = None
     preferred_language: str | None = Field(None, description="en, hi, mr, pa, ta")
     notification_enabled: bool | None = None
+    risk_tolerance: Literal["low", "medium", "high"] | None = Field(None, description="low, medium, high")
     farm_size: float | None = Field(None, description="Farm size in acres")
     farm_location_lat: float | None = None
     farm_location_lon: float | None = None
@@ -35,6 +36,7 @@ class UserProfileResponse(BaseModel):
     location: str | None
     preferred_language: str
     notification_enabled: bool
+    risk_tolerance: str | None
     farm_size: float | None
     sms_enabled: bool
     whatsapp_enabled: bool
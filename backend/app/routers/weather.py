@@ -1,7 +1,9 @@
 
 from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
 from app.services.weather_service import WeatherService
 from app.services.weather_impact_service import weather_impact_service
+from app.services.weather_alert_service import weather_alert_service
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from app.core.logging_config import logger
@@ -76,58 +78,7 @@ async def get_weather_alerts(
             logger.warning(f"Weather alerts API error for {city}: {weather_data['error']}")
             raise HTTPException(status_code=400, detail=weather_data["error"])
         
-        alerts = []
-        temp = weather_data["temperature"]
-        humidity = weather_data["humidity"]
-        wind = weather_data["wind_speed"]
-        
-        # Temperature alerts
-        if temp > 40:
-            alerts.append({
-                "type": "extreme_heat",
-                "severity": "high",
-                "message": f"Extreme heat alert! Temperature is {temp}°C. Avoid field work during peak hours.",
-                "recommendation": "Work early morning or evening. Ensure adequate water for crops and livestock."
-            })
-        elif temp > 35:
-            alerts.append({
-                "type": "heat_warning",
-                "severity": "medium",
-                "message": f"Heat warning. Temperature is {temp}°C.",
-                "recommendation": "Increase irrigation frequency. Provide shade for sensitive crops."
-            })
-        elif temp < 5:
-            alerts.append({
-                "type": "frost_warning",
-                "severity": "high",
-                "message": f"Frost warning! Temperature is {temp}°C.",
-                "recommendation": "Cover sensitive plants. Delay sowing of frost-sensitive crops."
-            })
-        
-        # Humidity alerts
-        if humidity > 85:
-            alerts.append({
-                "type": "high_humidity",
-                "severity": "medium",
-                "message": f"High humidity at {humidity}%. Disease risk increased.",
-                "recommendation": "Monitor for fungal diseases. Ensure good air circulation."
-            })
-        elif humidity < 30:
-            alerts.append({
-                "type": "low_humidity",
-                "severity": "low",
-                "message": f"Low humidity at {humidity}%.",
-                "recommendation": "Increase irrigation. Consider mulching to retain soil moisture."
-            })
-        
-        # Wind alerts
-        if wind > 15:
-            alerts.append({
-                "type": "strong_wind",
-                "severity": "medium",
-                "message": f"Strong winds at {wind} m/s.",
-                "recommendation": "Avoid spraying pesticides. Secure greenhouse covers and shade nets."
-            })
+        alerts = weather_alert_service.alerts_for_conditions(weather_data)
         
         return {
             "city": city,
@@ -144,19 +95,36 @@ async def get_weather_alerts(
         raise HTTPException(status_code=500, detail="Failed to fetch weather alerts")
 
 
+@router.get("/impact")
+@limiter.limit(RATE_LIMIT_FORECAST)
+async def get_weather_impact_for_crops(
+    request: Request,
+    city: str = Query(..., description="City name"),
+    crops: Optional[str] = Query(None, description="Comma-separated crops (default: all supported)"),
+    days: int = Query(7, description="Forecast days", ge=1, le=16)
+):
+    try:
+        crop_list = [c.strip() for c in crops.split(",") if c.strip()] if crops else None
+        return await weather_impact_service.analyze_crops_impact(city, crop_list, days)
+    except Exception as e:
+        logger.error(f"Unexpected error analyzing weather impact for {city}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to analyze weather impact")
+
+
 @router.get("/impact/{crop}")
 @limiter.limit(RATE_LIMIT_FORECAST)
 async def get_weather_impact(
     request: Request,
     crop: str,
-    city: str = Query(..., description="City name")
+    city: str = Query(..., description="City name"),
+    days: int = Query(7, description="Forecast days", ge=1, le=16)
 ):
     try:
-        impact = weather_impact_service.get_weather_impact(city, crop)
+        impact = await weather_impact_service.analyze_weather_impact(crop, city, days)
         
-        if "error" in impact:
-            logger.warning(f"Weather impact error for {crop} in {city}: {impact['error']}")
-            raise HTTPException(status_code=400, detail=impact["error"])
+        if impact.get("impact") == "UNKNOWN":
+            logger.warning(f"Weather impact error for {crop} in {city}: {impact['message']}")
+            raise HTTPException(status_code=400, detail=impact["message"])
         
         return impact
     except HTTPException:
@@ -1,12 +1,14 @@
+import asyncio
+from typing import Dict, List, Literal, Optional, Tuple
+
 from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
-from app.services.yield_service import YieldService
+from app.services.yield_service import YieldService, yield_service, MAX_SWEEP_SCENARIOS, OPTIMIZE_TIME_BUDGET
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from app.core.logging_config import logger
 
 router = APIRouter()
-yield_service = YieldService()
 limiter = Limiter(key_func=get_remote_address)
 
 class YieldPredictionRequest(BaseModel):
@@ -19,6 +21,37 @@ class YieldPredictionRequest(BaseModel):
     phosphorus: float = Field(..., description="Phosphorus in kg/hectare", ge=0)
     potassium: float = Field(..., description="Potassium in kg/hectare", ge=0)
 
+class SweepRange(BaseModel):
+    start: Optional[float] = Field(None, description="First value")
+    stop: Optional[float] = Field(None, description="Last value (inclusive)")
+    steps: Optional[int] = Field(None, description="Number of evenly spaced values", ge=1, le=MAX_SWEEP_SCENARIOS)
+    values: Optional[List[float]] = Field(None, description="Explicit values; used instead of start/stop/steps",
+                                          min_length=1, max_length=MAX_SWEEP_SCENARIOS)
+
+    def expand(self, name: str) -> List[float]:
+        if self.values is not None:
+            return self.values
+        if self.start is None or self.stop is None or self.steps is None:
+            raise ValueError(f"Range for {name} needs either values or start, stop and steps")
+        if self.steps == 1:
+            return [self.start]
+        step = (self.stop - self.start) / (self.steps - 1)
+        return [self.start + i * step for i in range(self.steps)]
+
+class YieldSweepRequest(YieldPredictionRequest):
+    ranges: Dict[str, SweepRange] = Field(default_factory=dict,
+                                          description="Values to try per feature; all combinations are predicted")
+    scenarios: List[Dict[str, float]] = Field(default_factory=list, max_length=MAX_SWEEP_SCENARIOS,
+                                              description="Explicit per-scenario overrides of the base values")
+
+class YieldOptimizeRequest(YieldPredictionRequest):
+    objective: Literal["yield", "profit"] = Field("yield", description="Maximize total yield or profit")
+    price_per_quintal: Optional[float] = Field(None, description="Crop price; required for profit", gt=0)
+    costs: Dict[str, float] = Field(default_factory=dict, description="Cost per kg of nitrogen, phosphorus, potassium")
+    bounds: Dict[str, Tuple[float, float]] = Field(default_factory=dict, description="(low, high) kg/ha per nutrient")
+    time_budget_ms: int = Field(int(OPTIMIZE_TIME_BUDGET * 1000), ge=50, le=2000,
+                                description="Refinement stops once this much time is used")
+
 @router.post("/predict")
 @limiter.limit("50/hour")  # Allow multiple predictions for different scenarios
 async def predict_yield(request: Request, yield_request: YieldPredictionRequest):
@@ -43,6 +76,57 @@ async def predict_yield(request: Request, yield_request: YieldPredictionRequest)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@router.post("/sweep")
+@limiter.limit("50/hour")
+async def sweep_yield(request: Request, sweep_request: YieldSweepRequest):
+    # Base values are the usual single-prediction fields; ranges and scenarios vary them
+    base = sweep_request.model_dump(exclude={"crop", "ranges", "scenarios"})
+    
+    try:
+        ranges = {name: spec.expand(name) for name, spec in sweep_request.ranges.items()}
+        return await asyncio.to_thread(
+            yield_service.sweep,
+            crop=sweep_request.crop,
+            base=base,
+            ranges=ranges,
+            scenarios=sweep_request.scenarios
+        )
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Yield sweep failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@router.post("/optimize")
+@limiter.limit("50/hour")
+async def optimize_fertilizer(request: Request, optimize_request: YieldOptimizeRequest):
+    # The nutrient fields are the current practice the result is compared against
+    base = optimize_request.model_dump(include=set(YieldPredictionRequest.model_fields) - {"crop"})
+    
+    try:
+        return await asyncio.to_thread(
+            yield_service.optimize_inputs,
+            crop=optimize_request.crop,
+            base=base,
+            objective=optimize_request.objective,
+            costs=optimize_request.costs,
+            price_per_quintal=optimize_request.price_per_quintal,
+            bounds=optimize_request.bounds,
+            time_budget=optimize_request.time_budget_ms / 1000
+        )
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Fertilizer optimization failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Optimization error: {str(e)}")
+
+@router.get("/cache/stats")
+@limiter.limit("200/hour")
+async def get_prediction_cache_stats(request: Request):
+    return yield_service.cache_stats()
+
 @router.get("/crops")
 @limiter.limit("200/hour")
 async def get_supported_crops(request: Request):
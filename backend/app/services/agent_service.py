@@ -1,6 +1,15 @@
 
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import google.generativeai as genai
 import os
@@ -8,23 +17,69 @@ import os
 from app.services.decision_engine import decision_engine, Decision
 from app.services.price_service import PriceService
 from app.services.weather_service import WeatherService
+from app.services.forecast_frame import ForecastFrame
+from app.services.data_context import DataContext
+from app.services.llm_insight_cache import llm_insight_cache
+from app.services.analysis_store import analysis_store
+from app.services.analysis_cache import analysis_cache
 from app.services.data_integration_service import data_service
+from app.services.weather_prefetch_service import weather_prefetch_service, user_city
 from app.models.user import User
 from app.models.prediction_history import PredictionHistory
 from app.models.agent_analysis import AgentAnalysis
-from app.core.db_session import get_db_session
+from app.core.db_session import get_db_session, get_db_session_no_commit
+from app.core.cache import cache_manager
+from app.core.config import settings
 from app.core.logging_config import logger
 
 
+# A crashed monitoring run can resume for the rest of the day
+MONITORING_CHECKPOINT_TTL = 24 * 3600
+
+# How long the start of the last finished run is remembered for change detection
+MONITORING_LAST_RUN_TTL = 7 * 24 * 3600
+
+# Daily monitoring analyzes each (crop, city) once with these; users' own tolerance is applied at fan-out
+NEUTRAL_PREFERENCES = {'risk_tolerance': 'medium'}
+
+# Instant Hinglish explanations, used until (or instead of) the LLM text
+INSIGHT_TEMPLATES = {
+    'SELL_NOW': "{crop} abhi bech dijiye. {reason} Aaj ka bhav Rs.{price:.2f}/kg hai, aage girne ka risk {risk} hai.",
+    'WAIT': "{crop} ko abhi rok ke rakhiye. {reason} {date_hint}Expected bhav Rs.{expected:.2f}/kg tak ja sakta hai.",
+    'HOLD': "{crop} ka bhav abhi stable hai (Rs.{price:.2f}/kg). {reason} Apni zarurat ke hisaab se bechiye, jaldbazi na karein.",
+}
+
+
 class SmartCropAgent:
     
+    # Per-step budgets (seconds); a step that overruns is treated as missing input
+    PRICE_DATA_TIMEOUT = 10
+    PREDICTION_TIMEOUT = 20
+    WEATHER_TIMEOUT = 8
+    
+    # Background Gemini calls; responses never wait on these
+    LLM_MODEL = 'gemini-flash-latest'  # Using free tier compatible model
+    LLM_MAX_WORKERS = 4
+    
+    # Daily monitoring: users per keyset page and concurrent (crop, city) analyses
+    MONITORING_CHUNK_SIZE = 500
+    MONITORING_MAX_WORKERS = 4
+    
+    # Part of every input fingerprint; bump when the price model or decision rules change
+    MODEL_VERSION = 'linreg-180d/rules-v1'
+    
     def __init__(self):
         self.price_service = PriceService()
         self.weather_service = WeatherService()
+        self.llm_executor = ThreadPoolExecutor(max_workers=self.LLM_MAX_WORKERS, thread_name_prefix="llm-insights")
+        
+        # Event loop behind the blocking analyze_crop, started on first use
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
         
         try:
             genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            self.llm = genai.GenerativeModel('gemini-flash-latest')  # Using free tier compatible model
+            self.llm = genai.GenerativeModel(self.LLM_MODEL)
         except Exception as e:
             logger.warning(f"Gemini initialization failed: {e}. LLM insights will be disabled.")
             self.llm = None
@@ -34,47 +89,85 @@ class SmartCropAgent:
         crop: str, 
         city: str = "Delhi",
         user_preferences: Optional[Dict] = None,
-        days_ahead: int = 7
+        days_ahead: int = 7,
+        weather_forecast: Optional[ForecastFrame] = None,
+        fetch_weather: bool = True,
+        context: Optional[DataContext] = None,
+        input_fingerprint: Optional[str] = None
+    ) -> Dict:
+        # Blocking entry point for the scheduler; request handlers await analyze_crop_async.
+        # Every caller thread shares one long-lived loop (and its step executor), so this
+        # also works from a thread that is already running an event loop.
+        future = asyncio.run_coroutine_threadsafe(self.analyze_crop_async(
+            crop, city, user_preferences, days_ahead, weather_forecast, fetch_weather, context, input_fingerprint
+        ), self._event_loop())
+        return future.result()
+    
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="agent-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+    
+    async def analyze_crop_async(
+        self, 
+        crop: str, 
+        city: str = "Delhi",
+        user_preferences: Optional[Dict] = None,
+        days_ahead: int = 7,
+        weather_forecast: Optional[ForecastFrame] = None,
+        fetch_weather: bool = True,
+        context: Optional[DataContext] = None,
+        input_fingerprint: Optional[str] = None
     ) -> Dict:
         
-        start_time = datetime.now()
+        start_time = time.perf_counter()
+        timings: Dict[str, float] = {}
         logger.info(f"🤖 Agent analyzing {crop} in {city} for {days_ahead} days")
         
         try:
-            # Step 1: Gather data (get more historical data for longer predictions)
-            historical_days = max(30, days_ahead * 2)  # 2x the prediction period
-            price_data = data_service.get_price_data(crop, days=historical_days)
+            # Step 1: Gather independent inputs concurrently (get more historical data for longer predictions)
+            historical_days = self._history_days(days_ahead)
             
-            if price_data.empty:
-                logger.warning(f"No price data for {crop}")
-                return self._create_error_response("No price data available")
-            
-            current_price = price_data.iloc[-1]['price']
+            # Both the trend and the prediction read this crop's history; load it once
+            # at the wider window and slice the other out of it
+            context = context or DataContext()
+            context.expect(crop, historical_days)
+            context.expect(crop, PriceService.HISTORY_DAYS)
             
-            # Step 2: Get price predictions for requested period
-            prediction_result = PriceService.predict_prices(crop, days_ahead=days_ahead)
+            # Weather is skipped when the caller prefetched it
+            if weather_forecast is None and fetch_weather:
+                weather_step = self._run_step(
+                    timings, 'weather', self.WEATHER_TIMEOUT,
+                    self.weather_service.get_forecast_frame, city
+                )
+            else:
+                weather_step = asyncio.sleep(0, result=weather_forecast)
             
-            # Convert prediction format to match what decision engine expects
-            predictions = []
-            if prediction_result and 'predictions' in prediction_result:
-                for pred in prediction_result['predictions']:
-                    predictions.append({
-                        'date': pred['date'],
-                        'price': pred['predicted_price'],
-                        'confidence': 0.75  # Default confidence
-                    })
+            price_data, prediction_result, weather_forecast = await asyncio.gather(
+                self._run_step(
+                    timings, 'price_data', self.PRICE_DATA_TIMEOUT,
+                    context.get_price_data, crop, days=historical_days
+                ),
+                self._run_step(
+                    timings, 'prediction', self.PREDICTION_TIMEOUT,
+                    PriceService.predict_prices, crop, days_ahead=days_ahead, context=context
+                ),
+                weather_step
+            )
             
-            # Step 3: Calculate price trends
-            price_trend = self._calculate_trend(price_data)
+            if price_data is None or price_data.empty:
+                logger.warning(f"No price data for {crop}")
+                return self._create_error_response("No price data available", timings)
             
-            # Step 4: Get weather forecast
-            weather_forecast = None
-            try:
-                weather_forecast = self.weather_service.get_forecast(city)
-            except Exception as e:
-                logger.warning(f"Weather fetch failed: {e}")
+            current_price = price_data.iloc[-1]['price']
+            predictions = self._to_predictions(prediction_result)
             
-            # Step 5: Run decision engine (FAST - no LLM calls)
+            # Step 2: Calculate price trends and run decision engine (FAST - no LLM calls)
+            step_start = time.perf_counter()
+            price_trend = self._calculate_trend(price_data)
             decision = decision_engine.analyze(
                 crop=crop,
                 current_price=current_price,
@@ -83,73 +176,344 @@ class SmartCropAgent:
                 weather_forecast=weather_forecast,
                 user_preferences=user_preferences
             )
+            timings['decision'] = round(time.perf_counter() - step_start, 3)
             
-            # Step 6: Get LLM insights (optional, for explanation only)
-            llm_insights = self._get_llm_insights(crop, decision)
+            # Step 3: Template explanation now; the LLM version is attached to the row later
+            result = self._build_result(crop, city, days_ahead, current_price, predictions, decision)
             
-            elapsed = (datetime.now() - start_time).total_seconds()
-            logger.info(f"[OK] Analysis complete in {elapsed:.2f}s")
+            # Step 4: Queue the analysis for the write-behind store
+            elapsed = time.perf_counter() - start_time
+            self._save_analyses(timings, [self._analysis_row(result, decision, elapsed, input_fingerprint)])
+            self._schedule_llm_insights(result, decision)
             
-            # Convert MarketSignal dataclasses to dicts for JSON serialization
-            market_signals = [
-                {
-                    'signal_type': s.data_source,
-                    'signal': s.signal_type,
-                    'strength': s.strength,
-                    'explanation': s.reason
-                }
-                for s in decision.signals
-            ]
-            
-            # Save analysis to database using context manager
-            with get_db_session() as save_db:
-                # Use the LAST prediction (end of period) not the first
-                final_predicted_price = float(predictions[-1]['price']) if predictions else None
-                
-                analysis_record = AgentAnalysis(
-                    crop=crop,
-                    city=city,
-                    current_price=float(current_price),  # Convert numpy float to Python float
-                    predicted_price=final_predicted_price,  # Price at end of prediction period
-                    action=decision.action,
-                    confidence=float(decision.confidence),  # Convert numpy float to Python float
-                    reason=decision.reasoning,
-                    best_action_date=decision.best_sell_date,
-                    expected_price=float(decision.expected_price) if decision.expected_price else None,
-                    risk_level=decision.risk_level,
-                    market_signals=market_signals,
-                    llm_insights=llm_insights,
-                    analysis_duration=elapsed
-                )
-                save_db.add(analysis_record)
-                # Auto-commits on success, auto-rolls back on error
-                logger.info(f" Analysis saved to database (ID: {analysis_record.id})")
-                    
-            # Format response to match frontend expectations
-            final_predicted_price = predictions[-1]['price'] if predictions else None
+            elapsed = time.perf_counter() - start_time
+            logger.info(f"[OK] Analysis complete in {elapsed:.2f}s ({timings})")
             
-            return {
-                'crop': crop,
-                'city': city,
-                'current_price': current_price,
-                'predicted_price': final_predicted_price,  # Price at end of prediction period
-                'days_ahead': days_ahead,  # Include prediction period in response
-                'decision': {
-                    'action': decision.action,
-                    'confidence': decision.confidence,
-                    'reason': decision.reasoning,
-                    'best_action_date': decision.best_sell_date,
-                    'expected_price': decision.expected_price,
-                    'risk_level': decision.risk_level
-                },
-                'market_signals': market_signals,
-                'llm_insights': llm_insights,
-                'timestamp': datetime.now().isoformat()
+            result['metadata'] = {
+                'timings': timings,
+                'total_seconds': round(elapsed, 3)
             }
+            return result
             
         except Exception as e:
             logger.error(f"Analysis error: {str(e)}")
-            return self._create_error_response(str(e))
+            return self._create_error_response(str(e), timings)
+    
+    async def analyze_crop_shared(
+        self,
+        crop: str,
+        city: str = "Delhi",
+        user_preferences: Optional[Dict] = None,
+        days_ahead: int = 7
+    ) -> Dict:
+        """
+        analyze_crop_async behind the shared result cache, for interactive requests.
+        
+        Every user asking about the same crop, city, horizon and risk tolerance gets
+        the same analysis (and analysis_key) until prices or the forecast change.
+        """
+        start_time = time.perf_counter()
+        
+        async def cache_key() -> str:
+            price_watermark, weather_generation = await asyncio.gather(
+                asyncio.to_thread(data_service.price_watermark, crop),
+                asyncio.to_thread(self.weather_service.forecast_generation, city)
+            )
+            return analysis_cache.make_key(
+                crop, city, days_ahead, (user_preferences or {}).get('risk_tolerance'),
+                price_watermark, weather_generation
+            )
+        
+        try:
+            key = await cache_key()
+        except Exception as e:
+            logger.warning(f"Analysis cache bypassed for {crop} in {city}: {e}")
+            return await self.analyze_crop_async(crop, city, user_preferences, days_ahead)
+        
+        # Stored under the inputs read after the run: the analysis may have fetched a newer forecast
+        result, computed = await analysis_cache.get_or_compute(
+            key, lambda: self.analyze_crop_async(crop, city, user_preferences, days_ahead), store_key=cache_key
+        )
+        
+        if computed:
+            return {**result, 'metadata': {**result['metadata'], 'cached': False}}
+        
+        if 'analysis_key' in result:
+            # The LLM text may have landed since the entry was stored
+            stored = await asyncio.to_thread(analysis_store.get, result['analysis_key'])
+            if stored is not None:
+                result = {**result, **stored}
+        
+        return {
+            **result,
+            'metadata': {
+                'cached': True,
+                'timings': {},
+                'total_seconds': round(time.perf_counter() - start_time, 3)
+            }
+        }
+    
+    async def analyze_batch_async(
+        self,
+        items: List[Dict],
+        user_preferences: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Analyze several (crop, city, days) items in one pass.
+        
+        Price history is loaded once per crop, predictions once per (crop, days) and
+        forecasts once per city, all concurrently. Decisions then run for every item
+        and the rows are queued for one bulk insert.
+        """
+        start_time = time.perf_counter()
+        timings: Dict[str, float] = {}
+        context = DataContext()
+        
+        # Widest window each crop needs: decision history per item and the predictor's history
+        windows: Dict[str, int] = {}
+        for item in items:
+            windows[item['crop']] = max(
+                windows.get(item['crop'], PriceService.HISTORY_DAYS), self._history_days(item['days'])
+            )
+        for crop, window in windows.items():
+            context.expect(crop, window)
+        
+        crops = list(windows)
+        horizons = list(dict.fromkeys((item['crop'], item['days']) for item in items))
+        cities = list(dict.fromkeys(item['city'] for item in items))
+        
+        logger.info(f"🤖 Agent batch: {len(items)} items, {len(crops)} crops, {len(cities)} cities")
+        
+        # Step 1: Every distinct input at once
+        loaded = await asyncio.gather(
+            *(self._run_step(
+                timings, f'price_data:{crop}', self.PRICE_DATA_TIMEOUT,
+                context.get_price_data, crop, days=windows[crop]
+            ) for crop in crops),
+            *(self._run_step(
+                timings, f'prediction:{crop}:{days}', self.PREDICTION_TIMEOUT,
+                PriceService.predict_prices, crop, days_ahead=days, context=context
+            ) for crop, days in horizons),
+            *(self._run_step(
+                timings, f'weather:{city}', self.WEATHER_TIMEOUT,
+                self.weather_service.get_forecast_frame, city
+            ) for city in cities)
+        )
+        histories = dict(zip(crops, loaded[:len(crops)]))
+        predictions = dict(zip(horizons, loaded[len(crops):len(crops) + len(horizons)]))
+        forecasts = dict(zip(cities, loaded[len(crops) + len(horizons):]))
+        
+        # Step 2: Decisions for all items in one vectorized pass (inputs come from the context)
+        step_start = time.perf_counter()
+        results: List[Optional[Dict]] = [None] * len(items)
+        scored = []
+        
+        for i, item in enumerate(items):
+            # Slice the step-1 frame: going back to the context would re-hit a failed source,
+            # or block the event loop on the key lock a timed-out load still holds
+            history = histories[item['crop']]
+            price_data = None if history is None else DataContext.slice(history, self._history_days(item['days']))
+            
+            if price_data is None or price_data.empty:
+                results[i] = {'crop': item['crop'], 'city': item['city'], **self._create_error_response("No price data available")}
+                continue
+            
+            scored.append((i, price_data, self._to_predictions(predictions[(item['crop'], item['days'])])))
+        
+        decisions = []
+        if scored:
+            horizon = max(len(item_predictions) for _, _, item_predictions in scored)
+            paths = np.full((len(scored), horizon), np.nan)
+            dates = np.full((len(scored), horizon), None, dtype=object)
+            trends = []
+            
+            for row, (_, price_data, item_predictions) in enumerate(scored):
+                paths[row, :len(item_predictions)] = [p['price'] for p in item_predictions]
+                dates[row, :len(item_predictions)] = [p['date'] for p in item_predictions]
+                trends.append(self._calculate_trend(price_data))
+            
+            current_prices = np.array([price_data.iloc[-1]['price'] for _, price_data, _ in scored], dtype=float)
+            batch = decision_engine.analyze_many(
+                crops=[items[i]['crop'] for i, _, _ in scored],
+                current_prices=current_prices,
+                predicted_paths=paths,
+                change_7d=np.array([t['change_7d'] for t in trends], dtype=float),
+                change_30d=np.array([t['change_30d'] for t in trends], dtype=float),
+                volatility=np.array([t['volatility'] for t in trends], dtype=float),
+                weather=np.array([
+                    decision_engine.weather_features(forecasts[items[i]['city']])
+                    if forecasts[items[i]['city']] else (np.nan,) * 3
+                    for i, _, _ in scored
+                ], dtype=float).reshape(len(scored), 3),
+                prediction_dates=dates,
+                risk_tolerance=[(user_preferences or {}).get('risk_tolerance')] * len(scored)
+            )
+            
+            for row, (i, _, item_predictions) in enumerate(scored):
+                item = items[i]
+                decision = decision_engine.decision_at(batch, row)
+                result = self._build_result(
+                    item['crop'], item['city'], item['days'], current_prices[row], item_predictions, decision
+                )
+                results[i] = result
+                decisions.append((result, decision))
+        
+        timings['decision'] = round(time.perf_counter() - step_start, 3)
+        
+        # Step 3: Queue every row; the store bulk-inserts them
+        elapsed = time.perf_counter() - start_time
+        rows = [self._analysis_row(result, decision, elapsed) for result, decision in decisions]
+        self._save_analyses(timings, rows)
+        
+        for result, decision in decisions:
+            self._schedule_llm_insights(result, decision)
+        
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"[OK] Batch analysis of {len(items)} items complete in {elapsed:.2f}s")
+        
+        return {
+            'results': results,
+            'metadata': {
+                'items': len(items),
+                'crops': len(crops),
+                'cities': len(cities),
+                'timings': timings,
+                'total_seconds': round(elapsed, 3),
+                'price_data': context.stats()
+            }
+        }
+    
+    @staticmethod
+    def _history_days(days_ahead: int) -> int:
+        # Price history behind one decision: twice the horizon, at least a month
+        return max(30, days_ahead * 2)
+    
+    async def _run_step(self, timings: Dict[str, float], name: str, timeout: Optional[float], func, *args, **kwargs):
+        """
+        Run a blocking step in a worker thread, recording its duration.
+        
+        Returns None when the step fails or exceeds its timeout, so callers decide
+        whether the input is optional. A timed-out thread is abandoned, not killed.
+        """
+        step_start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Analysis step '{name}' timed out after {timeout}s")
+            return None
+        except Exception as e:
+            logger.warning(f"Analysis step '{name}' failed: {e}")
+            return None
+        finally:
+            timings[name] = round(time.perf_counter() - step_start, 3)
+    
+    def _to_predictions(self, prediction_result: Optional[Dict]) -> List[Dict]:
+        # Convert prediction format to match what decision engine expects
+        predictions = []
+        if prediction_result and 'predictions' in prediction_result:
+            for pred in prediction_result['predictions']:
+                predictions.append({
+                    'date': pred['date'],
+                    'price': pred['predicted_price'],
+                    'confidence': 0.75  # Default confidence
+                })
+        return predictions
+    
+    def _build_result(
+        self,
+        crop: str,
+        city: str,
+        days_ahead: int,
+        current_price: float,
+        predictions: List[Dict],
+        decision: Decision
+    ) -> Dict:
+        # Convert MarketSignal dataclasses to dicts for JSON serialization
+        market_signals = [
+            {
+                'signal_type': s.data_source,
+                'signal': s.signal_type,
+                'strength': s.strength,
+                'explanation': s.reason
+            }
+            for s in decision.signals
+        ]
+        
+        # Format response to match frontend expectations
+        return {
+            'crop': crop,
+            'city': city,
+            'current_price': current_price,
+            'predicted_price': predictions[-1]['price'] if predictions else None,  # Price at end of prediction period
+            'days_ahead': days_ahead,  # Include prediction period in response
+            'decision': {
+                'action': decision.action,
+                'confidence': decision.confidence,
+                'reason': decision.reasoning,
+                'best_action_date': decision.best_sell_date,
+                'expected_price': decision.expected_price,
+                'risk_level': decision.risk_level
+            },
+            'market_signals': market_signals,
+            'llm_insights': self._template_insights(crop, current_price, decision),
+            'llm_insights_status': 'pending' if self.llm else 'fallback',
+            'analysis_key': str(uuid.uuid4()),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _analysis_row(self, result: Dict, decision: Decision, elapsed: float, input_fingerprint: Optional[str] = None) -> Dict:
+        predicted_price = result['predicted_price']
+        
+        return {
+            'crop': result['crop'],
+            'city': result['city'],
+            'current_price': float(result['current_price']),  # Convert numpy float to Python float
+            'predicted_price': float(predicted_price) if predicted_price is not None else None,  # Price at end of prediction period
+            'action': decision.action,
+            'confidence': float(decision.confidence),  # Convert numpy float to Python float
+            'reason': decision.reasoning,
+            'best_action_date': decision.best_sell_date,
+            'expected_price': float(decision.expected_price) if decision.expected_price else None,
+            'risk_level': decision.risk_level,
+            'market_signals': result['market_signals'],
+            'llm_insights': result['llm_insights'],
+            'llm_insights_status': result['llm_insights_status'],
+            'analysis_key': result['analysis_key'],
+            'input_fingerprint': input_fingerprint,
+            'analysis_duration': elapsed
+        }
+    
+    def _save_analyses(self, timings: Dict[str, float], rows: List[Dict]):
+        step_start = time.perf_counter()
+        accepted = analysis_store.add(rows)
+        if accepted < len(rows):
+            logger.warning(f"Analysis write queue full - {len(rows) - accepted} analyses not saved")
+        timings['save'] = round(time.perf_counter() - step_start, 3)
+    
+    def _schedule_llm_insights(self, result: Dict, decision: Decision):
+        if self.llm:
+            analysis_key = result['analysis_key']
+            # The deadline counts from here, so time spent queued behind other jobs is included
+            future = self.llm_executor.submit(
+                self._complete_llm_insights, analysis_key, result['crop'], decision, time.monotonic()
+            )
+            future.add_done_callback(lambda f: self._llm_job_done(analysis_key, f))
+    
+    def _llm_job_done(self, analysis_key: str, future):
+        # A job cancelled at shutdown or one that crashed must not leave pollers waiting on 'pending'
+        if not future.cancelled() and future.exception() is None:
+            return
+        if not future.cancelled():
+            logger.warning(f"LLM insights job for {analysis_key} failed: {future.exception()}")
+        try:
+            self._set_insights(analysis_key, llm_insights_status='fallback')
+        except Exception as e:
+            logger.error(f"Could not mark LLM insights for {analysis_key} as fallback: {e}")
+    
+    def _set_insights(self, analysis_key: str, **values):
+        if not analysis_store.amend(analysis_key, **values):
+            logger.warning(f"Write queue full - attaching LLM insights to {analysis_key} directly")
+            analysis_store.amend_now(analysis_key, **values)
     
     def _calculate_trend(self, price_data) -> Dict:
         
@@ -173,10 +537,44 @@ class SmartCropAgent:
             'volatility': volatility
         }
     
-    def _get_llm_insights(self, crop: str, decision: Decision) -> str:
+    def _template_insights(self, crop: str, current_price: float, decision: Decision) -> str:
+        template = INSIGHT_TEMPLATES.get(decision.action, INSIGHT_TEMPLATES['HOLD'])
+        date_hint = f"{decision.best_sell_date} ke aas-paas bechna behtar rahega. " if decision.best_sell_date else ""
+        
+        # The strongest signal is the one-line "why"
+        top_signal = max(decision.signals, key=lambda s: s.strength, default=None)
+        reason = f"{top_signal.reason.rstrip('. ')}." if top_signal else ""
+        
+        return template.format(
+            crop=crop.title(),
+            reason=reason,
+            price=float(current_price),
+            expected=float(decision.expected_price or current_price),
+            risk=decision.risk_level.lower(),
+            date_hint=date_hint
+        )
+    
+    def _complete_llm_insights(self, analysis_key: str, crop: str, decision: Decision, submitted_at: float):
+        """Runs on llm_executor: attach the LLM explanation if it arrives before the deadline."""
+        deadline = settings.LLM_INSIGHTS_DEADLINE_SECONDS
+        remaining = deadline - (time.monotonic() - submitted_at)
+        
+        insights = self._get_llm_insights(crop, decision, timeout=remaining) if remaining > 0 else None
+        elapsed = time.monotonic() - submitted_at
+        
+        if insights is None or elapsed > deadline:
+            status = 'fallback'
+            logger.info(f"LLM insights for {analysis_key} missed the {deadline}s deadline; keeping template")
+        else:
+            status = 'ready'
+        
+        values = {'llm_insights': insights, 'llm_insights_status': status} if status == 'ready' else {'llm_insights_status': status}
+        self._set_insights(analysis_key, **values)
+    
+    def _get_llm_insights(self, crop: str, decision: Decision, timeout: Optional[float] = None) -> Optional[str]:
         
         if not self.llm:
-            return decision.reasoning  # Fallback if LLM not initialized
+            return None
         
         try:
             prompt = f"""You are an agricultural advisor. Explain this crop analysis to a farmer in simple Hindi-English mix (Hinglish).
@@ -193,75 +591,309 @@ Create a SHORT (3-4 lines) WhatsApp-style message explaining:
 
 Keep it practical and friendly. Use Rs. for prices."""
 
-            response = self.llm.generate_content(prompt)
-            return response.text.strip()
+            def generate():
+                response = self.llm.generate_content(
+                    prompt,
+                    request_options={"timeout": timeout} if timeout else None
+                )
+                usage = getattr(response, 'usage_metadata', None)
+                return response.text.strip(), getattr(usage, 'total_token_count', None)
+            
+            # Same crop/decision/risk across users gives the same prompt; only the first reaches Gemini
+            return llm_insight_cache.get_or_generate(self.LLM_MODEL, prompt, generate, timeout=timeout)
             
         except Exception as e:
             logger.warning(f"LLM insights failed: {e}")
-            return decision.reasoning  # Fallback to rule-based reasoning
+            return None  # Caller keeps the template explanation
+    
+    def get_insights(self, analysis_key: str) -> Optional[Dict]:
+        record = analysis_store.get(analysis_key)
+        if record is None:
+            return None
+        return {
+            'analysis_key': analysis_key,
+            'status': record['llm_insights_status'],
+            'llm_insights': record['llm_insights']
+        }
+    
+    def shutdown(self):
+        # Queued explanations are dropped; their rows keep the template text and become 'fallback'
+        self.llm_executor.shutdown(wait=False, cancel_futures=True)
+        
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
     
-    def _create_error_response(self, error: str) -> Dict:
+    def _create_error_response(self, error: str, timings: Optional[Dict[str, float]] = None) -> Dict:
         return {
             'action': 'HOLD',
             'confidence': 0.0,
             'reasoning': f"Analysis failed: {error}",
             'risk_level': 'UNKNOWN',
+            'metadata': {'timings': timings or {}},
             'timestamp': datetime.now().isoformat()
         }
     
-    def run_daily_monitoring(self) -> List[Dict]:
+    def run_daily_monitoring(self, on_alert: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Analyze every followed (crop, city) once and fan decisions out to users.
+        
+        Users are streamed in keyset-paginated chunks, each read in its own short
+        session, and analyses run on a bounded worker pool. Alerts go to on_alert as
+        soon as a user's pairs are decided. Progress is checkpointed after every chunk,
+        so a crashed run resumes after the last finished user on the same day.
+        
+        A pair whose input fingerprint matches its latest stored analysis is not
+        recomputed, and its subscribers are not alerted again, except users who
+        joined or changed their profile since the last finished run.
+        """
         logger.info(" Running daily automated monitoring...")
         
-        alerts = []
+        start_time = time.perf_counter()
+        started_at = datetime.now(timezone.utc)
+        run_date = datetime.now().date().isoformat()
         
-        with get_db_session() as db:
-            # Get all active users with notifications enabled
-            users = db.query(User).filter(
-                User.is_active == True,
-                User.notification_enabled == True
-            ).all()
-            
-            logger.info(f"[DATA] Monitoring {len(users)} active users")
-            
-            for user in users:
-                # Get user's favorite crops
-                favorite_crops = user.favorite_crops if user.favorite_crops else []
-                
-                # If no favorites set, skip this user
-                if not favorite_crops:
-                    logger.info(f"⏭ Skipping {user.email} - no favorite crops set")
-                    continue
+        last_run = cache_manager.get("agent:monitoring", "last_run")
+        last_run_at = datetime.fromisoformat(last_run['started_at']) if last_run else None
+        
+        checkpoint = cache_manager.get("agent:monitoring", "checkpoint")
+        if not checkpoint or checkpoint.get('run_date') != run_date:
+            checkpoint = {'run_date': run_date, 'last_user_id': 0, 'users': 0, 'alerts': 0}
+        resumed_from = checkpoint['last_user_id']
+        if resumed_from:
+            logger.info(f" Resuming daily monitoring after user {resumed_from}")
+        
+        # Warm weather for every location up front so analyses never wait on an upstream call
+        with get_db_session_no_commit() as db:
+            cities = weather_prefetch_service.collect_locations(db)
+        forecasts = weather_prefetch_service.prefetch(cities)
+        
+        # Users following the same crop share one price history load
+        context = DataContext()
+        
+        # One future per (crop, city) for the whole run; later chunks reuse earlier analyses
+        analyses: Dict[tuple, Future] = {}
+        unchanged: set = set()
+        price_versions: Dict[str, Optional[str]] = {}
+        users_seen = 0
+        
+        with ThreadPoolExecutor(max_workers=self.MONITORING_MAX_WORKERS, thread_name_prefix="monitoring") as executor:
+            for users in self._iter_user_chunks(checkpoint['last_user_id']):
+                subscribers = self._group_by_crop_city(users)
                 
-                logger.info(f" Analyzing {len(favorite_crops)} crops for {user.email}")
+                new_pairs = [pair for pair in subscribers if pair not in analyses]
+                fingerprints = {
+                    (crop, city): self._input_fingerprint(crop, city, forecasts.get(city), price_versions)
+                    for crop, city in new_pairs
+                }
+                previous = self._previous_analyses(fp for fp in fingerprints.values() if fp)
                 
-                # Get user's location (default to Delhi if not set)
-                city = user.location if user.location else "Delhi"
+                # Each (crop, city) is analyzed once with neutral preferences, unless nothing changed
+                for crop, city in new_pairs:
+                    fingerprint = fingerprints[(crop, city)]
+                    if fingerprint in previous:
+                        unchanged.add((crop, city))
+                        analyses[(crop, city)] = Future()
+                        analyses[(crop, city)].set_result(previous[fingerprint])
+                    else:
+                        analyses[(crop, city)] = executor.submit(
+                            self._analyze_pair, crop, city, forecasts.get(city), context, fingerprint
+                        )
                 
-                # Analyze each favorite crop
-                for crop in favorite_crops:
-                    try:
-                        analysis = self.analyze_crop(crop, city)
-                        
-                        # Create alert if action needed
-                        if analysis['action'] in ['SELL_NOW', 'WAIT'] and analysis['confidence'] > 0.6:
-                            alert = {
-                                'user_id': user.id,
-                                'user_email': user.email,
-                                'crop': crop,
-                                'action': analysis['action'],
-                                'reasoning': analysis.get('llm_insights', analysis['reasoning'])[:500],
-                                'confidence': analysis['confidence'],
-                                'expected_price': analysis.get('expected_price'),
-                                'timestamp': analysis['timestamp']
-                            }
-                            alerts.append(alert)
-                            logger.info(f" Alert created for {user.email}: {crop} - {analysis['action']}")
-                    except Exception as e:
-                        logger.error(f"Error analyzing {crop} for {user.email}: {str(e)}")
+                # Fan out to this chunk's users with their own risk tolerance applied
+                for (crop, city), pair_users in subscribers.items():
+                    analysis = analyses[(crop, city)].result()
+                    if analysis is None:
                         continue
+                    
+                    for user in pair_users:
+                        # They already have this recommendation
+                        if (crop, city) in unchanged and not self._user_changed_since(user, last_run_at):
+                            continue
+                        
+                        alert = self._alert_for_user(user, analysis)
+                        if alert:
+                            checkpoint['alerts'] += 1
+                            self._emit_alert(on_alert, alert)
+                
+                users_seen += len(users)
+                checkpoint['users'] += len(users)
+                checkpoint['last_user_id'] = users[-1].id
+                cache_manager.set("agent:monitoring", "checkpoint", checkpoint, MONITORING_CHECKPOINT_TTL)
+                
+                elapsed = time.perf_counter() - start_time
+                logger.info(
+                    f"[DATA] Monitoring progress: {checkpoint['users']} users, {len(analyses)} crop/city analyses, "
+                    f"{users_seen / elapsed:.1f} users/s"
+                )
+        
+        # Finished runs start from the first user next time
+        cache_manager.delete("agent:monitoring", "checkpoint")
+        cache_manager.set("agent:monitoring", "last_run", {'started_at': started_at.isoformat()}, MONITORING_LAST_RUN_TTL)
+        
+        elapsed = time.perf_counter() - start_time
+        summary = {
+            'users': checkpoint['users'],
+            'pairs': len(analyses),
+            'skipped': len(unchanged),
+            'alerts': checkpoint['alerts'],
+            'resumed_from_user_id': resumed_from,
+            'duration_seconds': round(elapsed, 3),
+            'users_per_second': round(users_seen / elapsed, 2) if elapsed > 0 else 0.0,
+            'price_data': context.stats()
+        }
+        logger.info(f"[OK] Daily monitoring complete! {summary}")
+        
+        return summary
+    
+    def _iter_user_chunks(self, after_id: int = 0):
+        # Keyset pagination: memory stays at one chunk no matter how many users exist
+        while True:
+            with get_db_session_no_commit() as db:
+                users = db.query(
+                    User.id, User.email, User.location, User.favorite_crops, User.risk_tolerance,
+                    User.created_at, User.updated_at
+                ).filter(
+                    User.is_active == True,
+                    User.notification_enabled == True,
+                    User.id > after_id
+                ).order_by(User.id).limit(self.MONITORING_CHUNK_SIZE).all()
+            
+            if not users:
+                return
             
-            logger.info(f"[OK] Daily monitoring complete! Created {len(alerts)} alerts")
-            return alerts
+            yield users
+            after_id = users[-1].id
+    
+    def _input_fingerprint(
+        self,
+        crop: str,
+        city: str,
+        forecast: Optional[ForecastFrame],
+        price_versions: Dict[str, Optional[str]]
+    ) -> Optional[str]:
+        """
+        Hash of everything a pair's analysis depends on, or None when it cannot be
+        trusted (no stored prices, so the analysis runs on fresh synthetic data).
+        """
+        if crop not in price_versions:
+            price_versions[crop] = data_service.price_data_version(crop)
+        if price_versions[crop] is None:
+            return None
+        
+        # The forecast only reaches the decision through these features, so same bucket = same signal
+        if forecast is not None:
+            rain_probability, rain_days, total_rain = decision_engine.weather_features(forecast)
+            forecast_bucket = [round(float(rain_probability), 2), int(rain_days), round(float(total_rain), 1)]
+        else:
+            forecast_bucket = None
+        
+        preferences = hashlib.sha256(json.dumps(NEUTRAL_PREFERENCES, sort_keys=True).encode()).hexdigest()
+        payload = json.dumps([crop, city.lower(), price_versions[crop], forecast_bucket, self.MODEL_VERSION, preferences])
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _previous_analyses(self, fingerprints: Iterable[str]) -> Dict[str, Dict]:
+        """Latest stored analysis per fingerprint, shaped like an analyze_crop result."""
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return {}
+        
+        with get_db_session_no_commit() as db:
+            records = db.query(AgentAnalysis).filter(
+                AgentAnalysis.input_fingerprint.in_(fingerprints)
+            ).order_by(AgentAnalysis.created_at).all()
+            return {record.input_fingerprint: record.to_dict() for record in records}
+    
+    def _user_changed_since(self, user, since: Optional[datetime]) -> bool:
+        changed = user.updated_at or user.created_at
+        if since is None or changed is None:
+            return True
+        
+        # SQLite hands back naive UTC timestamps
+        if changed.tzinfo is None:
+            changed = changed.replace(tzinfo=timezone.utc)
+        return changed >= since
+    
+    def _analyze_pair(
+        self,
+        crop: str,
+        city: str,
+        forecast: Optional[ForecastFrame],
+        context: DataContext,
+        input_fingerprint: Optional[str] = None
+    ) -> Optional[Dict]:
+        try:
+            analysis = self.analyze_crop(
+                crop,
+                city,
+                user_preferences=NEUTRAL_PREFERENCES,
+                weather_forecast=forecast,
+                fetch_weather=False,
+                context=context,
+                input_fingerprint=input_fingerprint
+            )
+        except Exception as e:
+            logger.error(f"Error analyzing {crop} in {city}: {str(e)}")
+            return None
+        
+        if 'decision' not in analysis:
+            logger.warning(f"⏭ No decision for {crop} in {city}: {analysis.get('reasoning')}")
+            return None
+        
+        return analysis
+    
+    def _emit_alert(self, on_alert: Optional[Callable[[Dict], None]], alert: Dict):
+        if on_alert is None:
+            return
+        
+        try:
+            on_alert(alert)
+        except Exception as e:
+            logger.error(f"Alert delivery failed for {alert['user_email']}: {str(e)}")
+    
+    def _group_by_crop_city(self, users) -> Dict[tuple, List]:
+        subscribers: Dict[tuple, List] = {}
+        
+        for user in users:
+            # If no favorites set, skip this user
+            if not user.favorite_crops:
+                logger.info(f"⏭ Skipping {user.email} - no favorite crops set")
+                continue
+            
+            # Same city the prefetch warmed, so "Pune" and " pune" share one analysis
+            city = user_city(user.location)
+            
+            for crop in dict.fromkeys(c.strip().lower() for c in user.favorite_crops if c and c.strip()):
+                subscribers.setdefault((crop, city), []).append(user)
+        
+        return subscribers
+    
+    def _alert_for_user(self, user, analysis: Dict) -> Optional[Dict]:
+        decision = analysis['decision']
+        action, reasoning = decision_engine.apply_risk_tolerance(
+            decision['action'], decision['reason'], user.risk_tolerance or 'medium'
+        )
+        
+        # Create alert if action needed
+        if action not in ['SELL_NOW', 'WAIT'] or decision['confidence'] <= 0.6:
+            return None
+        
+        # The shared explanation was written for the neutral action; fall back to
+        # the adjusted reasoning when risk tolerance changed it
+        explanation = analysis.get('llm_insights') if action == decision['action'] else reasoning
+        
+        logger.info(f" Alert created for {user.email}: {analysis['crop']} - {action}")
+        return {
+            'user_id': user.id,
+            'user_email': user.email,
+            'crop': analysis['crop'],
+            'action': action,
+            'reasoning': (explanation or reasoning)[:500],
+            'confidence': decision['confidence'],
+            'expected_price': decision.get('expected_price'),
+            'timestamp': analysis['timestamp']
+        }
 
 
 # Singleton instance
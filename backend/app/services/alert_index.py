@@ -0,0 +1,373 @@
+import bisect
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import select
+
+from app.core.cache import cache_manager
+from app.core.db_session import get_db_session_no_commit
+from app.core.logging_config import logger
+from app.models.price_alert import PriceAlert
+
+INDEX_NAMESPACE = "alerts:index"
+
+# Snapshot entries are rewritten whenever they change; the TTL only reclaims abandoned ones
+INDEX_TTL = 30 * 24 * 3600
+
+THRESHOLD_TYPES = ("ABOVE", "BELOW")
+
+GroupKey = Tuple[str, str]  # (crop, city)
+
+
+@dataclass
+class SortedThresholds:
+    """Thresholds in ascending order, with each alert id at the same position."""
+    thresholds: List[float] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+
+    def add(self, threshold: float, alert_id: str):
+        i = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.ids.insert(i, alert_id)
+
+    def remove(self, threshold: float, alert_id: str) -> bool:
+        i = bisect.bisect_left(self.thresholds, threshold)
+        while i < len(self.thresholds) and self.thresholds[i] == threshold:
+            if self.ids[i] == alert_id:
+                del self.thresholds[i]
+                del self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass
+class GroupIndex:
+    """ABOVE and BELOW thresholds of one (crop, city) plus the last price they were checked against."""
+    above: SortedThresholds = field(default_factory=SortedThresholds)
+    below: SortedThresholds = field(default_factory=SortedThresholds)
+    last_price: Optional[float] = None
+    checked_at: Optional[datetime] = None
+    # Added or changed since the last check; judged on the price level once instead of on a crossing
+    pending: Set[str] = field(default_factory=set)
+
+    def side(self, alert_type: str) -> SortedThresholds:
+        return self.above if alert_type == "ABOVE" else self.below
+
+    def crossed(self, price: float) -> List[str]:
+        """
+        Alerts whose condition went from false at last_price to true at price.
+
+        ABOVE fires on price > t, so it crosses when last_price <= t < price;
+        BELOW fires on price < t and crosses when price < t <= last_price.
+        Two bisections and a slice per side: O(log n + k).
+        """
+        above, below = self.above, self.below
+
+        if self.last_price is None:
+            # First price for this group: every alert is judged on the level
+            return (above.ids[:bisect.bisect_left(above.thresholds, price)]
+                    + below.ids[bisect.bisect_right(below.thresholds, price):])
+
+        previous = self.last_price
+        crossed = []
+        if price > previous:
+            crossed += above.ids[bisect.bisect_left(above.thresholds, previous):bisect.bisect_left(above.thresholds, price)]
+        elif price < previous:
+            crossed += below.ids[bisect.bisect_right(below.thresholds, price):bisect.bisect_right(below.thresholds, previous)]
+        return crossed
+
+
+class PriceAlertIndex:
+    """
+    Per-(crop, city) sorted index of active ABOVE/BELOW price alert thresholds.
+
+    The alert check asks it which alerts crossed their threshold since the
+    group's last price instead of re-evaluating every alert. The alerts router
+    keeps it current with ``upsert``/``remove``; each change also bumps a
+    generation counter in Redis. A process whose copy missed a change made by
+    another worker notices at ``sync`` and rebuilds from the database. After each
+    check the changed groups and last prices are persisted to Redis, so a
+    restarted worker restores the index without scanning the alerts table and
+    keeps crossing from the prices it last saw.
+
+    Without Redis each process relies on its own copy, which is exact as long as
+    alerts are only changed through the process that runs the check.
+    """
+
+    def __init__(self):
+        self._groups: Dict[GroupKey, GroupIndex] = {}
+        self._entries: Dict[str, Tuple[GroupKey, str, float]] = {}  # id -> (group, type, threshold)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stale = False
+        self._generation: Optional[int] = None  # Shared generation this copy reflects
+        self._dirty: Set[GroupKey] = set()
+        self._checked: Set[GroupKey] = set()
+        self.rebuilds = 0
+        self.restores = 0
+
+    # ------------------------------------------------------------------
+    # Alert check
+    # ------------------------------------------------------------------
+
+    def sync(self):
+        """Make this copy current: keep it, restore the Redis snapshot, or rebuild from the database."""
+        with self._lock:
+            shared = self._shared_generation()
+            if self._loaded and not self._stale and (shared is None or shared == self._generation):
+                return
+            if not self._loaded and shared is not None and self._restore(shared):
+                return
+            self._rebuild(shared)
+
+    def invalidate(self):
+        """Rebuild from the database on the next sync, e.g. after finding alerts in the wrong group."""
+        with self._lock:
+            self._stale = True
+
+    def groups(self) -> List[GroupKey]:
+        with self._lock:
+            return list(self._groups)
+
+    def crossed(self, key: GroupKey, price: float) -> List[str]:
+        """Ids of alerts in the group that fire at price and did not at the previous one."""
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                return []
+
+            ids = group.crossed(price)
+            for alert_id in group.pending:
+                _, alert_type, threshold = self._entries[alert_id]
+                if (price > threshold) if alert_type == "ABOVE" else (price < threshold):
+                    ids.append(alert_id)
+
+            # Only threshold or pending changes rewrite the group; last prices are stored separately
+            if group.pending:
+                group.pending.clear()
+                self._dirty.add(key)
+            group.last_price = price
+            self._checked.add(key)
+
+            return list(dict.fromkeys(ids))
+
+    def mark_pending(self, alert_ids: Iterable[str]):
+        """Crossed alerts that were not delivered; they are judged on the level again next check."""
+        with self._lock:
+            for alert_id in alert_ids:
+                entry = self._entries.get(alert_id)
+                if entry is not None and alert_id not in self._groups[entry[0]].pending:
+                    self._groups[entry[0]].pending.add(alert_id)
+                    self._dirty.add(entry[0])
+
+    def persist(self, checked_at: Optional[datetime] = None):
+        """
+        Write groups whose thresholds or pending alerts changed, and every group's
+        last price, to Redis. A check that only moves prices writes the small
+        prices entry, not the threshold lists.
+        """
+        checked_at = checked_at or datetime.now(timezone.utc)
+
+        with self._lock:
+            for key in self._checked:
+                if key in self._groups:
+                    self._groups[key].checked_at = checked_at
+            self._checked.clear()
+
+            for key in self._dirty:
+                group = self._groups.get(key)
+                if group is not None:
+                    cache_manager.set(INDEX_NAMESPACE, f"group:{self._key_str(key)}", self._dump_group(group), INDEX_TTL)
+            self._dirty.clear()
+
+            cache_manager.set(INDEX_NAMESPACE, "prices", {
+                self._key_str(key): [group.last_price, group.checked_at.isoformat() if group.checked_at else None]
+                for key, group in self._groups.items() if group.last_price is not None
+            }, INDEX_TTL)
+            cache_manager.set(INDEX_NAMESPACE, "manifest", {
+                "generation": self._generation,
+                "groups": [self._key_str(key) for key in self._groups],
+            }, INDEX_TTL)
+
+    # ------------------------------------------------------------------
+    # Incremental updates from the alerts router
+    # ------------------------------------------------------------------
+
+    def upsert(self, alert: PriceAlert):
+        """Index a created or updated alert (or drop it if it is inactive or not a threshold alert)."""
+        alert_id = str(alert.id)
+        with self._lock:
+            if self._loaded:
+                self._remove_entry(alert_id)
+                if alert.is_active and alert.alert_type in THRESHOLD_TYPES and alert.threshold_price is not None:
+                    key = (alert.crop, alert.city)
+                    self._add_entry(key, alert_id, alert.alert_type, float(alert.threshold_price))
+                    self._groups[key].pending.add(alert_id)
+            self._bump_generation()
+
+    def remove(self, alert_id):
+        with self._lock:
+            if self._loaded:
+                self._remove_entry(str(alert_id))
+            self._bump_generation()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "alerts": len(self._entries),
+                "groups": len(self._groups),
+                "generation": self._generation,
+                "stale": self._stale,
+                "rebuilds": self.rebuilds,
+                "restores": self.restores,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold the lock)
+    # ------------------------------------------------------------------
+
+    def _add_entry(self, key: GroupKey, alert_id: str, alert_type: str, threshold: float):
+        group = self._groups.setdefault(key, GroupIndex())
+        group.side(alert_type).add(threshold, alert_id)
+        self._entries[alert_id] = (key, alert_type, threshold)
+        self._dirty.add(key)
+
+    def _remove_entry(self, alert_id: str):
+        entry = self._entries.pop(alert_id, None)
+        if entry is None:
+            return
+        key, alert_type, threshold = entry
+        group = self._groups[key]
+        group.side(alert_type).remove(threshold, alert_id)
+        group.pending.discard(alert_id)
+        self._dirty.add(key)
+
+    def _bump_generation(self):
+        shared = cache_manager.incr(INDEX_NAMESPACE, "generation")
+        if shared is None:
+            return  # No Redis: this copy is the only one
+
+        # Still exact only if no other process changed alerts since this copy was made
+        if self._loaded and self._generation is not None and shared == self._generation + 1:
+            self._generation = shared
+        else:
+            self._stale = True
+
+    def _shared_generation(self) -> Optional[int]:
+        # Adding zero reads the counter (0 if it was never set); None without Redis
+        return cache_manager.incr(INDEX_NAMESPACE, "generation", 0)
+
+    def _restore(self, shared: int) -> bool:
+        manifest = cache_manager.get(INDEX_NAMESPACE, "manifest")
+        if not manifest or manifest.get("generation") != shared:
+            return False
+
+        groups = {}
+        for key_str in manifest["groups"]:
+            data = cache_manager.get(INDEX_NAMESPACE, f"group:{key_str}")
+            if data is None:
+                return False
+            groups[self._parse_key(key_str)] = self._load_group(data)
+
+        for key_str, (price, checked_at) in (cache_manager.get(INDEX_NAMESPACE, "prices") or {}).items():
+            group = groups.get(self._parse_key(key_str))
+            if group is not None:
+                group.last_price, group.checked_at = price, _utc(checked_at) if checked_at else None
+
+        self._groups = groups
+        self._entries = {
+            alert_id: (key, alert_type, threshold)
+            for key, group in groups.items()
+            for alert_type in THRESHOLD_TYPES
+            for threshold, alert_id in zip(group.side(alert_type).thresholds, group.side(alert_type).ids)
+        }
+        self._generation, self._loaded, self._stale = shared, True, False
+        self.restores += 1
+        logger.info(f"Price alert index restored from Redis: {len(self._entries)} alerts in {len(groups)} groups")
+        return True
+
+    def _rebuild(self, shared: Optional[int]):
+        with get_db_session_no_commit() as db:
+            rows = db.execute(
+                select(PriceAlert.id, PriceAlert.crop, PriceAlert.city, PriceAlert.alert_type,
+                       PriceAlert.threshold_price, PriceAlert.updated_at)
+                .where(
+                    PriceAlert.is_active == True,
+                    PriceAlert.alert_type.in_(THRESHOLD_TYPES),
+                    PriceAlert.threshold_price.isnot(None)
+                )
+                .order_by(PriceAlert.threshold_price)
+            ).all()
+
+        # Keep what the previous copy (or the persisted prices) knew about each group;
+        # pending alerts follow their id, since an alert may have moved to another group
+        previous = {key: (g.last_price, g.checked_at) for key, g in self._groups.items()}
+        for key_str, (price, checked_at) in (cache_manager.get(INDEX_NAMESPACE, "prices") or {}).items():
+            previous.setdefault(self._parse_key(key_str), (price, _utc(checked_at) if checked_at else None))
+        pending = set().union(*(g.pending for g in self._groups.values()))
+
+        self._groups, self._entries = {}, {}
+        for alert_id, crop, city, alert_type, threshold, updated_at in rows:
+            key, alert_id = (crop, city), str(alert_id)
+            # Rows arrive sorted by threshold, so appending keeps every side sorted
+            group = self._groups.get(key)
+            if group is None:
+                last_price, checked_at = previous.get(key, (None, None))
+                group = self._groups[key] = GroupIndex(last_price=last_price, checked_at=checked_at)
+            side = group.side(alert_type)
+            side.thresholds.append(float(threshold))
+            side.ids.append(alert_id)
+            self._entries[alert_id] = (key, alert_type, float(threshold))
+
+            # Changed since the group was last checked, possibly by another worker
+            if alert_id in pending or (
+                group.checked_at is not None and updated_at is not None and _utc(updated_at) > group.checked_at
+            ):
+                group.pending.add(alert_id)
+
+        self._generation, self._loaded, self._stale = shared, True, False
+        self._dirty = set(self._groups)
+        self.rebuilds += 1
+        logger.info(f"Price alert index rebuilt from the database: {len(self._entries)} alerts in {len(self._groups)} groups")
+
+    @staticmethod
+    def _dump_group(group: GroupIndex) -> Dict:
+        return {
+            "above": [group.above.thresholds, group.above.ids],
+            "below": [group.below.thresholds, group.below.ids],
+            "pending": sorted(group.pending),
+        }
+
+    @staticmethod
+    def _load_group(data: Dict) -> GroupIndex:
+        return GroupIndex(
+            above=SortedThresholds(*data["above"]),
+            below=SortedThresholds(*data["below"]),
+            pending=set(data["pending"]),
+        )
+
+    @staticmethod
+    def _key_str(key: GroupKey) -> str:
+        return f"{key[0]}|{key[1]}"
+
+    @staticmethod
+    def _parse_key(key_str: str) -> GroupKey:
+        crop, city = key_str.split("|", 1)
+        return crop, city
+
+
+def _utc(value) -> pd.Timestamp:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp
+
+
+# Singleton instance
+price_alert_index = PriceAlertIndex()
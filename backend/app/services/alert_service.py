@@ -1,125 +1,282 @@
+import json
 import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select, update
 
 from app.models.price_alert import PriceAlert
+from app.models.user import User
+from app.models.notification import Notification
 from app.services.price_service import PriceService
+from app.services.data_context import DataContext
 from app.services.email_service import EmailService
-from app.database import SessionLocal
+from app.services.alert_index import PriceAlertIndex, price_alert_index
+from app.core.db_session import get_db_session, get_db_session_no_commit
 
 logger = logging.getLogger(__name__)
 
+# Triggered alerts are notified and committed this many at a time
+ALERT_BATCH_SIZE = 500
+
+# Crossed alerts are loaded by id in chunks of this size
+ALERT_ID_CHUNK = 500
+
+# An alert fires at most once per cooldown
+ALERT_COOLDOWN = timedelta(hours=1)
+
+ALERT_COLUMNS = (
+    PriceAlert.id, PriceAlert.user_id, PriceAlert.crop, PriceAlert.city, PriceAlert.alert_type,
+    PriceAlert.threshold_price, PriceAlert.threshold_percentage, PriceAlert.notification_method,
+    PriceAlert.last_triggered_at, User.email,
+)
+
 
 class AlertService:
-    def __init__(self):
+    def __init__(self, index: Optional[PriceAlertIndex] = None):
         self.price_service = PriceService()
         self.email_service = EmailService()
-    
-    async def check_all_alerts(self) -> dict:
-        db = SessionLocal()
-        triggered_count = 0
-        checked_count = 0
-        
+        self.index = index or price_alert_index
+
+    async def check_all_alerts(self, context: Optional[DataContext] = None) -> dict:
+        """
+        Evaluate active price alerts against the latest prices.
+
+        ABOVE/BELOW alerts come from the threshold index: per (crop, city) it
+        returns only the alerts whose threshold the price crossed since the last
+        check, so they cost O(log n + k) per group instead of a scan. CHANGE
+        alerts depend on the day-over-day move and are still evaluated in full.
+        Candidates are compared as arrays against their group's prices, and
+        triggered alerts are notified and committed in batches of ALERT_BATCH_SIZE.
+        """
+        start_time = time.perf_counter()
+        now = datetime.now(timezone.utc)
+
+        # One price load per crop for the whole sweep
+        context = context or DataContext()
+
+        self.index.sync()
+        change_alerts = self._load_active_alerts(PriceAlert.alert_type == 'CHANGE')
+        index_groups = self.index.groups()
+        groups = list(dict.fromkeys(index_groups + list(zip(change_alerts['crop'], change_alerts['city']))))
+
+        # CHANGE alerts need the previous day too, so load two days up front
+        for crop in dict.fromkeys(crop for crop, _ in groups):
+            context.expect(crop, 2)
+        prices = {group: self._group_prices(*group, context) for group in groups}
+
+        candidate_ids = []
+        triggered_ids = set()
         try:
-            # Get all active alerts
-            alerts = db.query(PriceAlert).filter(
-                PriceAlert.is_active == True
-            ).all()
-            
-            logger.info(f"Checking {len(alerts)} active price alerts")
-            
-            for alert in alerts:
-                checked_count += 1
-                
-                # Skip if triggered recently (within 1 hour)
-                if alert.last_triggered_at and \
-                   datetime.now(timezone.utc) - alert.last_triggered_at < timedelta(hours=1):
-                    continue
-                
-                # Get current price
-                try:
-                    current_price = await self._get_current_price(alert.crop, alert.city)
-                    
-                    if current_price is None:
-                        logger.warning(f"No price data for {alert.crop} in {alert.city}")
-                        continue
-                    
-                    # Check if alert should trigger
-                    should_trigger, message = self._should_trigger_alert(alert, current_price)
-                    
-                    if should_trigger:
-                        await self._trigger_alert(alert, current_price, message, db)
-                        triggered_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error checking alert {alert.id}: {e}")
-                    continue
-            
-            logger.info(f"Alert check complete: {triggered_count}/{checked_count} triggered")
-            
-            return {
-                "checked": checked_count,
-                "triggered": triggered_count,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }
-            
+            for group in index_groups:
+                current_price = prices[group][0]
+                if not np.isnan(current_price):
+                    candidate_ids += self.index.crossed(group, current_price)
+
+            alerts = pd.concat(
+                [change_alerts, self._load_alerts_by_id(candidate_ids)], ignore_index=True
+            ) if candidate_ids else change_alerts
+            logger.info(
+                f"Checking {len(alerts)} price alerts ({len(candidate_ids)} crossed thresholds, "
+                f"{len(change_alerts)} change alerts) across {len(groups)} (crop, city) groups"
+            )
+
+            # Another worker may have moved a candidate to a (crop, city) this check has no
+            # prices for; it stays pending and is judged in its new group after a rebuild
+            known = np.array([group in prices for group in zip(alerts['crop'], alerts['city'])], dtype=bool)
+            if not known.all():
+                logger.warning(f"{int((~known).sum())} price alerts changed crop or city since the index synced; rebuilding it")
+                self.index.invalidate()
+                alerts = alerts[known].reset_index(drop=True)
+
+            if not alerts.empty:
+                group_prices = np.array([prices[group] for group in zip(alerts['crop'], alerts['city'])], dtype=float)
+                current, previous = group_prices[:, 0], group_prices[:, 1]
+
+                fired, change_percent = self._evaluate(alerts, current, previous, now)
+                triggered_idx = np.flatnonzero(fired)
+
+                for batch_start in range(0, len(triggered_idx), ALERT_BATCH_SIZE):
+                    batch = triggered_idx[batch_start:batch_start + ALERT_BATCH_SIZE]
+                    try:
+                        triggered_ids.update(await self._trigger_batch(alerts.iloc[batch], current[batch], change_percent[batch], now))
+                    except Exception as e:
+                        logger.error(f"Error triggering alert batch of {len(batch)}: {e}")
         finally:
-            db.close()
-    
-    async def _get_current_price(self, crop: str, city: str) -> float | None:
+            # crossed() has already moved each group's last price on, so a candidate that was
+            # not delivered (cooldown, a failed batch, an error here) would otherwise
+            # never fire again; it is judged on the level next run instead
+            self.index.mark_pending(alert_id for alert_id in candidate_ids if alert_id not in triggered_ids)
+            self.index.persist()
+
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            f"Alert check complete: {len(triggered_ids)}/{len(alerts)} triggered across {len(groups)} (crop, city) groups "
+            f"in {elapsed:.2f}s (price data: {context.stats()})"
+        )
+
+        return {
+            "checked": len(alerts),
+            "triggered": len(triggered_ids),
+            "groups": len(groups),
+            "indexed": self.index.stats()["alerts"],
+            "candidates": len(candidate_ids),
+            "duration_seconds": round(elapsed, 3),
+            "timestamp": now.isoformat()
+        }
+
+    def _load_active_alerts(self, *criteria) -> pd.DataFrame:
+        with get_db_session_no_commit() as db:
+            rows = db.execute(
+                select(*ALERT_COLUMNS)
+                .join(User, User.id == PriceAlert.user_id)
+                .where(PriceAlert.is_active == True, *criteria)
+            ).all()
+
+        alerts = pd.DataFrame.from_records(rows, columns=[column.key for column in ALERT_COLUMNS])
+        # SQLite hands back naive datetimes; they are stored as UTC
+        alerts['last_triggered_at'] = pd.to_datetime(alerts['last_triggered_at'], utc=True)
+        return alerts
+
+    def _load_alerts_by_id(self, alert_ids: List[str]) -> pd.DataFrame:
+        """Active alerts among alert_ids (index ids are strings), loaded ALERT_ID_CHUNK at a time."""
+        chunks = [
+            self._load_active_alerts(PriceAlert.id.in_([uuid.UUID(alert_id) for alert_id in alert_ids[i:i + ALERT_ID_CHUNK]]))
+            for i in range(0, len(alert_ids), ALERT_ID_CHUNK)
+        ]
+        return pd.concat(chunks, ignore_index=True)
+
+    def _group_prices(self, crop: str, city: str, context: DataContext) -> Tuple[float, float]:
+        """(latest price, price a day earlier) for one (crop, city) group; NaN where unknown."""
         try:
-            # Get latest price from database
-            prices_df = self.price_service.data_integration_service.get_price_data(crop, days=1)
-            
-            if prices_df.empty:
-                return None
-            
+            latest_df = context.get_price_data(crop, days=1)
+            if latest_df.empty:
+                logger.warning(f"No price data for {crop} in {city}")
+                return np.nan, np.nan
+
             # Get most recent price
-            latest = prices_df.iloc[-1]
-            return float(latest['price'])
-            
+            current_price = float(latest_df.iloc[-1]['price'])
+
+            # Get price from 24 hours ago
+            window_df = context.get_price_data(crop, days=2)
+            previous_price = float(window_df.iloc[0]['price']) if len(window_df) >= 2 else np.nan
+
+            return current_price, previous_price
+
         except Exception as e:
             logger.error(f"Error getting price for {crop}: {e}")
-            return None
-    
-    def _should_trigger_alert(self, alert: PriceAlert, current_price: float) -> tuple[bool, str]:
+            return np.nan, np.nan
+
+    def _evaluate(
+        self,
+        alerts: pd.DataFrame,
+        current: np.ndarray,
+        previous: np.ndarray,
+        now: datetime
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Which alerts fire, plus each alert's day-over-day change in percent (NaN if unknown)."""
+        alert_type = alerts['alert_type'].to_numpy()
+        threshold_price = alerts['threshold_price'].to_numpy(dtype=float, na_value=np.nan)
+        threshold_percentage = alerts['threshold_percentage'].to_numpy(dtype=float, na_value=np.nan)
+
+        # A zero previous price has no meaningful change
+        safe_previous = np.where(previous > 0, previous, np.nan)
+        change_percent = (current - safe_previous) / safe_previous * 100
+
+        # Comparisons with NaN are False, so alerts without prices or thresholds never fire
+        fired = (
+            ((alert_type == 'ABOVE') & (current > threshold_price))
+            | ((alert_type == 'BELOW') & (current < threshold_price))
+            | ((alert_type == 'CHANGE') & (np.abs(change_percent) >= threshold_percentage))
+        )
+
+        # Skip if triggered recently (within the cooldown)
+        last_triggered = alerts['last_triggered_at']
+        cooling_down = (last_triggered.notna() & (pd.Timestamp(now) - last_triggered < ALERT_COOLDOWN)).to_numpy()
+
+        return fired & ~cooling_down, change_percent
+
+    def _message(self, alert, current_price: float, change_percent: float) -> str:
         if alert.alert_type == 'ABOVE':
-            if current_price > alert.threshold_price:
-                return True, f"Price Rs.{current_price:.2f} is above your threshold of Rs.{alert.threshold_price:.2f}"
-        
-        elif alert.alert_type == 'BELOW':
-            if current_price < alert.threshold_price:
-                return True, f"Price Rs.{current_price:.2f} is below your threshold of Rs.{alert.threshold_price:.2f}"
-        
-        elif alert.alert_type == 'CHANGE':
-            # Get price from 24 hours ago
+            return f"Price Rs.{current_price:.2f} is above your threshold of Rs.{alert.threshold_price:.2f}"
+        if alert.alert_type == 'BELOW':
+            return f"Price Rs.{current_price:.2f} is below your threshold of Rs.{alert.threshold_price:.2f}"
+
+        direction = "increased" if change_percent > 0 else "decreased"
+        return f"Price {direction} by {abs(change_percent):.1f}% (Rs.{current_price:.2f})"
+
+    async def _trigger_batch(
+        self,
+        batch: pd.DataFrame,
+        current: np.ndarray,
+        change_percent: np.ndarray,
+        now: datetime
+    ) -> List[str]:
+        """
+        Notify a batch of fired alerts; returns the ids of those triggered.
+
+        In-app notifications and trigger times are committed before any email is
+        sent, so a failed commit sends nothing and the whole batch is retried
+        cleanly next run, while a failed email never causes a repeat of the others.
+        """
+        notifications: List[Dict] = []
+        emails = []
+
+        for alert, current_price, change in zip(batch.itertuples(index=False), current, change_percent):
+            current_price = float(current_price)
+            message = self._message(alert, current_price, change)
+
+            # In-app notification
+            threshold_price = 0 if pd.isna(alert.threshold_price) else alert.threshold_price
+            notifications.append({
+                "user_id": int(alert.user_id),
+                "type": 'price_alert',
+                "title": f" {alert.crop.upper()} Price Alert",
+                "message": message,
+                "priority": 'high' if abs(current_price - threshold_price) > 100 else 'normal',
+                "is_read": False,
+                "created_at": now,
+                "extra_data": json.dumps({
+                    "crop": alert.crop,
+                    "city": alert.city,
+                    "current_price": current_price,
+                    "alert_type": alert.alert_type
+                }),
+            })
+
+            if alert.notification_method in ['EMAIL', 'BOTH']:
+                emails.append((alert, current_price, message))
+
+        if not notifications:
+            return []
+
+        # One transaction per batch: notifications and trigger times land together
+        alert_ids = batch['id'].tolist()
+        with get_db_session() as db:
+            db.execute(insert(Notification), notifications)
+            db.execute(update(PriceAlert).where(PriceAlert.id.in_(alert_ids)).values(last_triggered_at=now))
+
+        logger.info(f"{len(alert_ids)} price alerts triggered - in-app notifications created")
+
+        # Emails go out once the trigger is recorded; a failed one is logged, not retried
+        for alert, current_price, message in emails:
             try:
-                prices_df = self.price_service.data_integration_service.get_price_data(
-                    alert.crop, days=2
+                await self.email_service.send_email(
+                    to_email=alert.email,
+                    subject=f"Price Alert: {alert.crop.upper()} in {alert.city}",
+                    html_content=self._email_html(alert, current_price, message, now)
                 )
-                
-                if len(prices_df) >= 2:
-                    previous_price = float(prices_df.iloc[0]['price'])
-                    change_percent = ((current_price - previous_price) / previous_price) * 100
-                    
-                    if abs(change_percent) >= alert.threshold_percentage:
-                        direction = "increased" if change_percent > 0 else "decreased"
-                        return True, f"Price {direction} by {abs(change_percent):.1f}% (Rs.{current_price:.2f})"
-            
             except Exception as e:
-                logger.error(f"Error calculating price change: {e}")
-        
-        return False, ""
-    
-    async def _trigger_alert(self, alert: PriceAlert, current_price: float, message: str, db: Session):
-        try:
-            # Send email notification
-            if alert.notification_method in ['EMAIL', 'BOTH']:
-                user_email = alert.user.email
-                subject = f"Price Alert: {alert.crop.upper()} in {alert.city}"
-                
-                html_content = f"""
+                logger.error(f"Error sending alert notification for {alert.id}: {e}")
+
+        return [str(alert_id) for alert_id in alert_ids]
+
+    def _email_html(self, alert, current_price: float, message: str, now: datetime) -> str:
+        return f"""
                 <h2> Price Alert Triggered</h2>
                 <p><strong>{message}</strong></p>
                 <hr>
@@ -129,36 +286,10 @@ class AlertService:
                 <p><strong>Alert Type:</strong> {alert.alert_type}</p>
                 <hr>
                 <p style="color: #666; font-size: 12px;">
-                    This alert was triggered at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}.
+                    This alert was triggered at {now.strftime('%Y-%m-%d %H:%M UTC')}.
                     You can manage your alerts in your dashboard.
                 </p>
                 """
-                
-                await self.email_service.send_email(
-                    to_email=user_email,
-                    subject=subject,
-                    html_content=html_content
-                )
-            
-            # Create in-app notification
-            from app.models.notification import Notification
-            notification = Notification(
-                user_id=alert.user_id,
-                type='price_alert',
-                title=f" {alert.crop.upper()} Price Alert",
-                message=message,
-                priority='high' if abs(current_price - (alert.threshold_price or 0)) > 100 else 'normal',
-                extra_data=f'{{"crop": "{alert.crop}", "city": "{alert.city}", "current_price": {current_price}, "alert_type": "{alert.alert_type}"}}'
-            )
-            db.add(notification)
-            
-            alert.last_triggered_at = datetime.now(timezone.utc)
-            db.commit()
-            
-            logger.info(f"Alert {alert.id} triggered for user {alert.user_id} - in-app notification created")
-            
-        except Exception as e:
-            logger.error(f"Error sending alert notification: {e}")
 
 
 # Singleton instance
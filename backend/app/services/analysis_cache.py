@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.cache import cache_manager
+from app.core.logging_config import logger
+from app.services.weather_service import normalize_city
+
+# Keys already change with the inputs; the TTL only bounds how long stale entries linger
+ANALYSIS_CACHE_TTL = 15 * 60
+
+
+class AnalysisResultCache:
+    """
+    Shared cache of finished agent analyses.
+
+    Keys carry the request (crop, city, horizon, risk tolerance) plus the price
+    watermark and weather generation the analysis was computed from, so an
+    entry is reused exactly until one of its inputs changes. Identical requests
+    that arrive while the first is still computing await its result instead of
+    starting their own, whichever event loop or thread they run on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(crop: str, city: str, days: int, risk_tolerance: Optional[str], price_watermark: str, weather_generation: int) -> str:
+        # Same city normalization as the weather generation the key embeds
+        return f"{crop.lower()}:{normalize_city(city)}:{days}:{risk_tolerance or 'medium'}:{price_watermark}:{weather_generation}"
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict]],
+        store_key: Optional[Callable[[], Awaitable[str]]] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Return (analysis, computed_by_this_call) for key, computing it at most once.
+
+        ``store_key`` re-derives the key once the analysis is done, for inputs the
+        computation itself may have moved on (fetching a forecast bumps its
+        generation); the result is stored under that key. Error responses (no
+        'decision') are shared with coalesced callers but never stored.
+        """
+        cached = await asyncio.to_thread(cache_manager.get, "agent:analysis", key)
+        if cached is not None:
+            self.hits += 1
+            return cached, False
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            self.coalesced += 1
+            logger.info(f"Analysis request coalesced onto in-flight {key}")
+            return await asyncio.wrap_future(future), False
+
+        try:
+            self.misses += 1
+            result = await compute()
+            if 'decision' in result:
+                try:
+                    final_key = await store_key() if store_key is not None else key
+                    await asyncio.to_thread(cache_manager.set, "agent:analysis", final_key, result, ANALYSIS_CACHE_TTL)
+                except Exception as e:
+                    logger.warning(f"Analysis for {key} not cached: {e}")
+            future.set_result(result)
+            return result, True
+
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+# Singleton instance
+analysis_cache = AnalysisResultCache()
@@ -0,0 +1,160 @@
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, insert, select, update
+
+from app.core.batch_writer import BatchWriter
+from app.core.config import settings
+from app.core.db_session import get_db_session, get_db_session_no_commit
+from app.core.logging_config import logger
+from app.models.agent_analysis import AgentAnalysis
+
+# Columns an amend may change after the row was queued
+AMENDABLE = ("llm_insights", "llm_insights_status")
+
+
+class AnalysisStore:
+    """
+    Write-behind persistence for AgentAnalysis rows.
+
+    Request paths only enqueue; a BatchWriter inserts the rows in bulk when a
+    batch fills up or the interval passes, and journals them to a spool file so
+    rows accepted before a crash are inserted on the next start. Later changes to
+    a row (the LLM explanation) are queued behind its insert, so they apply in
+    order whether or not the insert has been flushed yet. Rows that are still
+    queued are served from memory by ``get``.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.ANALYSIS_WRITE_BATCH_SIZE,
+        flush_interval: float = settings.ANALYSIS_WRITE_INTERVAL_SECONDS,
+        max_pending: int = settings.ANALYSIS_WRITE_MAX_PENDING,
+        spool_path: Optional[str] = settings.ANALYSIS_SPOOL_PATH
+    ):
+        self.writer = BatchWriter(
+            "agent_analyses",
+            self._write,
+            max_batch=batch_size,
+            flush_interval=flush_interval,
+            max_queue=max_pending,
+            spool_path=spool_path
+        )
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, rows: List[Dict]) -> int:
+        """Queue rows for insertion; returns how many were accepted."""
+        accepted = 0
+        for row in rows:
+            row = {**row, 'created_at': row.get('created_at') or datetime.now(timezone.utc)}
+            with self._lock:
+                self._pending[row['analysis_key']] = row
+            if self.writer.submit({'op': 'insert', 'row': row}):
+                accepted += 1
+            else:
+                with self._lock:
+                    self._pending.pop(row['analysis_key'], None)
+        return accepted
+
+    def amend(self, analysis_key: str, **values) -> bool:
+        values = {name: values[name] for name in AMENDABLE if name in values}
+        with self._lock:
+            row = self._pending.get(analysis_key)
+            if row is not None:
+                row.update(values)
+        return self.writer.submit({'op': 'update', 'analysis_key': analysis_key, 'values': values})
+
+    def amend_now(self, analysis_key: str, **values):
+        """Apply an amend synchronously, for when the write queue refused it."""
+        values = {name: values[name] for name in AMENDABLE if name in values}
+        with self._lock:
+            row = self._pending.get(analysis_key)
+            if row is not None:
+                row.update(values)  # The queued insert carries it
+        with get_db_session() as db:
+            db.execute(update(AgentAnalysis).where(AgentAnalysis.analysis_key == analysis_key).values(**values))
+
+    def get(self, analysis_key: str) -> Optional[Dict]:
+        """Insights fields of one analysis, whether or not it has been written yet."""
+        with self._lock:
+            row = self._pending.get(analysis_key)
+            if row is not None:
+                return {name: row.get(name) for name in AMENDABLE}
+
+        with get_db_session_no_commit() as db:
+            record = db.query(AgentAnalysis).filter(AgentAnalysis.analysis_key == analysis_key).first()
+            if record is None:
+                return None
+            return {name: getattr(record, name) for name in AMENDABLE}
+
+    def recover(self) -> int:
+        return self.writer.recover()
+
+    def flush(self) -> int:
+        return self.writer.flush()
+
+    def stop(self):
+        self.writer.stop()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            unwritten_rows = len(self._pending)
+        return {'unwritten_rows': unwritten_rows, **self.writer.stats()}
+
+    def _write(self, items: List[Dict]):
+        inserts: Dict[str, Dict] = {}
+        updates: List[Dict] = []
+
+        for item in items:
+            if item['op'] == 'insert':
+                inserts[item['row']['analysis_key']] = self._restore(item['row'])
+            elif item['analysis_key'] in inserts:
+                # The row has not been written yet, fold the change into it
+                inserts[item['analysis_key']].update(item['values'])
+            else:
+                updates.append(item)
+
+        self._execute(inserts, updates)
+
+        # A failed batch is retried by the writer, so its rows stay readable from memory until written
+        with self._lock:
+            for key in inserts:
+                self._pending.pop(key, None)
+
+        logger.info(f" Saved {len(inserts)} analyses ({len(updates)} updates) to database")
+
+    def _execute(self, inserts: Dict[str, Dict], updates: List[Dict]):
+        with get_db_session() as db:
+            if inserts:
+                # Spooled rows may already be in the database if we crashed after a commit
+                existing = set(db.scalars(
+                    select(AgentAnalysis.analysis_key).where(AgentAnalysis.analysis_key.in_(list(inserts)))
+                ))
+                rows = [row for key, row in inserts.items() if key not in existing]
+                if rows:
+                    db.execute(insert(AgentAnalysis), rows)
+
+            for name in AMENDABLE:
+                params = [
+                    {'key': item['analysis_key'], 'value': item['values'][name]}
+                    for item in updates if name in item['values']
+                ]
+                if params:
+                    table = AgentAnalysis.__table__
+                    db.connection().execute(
+                        update(table).where(table.c.analysis_key == bindparam('key')).values({name: bindparam('value')}),
+                        params
+                    )
+
+    def _restore(self, row: Dict) -> Dict:
+        # Rows read back from the spool carry the timestamp as text
+        created_at = row.get('created_at')
+        if isinstance(created_at, str):
+            row = {**row, 'created_at': datetime.fromisoformat(created_at)}
+        return row
+
+
+# Singleton instance
+analysis_store = AnalysisStore()
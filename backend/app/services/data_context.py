@@ -0,0 +1,74 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from app.services.data_integration_service import data_service
+from app.core.logging_config import logger
+
+
+class DataContext:
+    """
+    Request- or job-scoped memo of price series.
+
+    Each (crop, source) pair is loaded once at the widest window asked for so
+    far; shorter windows are served as slices using the same date cutoff as the
+    database query (``date >= today - days``). Safe to share between the worker
+    threads of one analysis or one monitoring job. Not meant to outlive it, since
+    nothing here expires.
+    """
+
+    def __init__(self, source=data_service):
+        self._source = source
+        self._series: Dict[Tuple[str, bool], Tuple[int, pd.DataFrame]] = {}
+        self._expected: Dict[Tuple[str, bool], int] = {}
+        self._key_locks: Dict[Tuple[str, bool], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def expect(self, crop: str, days: int, force_synthetic: bool = False):
+        """Declare a window that will be needed so the first load already covers it."""
+        key = self._key(crop, force_synthetic)
+        with self._lock:
+            self._expected[key] = max(days, self._expected.get(key, 0))
+
+    def get_price_data(self, crop: str, days: int = 180, force_synthetic: bool = False) -> pd.DataFrame:
+        key = self._key(crop, force_synthetic)
+
+        with self._key_lock(key):
+            loaded = self._series.get(key)
+
+            if loaded is not None and loaded[0] >= days:
+                self.hits += 1
+                window, df = loaded
+                return df if window == days else self.slice(df, days)
+
+            window = max(days, self._expected.get(key, 0))
+            df = self._source.get_price_data(crop, days=window, force_synthetic=force_synthetic)
+            self._series[key] = (window, df)
+            self.loads += 1
+
+        logger.info(f"DataContext loaded {crop} ({window} days, {len(df)} rows)")
+        return df if window == days else self.slice(df, days)
+
+    def stats(self) -> Dict[str, int]:
+        return {"loads": self.loads, "hits": self.hits, "series": len(self._series)}
+
+    def _key_lock(self, key: Tuple[str, bool]) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _key(self, crop: str, force_synthetic: bool) -> Tuple[str, bool]:
+        return crop.lower(), force_synthetic
+
+    @staticmethod
+    def slice(df: pd.DataFrame, days: int) -> pd.DataFrame:
+        """The last ``days`` of a loaded series, cut the same way as the database query."""
+        if df.empty:
+            return df
+
+        cutoff = pd.Timestamp(datetime.now().date() - timedelta(days=days))
+        # Boolean mask keeps the loaded row order and returns a new frame
+        return df[pd.to_datetime(df['date']) >= cutoff]
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.core.db_session import get_db_session, get_db_session_no_commit
 from app.models.price_data import PriceData
@@ -218,6 +219,24 @@ class DataIntegrationService:
         
         return synthetic_data
     
+    def price_watermark(self, crop: str) -> str:
+        """
+        Changes whenever this crop's stored prices change, and at least once a day
+        (get_price_data re-fetches data older than a day).
+        """
+        return f"{datetime.now().date()}|{self.price_data_version(crop)}"
+    
+    def price_data_version(self, crop: str) -> Optional[str]:
+        """Latest date, row count and last write of this crop's stored prices; None when nothing is stored."""
+        with get_db_session_no_commit() as db:
+            latest, rows, changed = db.query(
+                func.max(PriceData.date),
+                func.count(PriceData.id),
+                func.max(func.coalesce(PriceData.updated_at, PriceData.created_at))
+            ).filter(PriceData.crop == crop.lower()).one()
+        
+        return f"{latest}|{rows}|{changed}" if rows else None
+    
     def _get_from_database(self, crop: str, days: int) -> Optional[pd.DataFrame]:
         with get_db_session_no_commit() as db:
             end_date = datetime.now().date()
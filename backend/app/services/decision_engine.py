@@ -1,12 +1,36 @@
 
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, asdict
 import numpy as np
+from sqlalchemy import insert
+
+from app.core.batch_writer import BatchWriter
+from app.core.config import settings
+from app.core.db_session import get_db_session
+from app.models.decision_record import DecisionRecord
+from app.services.forecast_frame import ForecastFrame
 
 logger = logging.getLogger(__name__)
 
+# Weather-sensitive crops
+PERISHABLE_CROPS = ('tomato', 'onion', 'potato')
+GRAIN_CROPS = ('wheat', 'rice', 'soyabean')
+
+# Signal order inside a Decision; columns of DecisionBatch.signal_types/strengths
+SIGNAL_SOURCES = ('ML_MODEL', 'HISTORICAL_TREND', 'WEATHER_FORECAST', 'VOLATILITY_INDEX')
+
+# Codes used by DecisionBatch arrays
+SIGNAL_TYPES = ('NEUTRAL', 'BULLISH', 'BEARISH')
+ACTIONS = ('HOLD', 'WAIT', 'SELL_NOW')
+RISK_LEVELS = ('MEDIUM', 'LOW', 'HIGH')  # Indexed by action code
+NO_SIGNAL = -1
+
 
 @dataclass
 class MarketSignal:
@@ -28,15 +52,68 @@ class Decision:
     metadata: Dict
 
 
+@dataclass(frozen=True, slots=True)
+class DecisionRecordEntry:
+    """What the engine keeps about a past decision: no signals, no reasoning text."""
+    timestamp: float  # Unix seconds
+    crop: str
+    action: str
+    confidence: float
+    risk_level: str
+    current_price: float
+    expected_price: Optional[float]
+    bullish_score: float
+    bearish_score: float
+
+
+@dataclass
+class DecisionBatch:
+    """
+    Column-wise output of DecisionEngine.analyze_many.
+    
+    Row i holds exactly what DecisionEngine.analyze returns for the same inputs;
+    reasoning text is only rendered by DecisionEngine.decision_at.
+    """
+    crops: List[str]
+    action: np.ndarray  # int8 codes into ACTIONS, after risk tolerance
+    base_action: np.ndarray  # Before risk tolerance; drives the reasoning text
+    confidence: np.ndarray
+    bullish_score: np.ndarray
+    bearish_score: np.ndarray
+    expected_price: np.ndarray
+    best_sell_date: List[Optional[str]]
+    signal_types: np.ndarray  # (n, 4) codes into SIGNAL_TYPES, NO_SIGNAL where absent
+    signal_strengths: np.ndarray  # (n, 4), NaN where absent
+    inputs: Dict[str, np.ndarray]
+    
+    def __len__(self) -> int:
+        return len(self.crops)
+    
+    @property
+    def actions(self) -> np.ndarray:
+        return np.asarray(ACTIONS, dtype=object)[self.action]
+    
+    @property
+    def risk_levels(self) -> np.ndarray:
+        return np.asarray(RISK_LEVELS, dtype=object)[self.base_action]
+
+
 class DecisionEngine:
     # Decision thresholds (tuned for Indian agriculture)
     PRICE_DROP_ALERT = -5.0  # Alert if price drops >5%
     PRICE_RISE_OPPORTUNITY = 10.0  # Sell if price rises >10%
     WEATHER_IMPACT_THRESHOLD = 0.3  # Rain probability > 30%
     TREND_STRENGTH_THRESHOLD = 0.6  # Confidence > 60%
+    WEATHER_HORIZON_DAYS = 5  # Days of forecast that feed the weather signal
+    RAIN_DAY_MM = 1.0  # Daily rain (mm) that makes a day rainy
+    RAIN_DAY_PROBABILITY = 50.0  # Or peak rain probability (%) for the day
+    HISTORY_SIZE = 1000  # Recent decisions kept in memory; older ones live in decision_records
     
-    def __init__(self):
-        self.decision_history = []
+    def __init__(self, history_size: int = HISTORY_SIZE, writer: Optional[BatchWriter] = None):
+        self.decision_history: deque = deque(maxlen=history_size)
+        self._history_lock = threading.Lock()
+        # Decisions are only written to decision_records when a writer is injected
+        self.writer = writer
     
     def analyze(
         self,
@@ -44,7 +121,7 @@ class DecisionEngine:
         current_price: float,
         predicted_prices: List[Dict],  # [{date, price, confidence}]
         price_trend: Dict,  # {change_7d, change_30d, volatility}
-        weather_forecast: Optional[Dict] = None,
+        weather_forecast: Optional[ForecastFrame] = None,
         user_preferences: Optional[Dict] = None
     ) -> Decision:
         logger.info(f"🧮 Analyzing {crop} at Rs.{current_price:.2f}/kg")
@@ -77,15 +154,263 @@ class DecisionEngine:
             crop, current_price, predicted_prices, signals, user_preferences
         )
         
-        # Store for learning
-        self.decision_history.append({
-            'timestamp': datetime.now(),
-            'crop': crop,
-            'decision': decision
-        })
+        self._record([DecisionRecordEntry(
+            timestamp=time.time(),
+            crop=crop,
+            action=decision.action,
+            confidence=float(decision.confidence),
+            risk_level=decision.risk_level,
+            current_price=float(current_price),
+            expected_price=None if decision.expected_price is None else float(decision.expected_price),
+            bullish_score=float(decision.metadata['bullish_score']),
+            bearish_score=float(decision.metadata['bearish_score'])
+        )])
         
         return decision
     
+    def analyze_many(
+        self,
+        crops: Sequence[str],
+        current_prices: np.ndarray,
+        predicted_paths: np.ndarray,
+        change_7d: np.ndarray,
+        change_30d: np.ndarray,
+        volatility: np.ndarray,
+        weather: Optional[np.ndarray] = None,
+        prediction_confidence: Optional[np.ndarray] = None,
+        prediction_dates: Optional[np.ndarray] = None,
+        risk_tolerance: Optional[Sequence[Optional[str]]] = None
+    ) -> DecisionBatch:
+        """
+        Score many (crop, market, preference) rows at once.
+        
+        Args:
+            crops: Crop name per row
+            current_prices: (n,) latest price per row
+            predicted_paths: (n, h) predicted daily prices, NaN-padded at the end
+            change_7d, change_30d, volatility: (n,) trend metrics as in _calculate_trend
+            weather: (n, 3) rows of weather_features(); a NaN row means no forecast
+            prediction_confidence: (n,) mean confidence of each path (default 0.75)
+            prediction_dates: (h,) or (n, h) date strings of the path columns
+            risk_tolerance: Per-row 'low' / 'medium' / 'high' (default medium)
+        """
+        n = len(crops)
+        rows = np.arange(n)
+        current = np.asarray(current_prices, dtype=float)
+        paths = np.asarray(predicted_paths, dtype=float).reshape(n, -1)
+        trend_7d = np.asarray(change_7d, dtype=float)
+        trend_30d = np.asarray(change_30d, dtype=float)
+        vol = np.asarray(volatility, dtype=float)
+        weather = np.full((n, 3), np.nan) if weather is None else np.asarray(weather, dtype=float).reshape(n, 3)
+        avg_conf = np.full(n, 0.75) if prediction_confidence is None else np.asarray(prediction_confidence, dtype=float)
+        
+        types = np.full((n, len(SIGNAL_SOURCES)), NO_SIGNAL, dtype=np.int8)
+        strengths = np.full((n, len(SIGNAL_SOURCES)), np.nan)
+        
+        # Signal 1: Price Prediction Analysis (7th day, or the last one for short paths)
+        n_pred = (~np.isnan(paths)).sum(axis=1)
+        has_pred = n_pred > 0
+        future = paths[rows, np.clip(n_pred - 1, 0, 6)] if paths.shape[1] else np.full(n, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_change = ((future - current) / current) * 100
+        
+        price_bull = has_pred & (price_change > self.PRICE_RISE_OPPORTUNITY)
+        price_bear = has_pred & ~price_bull & (price_change < self.PRICE_DROP_ALERT)
+        types[:, 0] = np.select([price_bull, price_bear], [1, 2], 0)
+        strengths[:, 0] = np.where(
+            has_pred,
+            np.select(
+                [price_bull, price_bear],
+                [np.minimum(1.0, price_change / 20.0), np.minimum(1.0, np.abs(price_change) / 20.0)],
+                0.3
+            ) * avg_conf,
+            0.0
+        )
+        
+        # Signal 2: Price Trend Analysis
+        strong_up = (trend_7d > 5) & (trend_30d > 10)
+        strong_down = ~strong_up & (trend_7d < -5) & (trend_30d < -10)
+        recovery = ~strong_up & ~strong_down & (trend_7d > 5) & (trend_30d < -5)
+        types[:, 1] = np.select([strong_up, strong_down, recovery], [1, 2, 1], 0)
+        strengths[:, 1] = np.select([strong_up, strong_down, recovery], [0.8, 0.8, 0.6], 0.3)
+        
+        # Signal 3: Weather Impact (only rows with a forecast)
+        rain_probability = weather[:, 0]
+        has_weather = ~np.isnan(rain_probability)
+        crop_names = [crop.lower() for crop in crops]
+        perishable = np.fromiter((c in PERISHABLE_CROPS for c in crop_names), dtype=bool, count=n)
+        grain = np.fromiter((c in GRAIN_CROPS for c in crop_names), dtype=bool, count=n)
+        
+        rain_bull = has_weather & perishable & (rain_probability > self.WEATHER_IMPACT_THRESHOLD)
+        rain_bear = has_weather & ~rain_bull & grain & (rain_probability > 0.5)
+        types[:, 2] = np.where(has_weather, np.select([rain_bull, rain_bear], [1, 2], 0), NO_SIGNAL)
+        strengths[:, 2] = np.where(has_weather, np.select([rain_bull, rain_bear], [0.7, 0.4], 0.2), np.nan)
+        
+        # Signal 4: Volatility Risk
+        high_vol = vol > 15
+        low_vol = ~high_vol & (vol < 5)
+        types[:, 3] = np.where(high_vol, 2, 0)
+        strengths[:, 3] = np.select([high_vol, low_vol], [0.5, 0.3], 0.4)
+        
+        # Scores accumulate in signal order, like the scalar sum()
+        bullish = np.zeros(n)
+        bearish = np.zeros(n)
+        for col in range(len(SIGNAL_SOURCES)):
+            bullish = bullish + np.where(types[:, col] == 1, strengths[:, col], 0.0)
+            bearish = bearish + np.where(types[:, col] == 2, strengths[:, col], 0.0)
+        
+        total_signals = 3 + has_weather
+        confidence = np.minimum((bullish + bearish) / total_signals, 1.0)
+        
+        # Decision rules
+        sell = bearish > 1.5
+        wait = ~sell & (bullish > 1.5)
+        base_action = np.select([sell, wait], [2, 1], 0).astype(np.int8)
+        
+        # WAIT targets the peak of the predicted path
+        peak_idx = np.argmax(np.where(np.isnan(paths), -np.inf, paths), axis=1) if paths.shape[1] else np.zeros(n, dtype=int)
+        peak_price = paths[rows, peak_idx] if paths.shape[1] else np.full(n, np.nan)
+        expected_price = np.where(wait & has_pred, peak_price, np.where(wait, current * 1.1, current))
+        
+        today = datetime.now().strftime('%Y-%m-%d')
+        week_out = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+        dates = None if prediction_dates is None else np.broadcast_to(np.asarray(prediction_dates, dtype=object), paths.shape)
+        best_sell_date = [
+            today if code == 2
+            else None if code == 0
+            else week_out if not has_pred[i]
+            else (dates[i, peak_idx[i]] if dates is not None else None)
+            for i, code in enumerate(base_action)
+        ]
+        
+        # Adjust for risk tolerance (only low tolerance changes the action)
+        low_risk = np.fromiter(
+            (rt == 'low' for rt in (risk_tolerance if risk_tolerance is not None else [None] * n)),
+            dtype=bool, count=n
+        )
+        action = np.where(low_risk & (base_action == 1), 2, base_action).astype(np.int8)
+        
+        now = time.time()
+        self._record([
+            DecisionRecordEntry(now, crop, ACTIONS[a], conf, RISK_LEVELS[b], price, expected, bull, bear)
+            for crop, a, b, conf, price, expected, bull, bear in zip(
+                crops, action.tolist(), base_action.tolist(), confidence.tolist(), current.tolist(),
+                expected_price.tolist(), bullish.tolist(), bearish.tolist()
+            )
+        ])
+        
+        return DecisionBatch(
+            crops=list(crops),
+            action=action,
+            base_action=base_action,
+            confidence=confidence,
+            bullish_score=bullish,
+            bearish_score=bearish,
+            expected_price=expected_price,
+            best_sell_date=best_sell_date,
+            signal_types=types,
+            signal_strengths=strengths,
+            inputs={
+                'current_price': current,
+                'future_price': future,
+                'prediction_confidence': avg_conf,
+                'change_7d': trend_7d,
+                'change_30d': trend_30d,
+                'volatility': vol,
+                'weather': weather,
+                'low_risk': low_risk,
+            }
+        )
+    
+    def recent_decisions(self, limit: int = 50, crop: Optional[str] = None) -> List[Dict]:
+        """Newest-first slice of the in-memory history."""
+        with self._history_lock:
+            entries = list(self.decision_history)
+        
+        if crop:
+            entries = [e for e in entries if e.crop == crop]
+        return [asdict(e) for e in reversed(entries[-limit:])]
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        with self._history_lock:
+            size = len(self.decision_history)
+            sample = self.decision_history[-1] if size else None
+        
+        # Entries share the same shape, so one sample gives a fair per-entry size
+        entry_bytes = 0
+        if sample is not None:
+            entry_bytes = sys.getsizeof(sample) + sum(
+                sys.getsizeof(getattr(sample, name)) for name in sample.__slots__
+            )
+        
+        return {
+            'history_size': size,
+            'history_capacity': self.decision_history.maxlen,
+            'history_bytes_estimate': size * entry_bytes,
+            'writer': self.writer.stats() if self.writer is not None else None,
+        }
+    
+    def shutdown(self):
+        if self.writer is not None:
+            self.writer.stop()
+    
+    def _record(self, entries: List[DecisionRecordEntry]):
+        with self._history_lock:
+            self.decision_history.extend(entries)
+        
+        if self.writer is None:
+            return
+        for entry in entries:
+            self.writer.submit(entry)
+    
+    def decision_at(self, batch: DecisionBatch, i: int) -> Decision:
+        """Render row i of a batch as the Decision analyze() would have returned."""
+        inputs = batch.inputs
+        crop = batch.crops[i]
+        current_price = inputs['current_price'][i]
+        
+        if np.isnan(inputs['future_price'][i]):
+            price_signal = self._analyze_price_predictions(current_price, [])
+        else:
+            price_signal = self._price_signal(current_price, inputs['future_price'][i], inputs['prediction_confidence'][i])
+        
+        trend = {
+            'change_7d': inputs['change_7d'][i],
+            'change_30d': inputs['change_30d'][i],
+            'volatility': inputs['volatility'][i]
+        }
+        signals = [price_signal, self._analyze_price_trend(trend)]
+        
+        rain_probability, rain_days, total_rain = inputs['weather'][i]
+        if not np.isnan(rain_probability):
+            signals.append(self._weather_signal(crop, rain_probability, int(rain_days), total_rain))
+        
+        signals.append(self._analyze_volatility(trend))
+        
+        base_action = ACTIONS[batch.base_action[i]]
+        action, reasoning = self.apply_risk_tolerance(
+            base_action,
+            self._format_reasoning(signals, base_action),
+            'low' if inputs['low_risk'][i] else None
+        )
+        
+        return Decision(
+            action=action,
+            confidence=float(batch.confidence[i]),
+            reasoning=reasoning,
+            best_sell_date=batch.best_sell_date[i],
+            expected_price=float(batch.expected_price[i]),
+            risk_level=RISK_LEVELS[batch.base_action[i]],
+            signals=signals,
+            metadata={
+                'crop': crop,
+                'current_price': current_price,
+                'analysis_date': datetime.now().isoformat(),
+                'bullish_score': float(batch.bullish_score[i]),
+                'bearish_score': float(batch.bearish_score[i])
+            }
+        )
+    
     def _analyze_price_predictions(
         self, 
         current_price: float,
@@ -101,9 +426,13 @@ class DecisionEngine:
         
         # Get 7-day prediction
         future_price = predictions[min(6, len(predictions)-1)]['price']
-        price_change = ((future_price - current_price) / current_price) * 100
         avg_confidence = np.mean([p['confidence'] for p in predictions])
         
+        return self._price_signal(current_price, future_price, avg_confidence)
+    
+    def _price_signal(self, current_price: float, future_price: float, avg_confidence: float) -> MarketSignal:
+        price_change = ((future_price - current_price) / current_price) * 100
+        
         # Determine signal
         if price_change > self.PRICE_RISE_OPPORTUNITY:
             signal_type = 'BULLISH'
@@ -172,34 +501,36 @@ class DecisionEngine:
     def _analyze_weather_impact(
         self, 
         crop: str, 
-        forecast: Dict
+        forecast: ForecastFrame
     ) -> MarketSignal:
-        # Weather-sensitive crops
-        perishables = ['tomato', 'onion', 'potato']
-        grains = ['wheat', 'rice', 'soyabean']
-        
-        # Extract rain probability from forecast
-        rain_days = 0
-        total_rain = 0
+        return self._weather_signal(crop, *self.weather_features(forecast))
+    
+    def weather_features(self, forecast: ForecastFrame) -> Tuple[float, int, float]:
+        """(rain_probability, rain_days, total_rain) over the weather horizon."""
+        # Per-day totals over the next 5 days, straight from the forecast columns
+        daily_rain = forecast.daily_sum('precipitation')[:self.WEATHER_HORIZON_DAYS]
+        daily_pop = forecast.daily_max('rain_probability')[:self.WEATHER_HORIZON_DAYS]
         
-        if 'list' in forecast:
-            for item in forecast['list'][:5]:  # Next 5 days
-                if 'rain' in item:
-                    rain_days += 1
-                    total_rain += item.get('rain', {}).get('3h', 0)
+        # A day counts as rainy on measurable rain or a likely shower
+        rainy = (daily_rain >= self.RAIN_DAY_MM) | (daily_pop >= self.RAIN_DAY_PROBABILITY)
+        rain_days = int(rainy.sum())
+        total_rain = float(daily_rain.sum())
         
-        rain_probability = rain_days / 5.0 if forecast.get('list') else 0
+        rain_probability = rain_days / len(rainy) if len(rainy) else 0
         
+        return rain_probability, rain_days, total_rain
+    
+    def _weather_signal(self, crop: str, rain_probability: float, rain_days: int, total_rain: float) -> MarketSignal:
         # Decision logic based on crop type
-        if crop.lower() in perishables and rain_probability > self.WEATHER_IMPACT_THRESHOLD:
+        if crop.lower() in PERISHABLE_CROPS and rain_probability > self.WEATHER_IMPACT_THRESHOLD:
             return MarketSignal(
                 signal_type='BULLISH',
                 strength=0.7,
-                reason=f"Heavy rain forecast ({rain_days} days). {crop.title()} prices likely to spike due to supply disruption. SELL NOW before spoilage.",
+                reason=f"Heavy rain forecast ({rain_days} days, {total_rain:.0f}mm). {crop.title()} prices likely to spike due to supply disruption. SELL NOW before spoilage.",
                 data_source='WEATHER_FORECAST'
             )
         
-        elif crop.lower() in grains and rain_probability > 0.5:
+        elif crop.lower() in GRAIN_CROPS and rain_probability > 0.5:
             return MarketSignal(
                 signal_type='BEARISH',
                 strength=0.4,
@@ -289,9 +620,7 @@ class DecisionEngine:
             expected_price = current_price
         
         # Adjust for risk tolerance
-        if risk_tolerance == 'low' and action == 'WAIT':
-            action = 'SELL_NOW'
-            reasoning += "\n\n[WARNING] Adjusted to SELL_NOW based on your low risk tolerance."
+        action, reasoning = self.apply_risk_tolerance(action, reasoning, risk_tolerance)
         
         return Decision(
             action=action,
@@ -310,6 +639,15 @@ class DecisionEngine:
             }
         )
     
+    def apply_risk_tolerance(self, action: str, reasoning: str, risk_tolerance: Optional[str]) -> Tuple[str, str]:
+        # Only the action changes with risk appetite, so a neutral decision can be
+        # computed once and adjusted per user
+        if risk_tolerance == 'low' and action == 'WAIT':
+            action = 'SELL_NOW'
+            reasoning += "\n\n[WARNING] Adjusted to SELL_NOW based on your low risk tolerance."
+        
+        return action, reasoning
+    
     def _format_reasoning(self, signals: List[MarketSignal], action: str) -> str:
         reasoning_parts = [f"**Decision: {action}**\n"]
         
@@ -328,5 +666,18 @@ class DecisionEngine:
         return "\n".join(reasoning_parts)
 
 
-# Singleton instance
-decision_engine = DecisionEngine()
+def _persist_decisions(entries: List[DecisionRecordEntry]):
+    rows = []
+    for entry in entries:
+        row = asdict(entry)
+        row['created_at'] = datetime.fromtimestamp(row.pop('timestamp'), tz=timezone.utc)
+        rows.append(row)
+    
+    with get_db_session() as db:
+        db.execute(insert(DecisionRecord), rows)
+
+
+# Singleton instance; tests keep decisions in memory only
+decision_engine = DecisionEngine(
+    writer=BatchWriter("decision_records", _persist_decisions) if settings.ENVIRONMENT != "testing" else None
+)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+# sklearn compares float32 inputs against float64 thresholds
+INPUT_DTYPE = np.float32
+
+# File layout: magic | header length | JSON header (padded to 8 bytes) | arrays, each 8-byte aligned
+_MAGIC = b"AGFT"
+_PREFIX = struct.Struct("<4sI")
+_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+
+@dataclass
+class FlatForest:
+    """
+    Regression forest flattened into one set of node arrays.
+
+    Nodes of every tree are concatenated; ``roots`` holds each tree's first node
+    and child indices are global, stored interleaved so that
+    ``children[2 * node + go_right]`` is the next node. Leaves point to
+    themselves on both sides, so a row can take exactly ``depth`` steps in every
+    tree without checking whether it has already reached a leaf. Prediction is
+    then ``depth`` rounds of gathers over an (n_trees, n_rows) index array.
+    """
+    feature: np.ndarray  # int, per node (0 at leaves)
+    threshold: np.ndarray  # float64, per node; go right when x > threshold
+    children: np.ndarray  # int, two per node: left, right
+    value: np.ndarray  # float64, per node; only read at leaves
+    roots: np.ndarray  # int, per tree
+    depth: int  # Deepest tree
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    @property
+    def memory_mapped(self) -> bool:
+        return isinstance(self.feature.base, np.memmap)
+
+    def digest(self) -> str:
+        """SHA-256 of the node arrays; identical forests share it."""
+        sha = hashlib.sha256(str(self.depth).encode("ascii"))
+        for name in _ARRAYS:
+            sha.update(np.ascontiguousarray(getattr(self, name)).tobytes())
+        return sha.hexdigest()
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """Flatten a fitted single-output RandomForestRegressor (or any forest of regression trees)."""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+        feature, threshold, children, value = [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.column_stack([
+                np.where(is_leaf, nodes, tree.children_left),
+                np.where(is_leaf, nodes, tree.children_right),
+            ]).ravel() + offset)
+            value.append(tree.value[:, 0, 0])
+
+        index_dtype = np.int32 if 2 * sizes.sum() < np.iinfo(np.int32).max else np.int64
+        return cls(
+            feature=np.concatenate(feature).astype(index_dtype),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            children=np.concatenate(children).astype(index_dtype),
+            value=np.concatenate(value).astype(np.float64),
+            roots=offsets.astype(index_dtype),
+            depth=max(tree.max_depth for tree in trees),
+        )
+
+    def save(self, path: str):
+        """Write the arrays uncompressed so ``load`` can map them instead of reading them."""
+        arrays, offset = {}, 0
+        for name in _ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            arrays[name] = (array.dtype.str, len(array), offset)
+            offset += array.nbytes + (-array.nbytes % 8)
+
+        header = json.dumps({"depth": self.depth, "arrays": arrays}).encode("utf-8")
+        header += b" " * (-(len(header) + _PREFIX.size) % 8)
+
+        # Write next to the target and swap, so a process never maps half a file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_PREFIX.pack(_MAGIC, len(header)))
+            f.write(header)
+            for name in _ARRAYS:
+                data = np.ascontiguousarray(getattr(self, name)).tobytes()
+                f.write(data + b"\0" * (-len(data) % 8))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "FlatForest":
+        """
+        Read a saved forest. With ``mmap`` the arrays are read-only views of the
+        file, so every process that loads it shares one copy in the page cache.
+        """
+        data = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+
+        magic, header_len = _PREFIX.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a saved FlatForest")
+
+        start = _PREFIX.size + header_len
+        header = json.loads(bytes(data[_PREFIX.size:start]))
+        arrays = {
+            name: np.frombuffer(data, dtype=np.dtype(dtype), count=count, offset=start + offset)
+            for name, (dtype, count, offset) in header["arrays"].items()
+        }
+        return cls(depth=header["depth"], **arrays)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Mean of the trees' leaf values for each row of X (one row or a batch).
+
+        Matches sklearn's forest.predict bit for bit on finite inputs: rows are
+        compared as float32, and tree outputs are summed in tree order before
+        dividing by the number of trees.
+        """
+        X = np.asarray(X, dtype=INPUT_DTYPE)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = np.arange(n_rows) * n_features
+        nodes = np.broadcast_to(self.roots[:, np.newaxis], (self.n_trees, n_rows))
+
+        for _ in range(self.depth):
+            go_right = flat_X[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+
+        # cumsum adds in tree order, the same order sklearn accumulates trees in
+        return np.cumsum(self.value[nodes], axis=0)[-1] / self.n_trees
@@ -0,0 +1,247 @@
+import json
+import struct
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Numeric columns every forecast carries, in storage order
+FIELDS = ("temperature", "precipitation", "rain_probability", "humidity", "wind_speed")
+
+# Binary layout: magic | header length | JSON header (padded to 8 bytes) | int64 times | float32 columns
+_MAGIC = b"AGF1"
+_PREFIX = struct.Struct("<4sI")
+
+# Day buckets are local calendar days; IST unless the payload gives the location's offset
+DEFAULT_UTC_OFFSET = 5 * 3600 + 30 * 60
+
+SECONDS_PER_DAY = 86400
+
+
+@dataclass
+class ForecastFrame:
+    """
+    Forecast as parallel NumPy columns instead of a list of per-timestamp dicts.
+
+    Day buckets are local calendar days (``utc_offset`` seconds ahead of UTC),
+    each split into ``steps_per_day`` equal slots. When the samples fill whole
+    days from local midnight, day-level views are plain reshapes of the columns;
+    otherwise the first and last (partial) days are NaN-padded.
+    """
+    city: str
+    source: str
+    steps_per_day: int
+    time: np.ndarray  # datetime64[s], UTC
+    temperature: np.ndarray  # °C
+    precipitation: np.ndarray  # mm per step
+    rain_probability: np.ndarray  # 0-100
+    humidity: np.ndarray  # %
+    wind_speed: np.ndarray  # m/s
+    descriptions: List[str] = field(default_factory=list)
+    fetched_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    utc_offset: int = DEFAULT_UTC_OFFSET
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @property
+    def n_days(self) -> int:
+        return self._day_layout[1]
+
+    @cached_property
+    def _day_layout(self) -> Tuple[Optional[np.ndarray], int]:
+        """
+        (slot of each sample in the flattened day grid, number of days). Slots are
+        None when the samples already fill the grid in order, so views can be reshapes.
+        """
+        if len(self) == 0:
+            return None, 0
+
+        local = self.time.astype("datetime64[s]").astype(np.int64) + self.utc_offset
+        first_midnight = local[0] // SECONDS_PER_DAY * SECONDS_PER_DAY
+        slots = (local - first_midnight) // (SECONDS_PER_DAY // self.steps_per_day)
+        n_days = int(slots[-1] // self.steps_per_day) + 1
+
+        if len(self) == n_days * self.steps_per_day and np.array_equal(slots, np.arange(len(self))):
+            slots = None
+        return slots, n_days
+
+    # ------------------------------------------------------------------
+    # Builders
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_openweather(cls, payload: Dict, limit: Optional[int] = None) -> "ForecastFrame":
+        items = payload["list"][:limit] if limit else payload["list"]
+        n = len(items)
+
+        return cls(
+            city=payload["city"]["name"],
+            source="openweather",
+            steps_per_day=8,  # 3-hour steps
+            time=np.array([item["dt"] for item in items], dtype="datetime64[s]"),
+            temperature=np.fromiter((item["main"]["temp"] for item in items), dtype=np.float32, count=n),
+            precipitation=np.fromiter((item.get("rain", {}).get("3h", 0) for item in items), dtype=np.float32, count=n),
+            rain_probability=np.fromiter((item.get("pop", 0) * 100 for item in items), dtype=np.float32, count=n),
+            humidity=np.fromiter((item["main"]["humidity"] for item in items), dtype=np.float32, count=n),
+            wind_speed=np.fromiter((item.get("wind", {}).get("speed", np.nan) for item in items), dtype=np.float32, count=n),
+            descriptions=[item["weather"][0]["description"] for item in items],
+            utc_offset=payload["city"].get("timezone", DEFAULT_UTC_OFFSET),
+        )
+
+    @classmethod
+    def from_open_meteo(cls, city: str, payload: Dict) -> "ForecastFrame":
+        # Expects hourly data requested with timeformat=unixtime and wind_speed_unit=ms
+        hourly = payload.get("hourly", {})
+        time = np.asarray(hourly.get("time", []), dtype="datetime64[s]")
+
+        def column(name: str) -> np.ndarray:
+            if name not in hourly:
+                return np.full(len(time), np.nan, dtype=np.float32)
+            return np.asarray([np.nan if v is None else v for v in hourly[name]], dtype=np.float32)
+
+        return cls(
+            city=city,
+            source="open-meteo",
+            steps_per_day=24,
+            time=time,
+            temperature=column("temperature_2m"),
+            precipitation=column("precipitation"),
+            rain_probability=column("precipitation_probability"),
+            humidity=column("relative_humidity_2m"),
+            wind_speed=column("wind_speed_10m"),
+            utc_offset=payload.get("utc_offset_seconds", DEFAULT_UTC_OFFSET),
+        )
+
+    # ------------------------------------------------------------------
+    # Day-level views
+    # ------------------------------------------------------------------
+
+    def daily(self, name: str) -> np.ndarray:
+        """
+        (n_days, steps_per_day) grid of a numeric column by local calendar day.
+        A view when the samples fill whole days, else a NaN-padded copy.
+        """
+        values = getattr(self, name)
+        slots, n_days = self._day_layout
+        if slots is None:
+            return values.reshape(n_days, self.steps_per_day)
+
+        grid = np.full(n_days * self.steps_per_day, np.nan, dtype=np.float32)
+        grid[slots] = values
+        return grid.reshape(n_days, self.steps_per_day)
+
+    def daily_max(self, name: str) -> np.ndarray:
+        return np.nanmax(self.daily(name), axis=1) if self.n_days else np.empty(0, dtype=np.float32)
+
+    def daily_min(self, name: str) -> np.ndarray:
+        return np.nanmin(self.daily(name), axis=1) if self.n_days else np.empty(0, dtype=np.float32)
+
+    def daily_sum(self, name: str) -> np.ndarray:
+        return np.nansum(self.daily(name), axis=1)
+
+    def daily_dates(self) -> List[str]:
+        """Local calendar date of each day bucket."""
+        n_days = self.n_days
+        if not n_days:
+            return []
+        first_date = (self.time[0].astype("datetime64[s]") + np.timedelta64(self.utc_offset, "s")).astype("datetime64[D]")
+        return [str(d) for d in first_date + np.arange(n_days)]
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({
+            "city": self.city,
+            "source": self.source,
+            "steps_per_day": self.steps_per_day,
+            "fetched_at": self.fetched_at,
+            "utc_offset": self.utc_offset,
+            "n": len(self),
+            "descriptions": self.descriptions,
+        }).encode("utf-8")
+        header += b" " * (-(len(header) + _PREFIX.size) % 8)
+
+        columns = np.stack([getattr(self, name) for name in FIELDS]).astype(np.float32, copy=False)
+
+        return b"".join([
+            _PREFIX.pack(_MAGIC, len(header)),
+            header,
+            self.time.astype("datetime64[s]").astype(np.int64).tobytes(),
+            columns.tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ForecastFrame":
+        magic, header_len = _PREFIX.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not a serialized ForecastFrame")
+
+        offset = _PREFIX.size
+        header = json.loads(data[offset:offset + header_len])
+        offset += header_len
+        n = header["n"]
+
+        # Arrays are read-only views over the cached buffer
+        time = np.frombuffer(data, dtype=np.int64, count=n, offset=offset).view("datetime64[s]")
+        offset += 8 * n
+        columns = np.frombuffer(data, dtype=np.float32, count=len(FIELDS) * n, offset=offset).reshape(len(FIELDS), n)
+
+        return cls(
+            city=header["city"],
+            source=header["source"],
+            steps_per_day=header["steps_per_day"],
+            time=time,
+            descriptions=header.get("descriptions", []),
+            fetched_at=header["fetched_at"],
+            utc_offset=header.get("utc_offset", DEFAULT_UTC_OFFSET),
+            **{name: columns[i] for i, name in enumerate(FIELDS)},
+        )
+
+    # ------------------------------------------------------------------
+    # API payloads
+    # ------------------------------------------------------------------
+
+    def to_forecast_dict(self) -> Dict:
+        times = self.time.astype("datetime64[s]").astype(str)
+        descriptions = self.descriptions or [""] * len(self)
+
+        forecasts = [
+            {
+                "datetime": t.replace("T", " "),
+                "temperature": round(float(temp), 2),
+                "description": desc,
+                "rain_probability": round(float(pop), 1),
+                "humidity": round(float(hum)),
+            }
+            for t, temp, desc, pop, hum in zip(times, self.temperature, descriptions, self.rain_probability, self.humidity)
+        ]
+
+        return {
+            "city": self.city,
+            "forecasts": forecasts,
+            "daily": self.daily_summary(),
+            "cached": False,
+        }
+
+    def daily_summary(self) -> List[Dict]:
+        return [
+            {
+                "date": date,
+                "temp_min": round(float(t_min), 1),
+                "temp_max": round(float(t_max), 1),
+                "precipitation_mm": round(float(rain), 1),
+                "max_rain_probability": round(float(pop), 1),
+            }
+            for date, t_min, t_max, rain, pop in zip(
+                self.daily_dates(),
+                self.daily_min("temperature"),
+                self.daily_max("temperature"),
+                self.daily_sum("precipitation"),
+                self.daily_max("rain_probability"),
+            )
+        ]
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.cache import cache_manager
+from app.core.logging_config import logger
+
+# Explanations only change when the decision text does, so they can live for a week
+LLM_INSIGHTS_CACHE_TTL = 7 * 24 * 3600
+
+# Rough token estimate when the model does not report usage
+CHARS_PER_TOKEN = 4
+
+COUNTERS = ("hits", "misses", "tokens_saved")
+
+
+class LLMInsightCache:
+    """
+    Content-addressed cache for LLM explanations.
+
+    Entries are keyed by sha256(model + whitespace-normalized prompt), so every
+    user whose analysis yields the same prompt shares one Gemini call. Identical
+    prompts that are in flight at the same time wait for the first one instead of
+    calling the model again.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._local = dict.fromkeys(COUNTERS, 0)
+
+    @staticmethod
+    def make_key(model: str, prompt: str) -> str:
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get_or_generate(
+        self,
+        model: str,
+        prompt: str,
+        generate: Callable[[], Tuple[str, Optional[int]]],
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Return the cached explanation for this prompt or produce it once.
+
+        Args:
+            generate: Calls the model; returns (text, total tokens or None)
+            timeout: How long a duplicate caller waits for the in-flight call
+        """
+        key = self.make_key(model, prompt)
+
+        cached = cache_manager.get("llm:insights", key)
+        if cached is not None:
+            self._record_hit(cached.get("tokens", 0))
+            return cached["text"]
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            text, tokens = future.result(timeout)
+            self._record_hit(tokens)
+            return text
+
+        try:
+            # A previous owner may have finished between our lookup and taking ownership
+            cached = cache_manager.get("llm:insights", key)
+            if cached is not None:
+                self._record_hit(cached.get("tokens", 0))
+                future.set_result((cached["text"], cached.get("tokens", 0)))
+                return cached["text"]
+
+            text, tokens = generate()
+            tokens = tokens or (len(prompt) + len(text)) // CHARS_PER_TOKEN
+
+            cache_manager.set("llm:insights", key, {"text": text, "tokens": tokens}, LLM_INSIGHTS_CACHE_TTL)
+            self._count("misses")
+            future.set_result((text, tokens))
+            return text
+
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        counters = {}
+        for name in COUNTERS:
+            raw = cache_manager.get_raw("llm:insights_stats", name)
+            counters[name] = int(raw) if raw is not None else self._local[name]
+
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def _record_hit(self, tokens: int):
+        self._count("hits")
+        self._count("tokens_saved", tokens)
+        logger.info(f"LLM insight cache hit (~{tokens} tokens saved)")
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._local[name] += amount
+        cache_manager.incr("llm:insights_stats", name, amount)
+
+
+# Singleton instance
+llm_insight_cache = LLMInsightCache()
@@ -2,8 +2,9 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from sklearn.linear_model import LinearRegression
-from typing import Dict
+from typing import Dict, Optional
 from app.services.data_integration_service import data_service
+from app.services.data_context import DataContext
 from app.core.cache import cache_manager
 from app.core.logging_config import logger
 
@@ -15,8 +16,16 @@ class PriceService:
     # Crop list for reference
     CROPS = ["wheat", "rice", "tomato", "onion", "potato", "cotton", "sugarcane", "soyabean"]
     
+    # Days of history the prediction model is trained on
+    HISTORY_DAYS = 180
+    
     @staticmethod
-    def predict_prices(crop: str, days_ahead: int = 30, use_real_data: bool = True) -> Dict:
+    def predict_prices(
+        crop: str,
+        days_ahead: int = 30,
+        use_real_data: bool = True,
+        context: Optional[DataContext] = None
+    ) -> Dict:
         cache_key = f"{crop}:{days_ahead}:{use_real_data}"
         
         # Try to get from cache first
@@ -29,10 +38,10 @@ class PriceService:
         try:
             logger.info(f"Predicting prices for {crop} ({days_ahead} days ahead)")
             
-            # Get historical data (180 days)
-            historical_df = data_service.get_price_data(
+            # Get historical data (180 days), shared with the caller when it passes a context
+            historical_df = (context or data_service).get_price_data(
                 crop=crop, 
-                days=180, 
+                days=PriceService.HISTORY_DAYS, 
                 force_synthetic=not use_real_data
             )
             
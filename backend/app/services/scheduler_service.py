@@ -39,6 +39,15 @@ class SchedulerService:
             replace_existing=True
         )
         
+        # Weather alert sweep over all user locations (morning and afternoon)
+        self.scheduler.add_job(
+            self._weather_alert_job,
+            CronTrigger(hour='7,13', minute=30),
+            id='weather_alerts',
+            name='Weather Alert Sweep',
+            replace_existing=True
+        )
+        
         # Price alerts every hour
         self.scheduler.add_job(
             self._price_alert_job,
@@ -53,6 +62,7 @@ class SchedulerService:
         logger.info("[OK] Production scheduler started - monitoring 24/7")
         logger.info("[DATA] Daily data collection: 6 PM IST")
         logger.info(" Daily analysis: 6 AM IST")
+        logger.info(" Weather alerts: 7:30 AM and 1:30 PM IST")
         logger.info(" Price alerts: Every 6 hours")
     
     def stop(self):
@@ -65,17 +75,29 @@ class SchedulerService:
         logger.info(f" Daily monitoring at {datetime.now()}")
         
         try:
-            alerts = smart_agent.run_daily_monitoring()
-            
-            # Send notifications
-            for alert in alerts:
-                notification_service.send_alert(alert)
+            # Notifications go out as each user's decisions are ready
+            summary = smart_agent.run_daily_monitoring(on_alert=notification_service.send_alert)
             
-            logger.info(f"[OK] Sent {len(alerts)} alerts")
+            logger.info(
+                f"[OK] Sent {summary['alerts']} alerts to {summary['users']} users "
+                f"({summary['users_per_second']} users/s)"
+            )
             
         except Exception as e:
             logger.error(f"Daily job failed: {e}")
     
+    def _weather_alert_job(self):
+        logger.info(f" Weather alert sweep at {datetime.now()}")
+        
+        try:
+            from app.services.weather_alert_service import weather_alert_service
+            
+            result = weather_alert_service.run_sweep()
+            logger.info(f"[OK] Weather alerts: {result['notifications']} notifications for {result['users']} users")
+            
+        except Exception as e:
+            logger.error(f"[ERROR] Weather alert job failed: {str(e)}")
+    
     def _price_alert_job(self):
         logger.info(f" Price alert check at {datetime.now()}")
         
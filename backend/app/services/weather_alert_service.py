@@ -0,0 +1,239 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.notification import Notification
+from app.services.weather_service import WeatherService
+from app.services.weather_prefetch_service import DEFAULT_CITY
+from app.core.db_session import get_db_session, get_db_session_no_commit
+from app.core.logging_config import logger
+
+
+@dataclass(frozen=True)
+class WeatherAlertRule:
+    type: str
+    field: str  # Key in the current-weather payload
+    operator: str  # 'gt' or 'lt'
+    threshold: float
+    severity: str  # 'low', 'medium', 'high'
+    message: str  # Formatted with {value}
+    recommendation: str
+    group: str  # Rules in one group are exclusive; the first match wins
+
+
+# Ordered by precedence inside each group. Adding a rule is a data change only.
+WEATHER_ALERT_RULES: List[WeatherAlertRule] = [
+    WeatherAlertRule(
+        type="extreme_heat", field="temperature", operator="gt", threshold=40, severity="high",
+        message="Extreme heat alert! Temperature is {value}°C. Avoid field work during peak hours.",
+        recommendation="Work early morning or evening. Ensure adequate water for crops and livestock.",
+        group="temperature"
+    ),
+    WeatherAlertRule(
+        type="heat_warning", field="temperature", operator="gt", threshold=35, severity="medium",
+        message="Heat warning. Temperature is {value}°C.",
+        recommendation="Increase irrigation frequency. Provide shade for sensitive crops.",
+        group="temperature"
+    ),
+    WeatherAlertRule(
+        type="frost_warning", field="temperature", operator="lt", threshold=5, severity="high",
+        message="Frost warning! Temperature is {value}°C.",
+        recommendation="Cover sensitive plants. Delay sowing of frost-sensitive crops.",
+        group="temperature"
+    ),
+    WeatherAlertRule(
+        type="high_humidity", field="humidity", operator="gt", threshold=85, severity="medium",
+        message="High humidity at {value}%. Disease risk increased.",
+        recommendation="Monitor for fungal diseases. Ensure good air circulation.",
+        group="humidity"
+    ),
+    WeatherAlertRule(
+        type="low_humidity", field="humidity", operator="lt", threshold=30, severity="low",
+        message="Low humidity at {value}%.",
+        recommendation="Increase irrigation. Consider mulching to retain soil moisture.",
+        group="humidity"
+    ),
+    WeatherAlertRule(
+        type="strong_wind", field="wind_speed", operator="gt", threshold=15, severity="medium",
+        message="Strong winds at {value} m/s.",
+        recommendation="Avoid spraying pesticides. Secure greenhouse covers and shade nets.",
+        group="wind"
+    ),
+]
+
+SEVERITY_TO_PRIORITY = {"high": "high", "medium": "normal", "low": "low"}
+
+
+class WeatherAlertService:
+
+    def __init__(self, rules: Optional[List[WeatherAlertRule]] = None):
+        self.rules = rules or WEATHER_ALERT_RULES
+        self.fields = list(dict.fromkeys(rule.field for rule in self.rules))
+
+        # Rule table as arrays: which condition row each rule reads, its threshold and direction
+        self._field_index = np.array([self.fields.index(rule.field) for rule in self.rules])
+        self._thresholds = np.array([rule.threshold for rule in self.rules], dtype=float)
+        self._is_gt = np.array([rule.operator == "gt" for rule in self.rules])
+
+        # precedence[i, j] is 1 when rule j sits before rule i in the same group,
+        # so one matrix product tells each rule whether a stronger sibling already fired
+        groups = np.array([rule.group for rule in self.rules])
+        same_group = groups[:, None] == groups[None, :]
+        self._precedence = (same_group & np.tri(len(self.rules), k=-1, dtype=bool)).astype(np.int32)
+
+    def evaluate(self, conditions: np.ndarray) -> np.ndarray:
+        """
+        Evaluate every rule for every location.
+
+        Args:
+            conditions: Array of shape (len(self.fields), n_locations); NaN means unknown
+
+        Returns:
+            Boolean array of shape (len(self.rules), n_locations)
+        """
+        values = conditions[self._field_index]
+        thresholds = self._thresholds[:, None]
+
+        # NaN compares False both ways, so missing readings never alert
+        hits = np.where(self._is_gt[:, None], values > thresholds, values < thresholds)
+        suppressed = (self._precedence @ hits.astype(np.int32)) > 0
+
+        return hits & ~suppressed
+
+    def alerts_for_conditions(self, weather: Dict) -> List[Dict]:
+        conditions = self._conditions_matrix([weather])
+        hits = self.evaluate(conditions)[:, 0]
+
+        return [self._format_alert(rule, weather[rule.field]) for rule, hit in zip(self.rules, hits) if hit]
+
+    def run_sweep(self) -> Dict:
+        """
+        Check every notifiable user's location and notify them of new weather alerts.
+
+        Locations are read in one short session, the weather is fetched with no
+        session open, and notifications go out in a second short transaction.
+        A (user, rule) pair notified earlier the same day is skipped, so a heat
+        wave reported at 07:30 is not repeated at 13:30.
+        """
+        start_time = time.perf_counter()
+
+        with get_db_session_no_commit() as db:
+            user_ids, user_cities = self._load_user_locations(db)
+
+        if user_ids.size == 0:
+            logger.info("Weather alert sweep: no users to check")
+            return {"users": 0, "locations": 0, "notifications": 0}
+
+        cities, city_index = np.unique(user_cities, return_inverse=True)
+        weather = WeatherService.prefetch_current_weather(cities.tolist())
+        readings = [weather.get(city, {}) for city in cities]
+
+        location_hits = self.evaluate(self._conditions_matrix(readings))
+
+        # Fan location results out to users with one gather, then list the (rule, user) pairs
+        rule_idx, user_idx = np.nonzero(location_hits[:, city_index])
+        location_idx = city_index[user_idx]
+
+        rows = self._notification_rows(rule_idx, user_ids[user_idx], location_idx, cities, readings)
+        skipped = 0
+        if rows:
+            with get_db_session() as db:
+                notified = self._notified_today(db)
+                new_rows = [row for row in rows if (row["user_id"], row["extra_data"]["alert_type"]) not in notified]
+                skipped = len(rows) - len(new_rows)
+                rows = new_rows
+                if rows:
+                    db.execute(insert(Notification), rows)
+
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            f"[OK] Weather alert sweep: {len(rows)} notifications ({skipped} already sent today) for "
+            f"{user_ids.size} users across {len(cities)} locations in {elapsed:.2f}s"
+        )
+
+        return {
+            "users": int(user_ids.size),
+            "locations": int(len(cities)),
+            "notifications": len(rows),
+            "skipped": skipped,
+            "duration_seconds": round(elapsed, 3),
+        }
+
+    def _load_user_locations(self, db: Session):
+        rows = db.query(User.id, User.location).filter(
+            User.is_active == True,
+            User.notification_enabled == True
+        ).all()
+
+        user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        # Stripped here so " Jaipur" and "Jaipur" share a location and match the fetched keys
+        user_cities = np.array([(row[1] or "").strip() or DEFAULT_CITY for row in rows], dtype=object)
+
+        return user_ids, user_cities
+
+    def _notified_today(self, db: Session) -> Set[Tuple[int, str]]:
+        """(user, alert type) pairs that already got a weather warning since local midnight."""
+        midnight = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+        rows = db.query(Notification.user_id, Notification.extra_data).filter(
+            Notification.type == "weather_warning",
+            Notification.created_at >= midnight.astimezone(timezone.utc)
+        ).all()
+
+        return {(user_id, (extra_data or {}).get("alert_type")) for user_id, extra_data in rows}
+
+    def _conditions_matrix(self, readings: List[Dict]) -> np.ndarray:
+        conditions = np.full((len(self.fields), len(readings)), np.nan)
+
+        for col, reading in enumerate(readings):
+            for row, field in enumerate(self.fields):
+                value = reading.get(field)
+                if value is not None:
+                    conditions[row, col] = value
+
+        return conditions
+
+    def _notification_rows(self, rule_idx, user_ids, location_idx, cities, readings) -> List[Dict]:
+        created_at = datetime.now(timezone.utc)
+        rows = []
+
+        for rule_i, user_id, location_i in zip(rule_idx, user_ids, location_idx):
+            rule = self.rules[rule_i]
+            city = str(cities[location_i])
+            value = readings[location_i][rule.field]
+
+            rows.append({
+                "user_id": int(user_id),
+                "type": "weather_warning",
+                "title": f"Weather Alert: {rule.type.replace('_', ' ').title()} in {city}",
+                "message": f"{rule.message.format(value=value)} {rule.recommendation}",
+                "priority": SEVERITY_TO_PRIORITY.get(rule.severity, "normal"),
+                "is_read": False,
+                "created_at": created_at,
+                "extra_data": {
+                    "alert_type": rule.type,
+                    "city": city,
+                    "field": rule.field,
+                    "value": value,
+                    "severity": rule.severity,
+                },
+            })
+
+        return rows
+
+    def _format_alert(self, rule: WeatherAlertRule, value) -> Dict:
+        return {
+            "type": rule.type,
+            "severity": rule.severity,
+            "message": rule.message.format(value=value),
+            "recommendation": rule.recommendation,
+        }
+
+
+# Singleton instance
+weather_alert_service = WeatherAlertService()
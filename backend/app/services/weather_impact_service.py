@@ -1,11 +1,44 @@
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, List, Optional
+import httpx
+import numpy as np
 import requests
 from app.core.config import settings
+from app.core.cache import cache_manager
+from app.services.forecast_frame import ForecastFrame
 
 logger = logging.getLogger(__name__)
 
+OPEN_METEO_CACHE_TTL = 10800  # 3 hours - daily aggregates change slowly
+OPEN_METEO_BATCH_SIZE = 50  # Coordinates per multi-location request
+HOURLY_PARAMS = "temperature_2m,precipitation,precipitation_probability,relative_humidity_2m,wind_speed_10m"
+
+RAIN_TOLERANCE_CODES = {"low": 0, "medium": 1, "high": 2}
+
+# Outcome tables for the vectorized evaluator. Each row is one branch of the
+# rule chain: (impact, factor text, recommendation or None)
+TEMP_OUTCOMES = [
+    ("NEGATIVE", "High temperature stress", "Consider irrigation to cool crops"),
+    ("MODERATE_NEGATIVE", "Above optimal temperature", None),
+    ("NEGATIVE", "Low temperature stress", "Protect crops from frost"),
+    ("MODERATE_NEGATIVE", "Below optimal temperature", None),
+    ("POSITIVE", "Optimal temperature range", None),
+]
+RAIN_OUTCOMES = [
+    ("NEGATIVE", "Excessive rainfall (low tolerance)", "Ensure proper drainage"),
+    ("MODERATE_NEGATIVE", "High rainfall", None),
+    ("MODERATE_NEGATIVE", "Low rainfall (drought sensitive)", "Increase irrigation frequency"),
+    ("NEUTRAL", None, None),
+]
+# (impact, severity, confidence), most severe first
+OVERALL_OUTCOMES = [
+    ("NEGATIVE", "high", 0.75),
+    ("MODERATE", "medium", 0.65),
+    ("POSITIVE", "low", 0.80),
+    ("NEUTRAL", "low", 0.70),
+]
+
 
 class WeatherImpactService:
     
@@ -75,203 +108,247 @@ class WeatherImpactService:
                 "drought_sensitive": True,
             },
         }
+        
+        # Column view of the sensitivity table so every crop is scored at once
+        self._crops = list(self.crop_weather_sensitivity.keys())
+        self._opt_min = np.array([c["optimal_temp_min"] for c in self.crop_weather_sensitivity.values()], dtype=float)
+        self._opt_max = np.array([c["optimal_temp_max"] for c in self.crop_weather_sensitivity.values()], dtype=float)
+        self._rain_tolerance = np.array(
+            [RAIN_TOLERANCE_CODES[c["rain_tolerance"]] for c in self.crop_weather_sensitivity.values()]
+        )
+        self._drought_sensitive = np.array([c["drought_sensitive"] for c in self.crop_weather_sensitivity.values()])
     
-    async def get_weather_forecast(self, city: str, days: int = 7) -> Dict[str, Any]:
+    async def get_weather_forecast(self, city: str, days: int = 7) -> ForecastFrame:
         try:
             coords = self.city_coordinates.get(city.lower())
             if not coords:
                 logger.warning(f"Coordinates not found for city: {city}")
-                return self._get_default_weather()
+                return self._get_default_weather(days)
+            
+            cache_key = self._cache_key(city, days)
+            cached = cache_manager.get_raw("weather:open_meteo", cache_key)
+            if cached:
+                return ForecastFrame.from_bytes(cached)
             
             # Call Open-Meteo API
-            params = {
-                "latitude": coords["lat"],
-                "longitude": coords["lon"],
-                "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max",
-                "timezone": "Asia/Kolkata",
-                "forecast_days": min(days, 16)  # API supports max 16 days
-            }
+            params = self._forecast_params(str(coords["lat"]), str(coords["lon"]), days)
             
-            response = requests.get(f"{self.base_url}/forecast", params=params, timeout=5)
-            response.raise_for_status()
+            async with httpx.AsyncClient(timeout=5) as client:
+                response = await client.get(f"{self.base_url}/forecast", params=params)
+                response.raise_for_status()
             
-            data = response.json()
+            frame = ForecastFrame.from_open_meteo(city, response.json())
+            cache_manager.set_raw("weather:open_meteo", cache_key, frame.to_bytes(), OPEN_METEO_CACHE_TTL)
             
-            return {
-                "city": city,
-                "forecast_days": days,
-                "daily": data.get("daily", {}),
-                "source": "open-meteo",
-                "fetched_at": datetime.now(timezone.utc).isoformat()
-            }
+            return frame
             
         except Exception as e:
             logger.error(f"Error fetching weather for {city}: {e}")
-            return self._get_default_weather()
+            return self._get_default_weather(days)
     
-    def _get_default_weather(self) -> Dict[str, Any]:
+    def prefetch_forecasts(self, cities: Iterable[str], days: int = 7) -> Dict[str, ForecastFrame]:
+        # Open-Meteo accepts comma-separated coordinate lists and answers with one
+        # forecast per location, so known cities are fetched in a few requests
+        known = list(dict.fromkeys(
+            city.strip().lower() for city in cities
+            if city and city.strip().lower() in self.city_coordinates
+        ))
+        forecasts: Dict[str, ForecastFrame] = {}
+        
+        for start in range(0, len(known), OPEN_METEO_BATCH_SIZE):
+            batch = known[start:start + OPEN_METEO_BATCH_SIZE]
+            params = self._forecast_params(
+                ",".join(str(self.city_coordinates[c]["lat"]) for c in batch),
+                ",".join(str(self.city_coordinates[c]["lon"]) for c in batch),
+                days
+            )
+            
+            try:
+                response = requests.get(f"{self.base_url}/forecast", params=params, timeout=10)
+                response.raise_for_status()
+                payload = response.json()
+            except Exception as e:
+                logger.error(f"Open-Meteo batch prefetch failed for {len(batch)} cities: {e}")
+                continue
+            
+            # A single location comes back as an object, several as a list
+            if isinstance(payload, dict):
+                payload = [payload]
+            
+            for city, data in zip(batch, payload):
+                frame = ForecastFrame.from_open_meteo(city, data)
+                cache_manager.set_raw("weather:open_meteo", self._cache_key(city, days), frame.to_bytes(), OPEN_METEO_CACHE_TTL)
+                forecasts[city] = frame
+        
+        logger.info(f"Open-Meteo prefetch cached {len(forecasts)}/{len(known)} cities")
+        return forecasts
+    
+    def _cache_key(self, city: str, days: int) -> str:
+        return f"{city.lower()}:{days}"
+    
+    def _forecast_params(self, latitude: str, longitude: str, days: int) -> Dict[str, Any]:
         return {
-            "city": "unknown",
-            "forecast_days": 7,
-            "daily": {
-                "temperature_2m_max": [28] * 7,
-                "temperature_2m_min": [18] * 7,
-                "precipitation_sum": [0] * 7,
-            },
-            "source": "default",
-            "fetched_at": datetime.now(timezone.utc).isoformat()
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": HOURLY_PARAMS,
+            "timezone": "Asia/Kolkata",
+            "timeformat": "unixtime",
+            "wind_speed_unit": "ms",
+            "forecast_days": min(days, 16)  # API supports max 16 days
         }
     
+    def _get_default_weather(self, days: int = 7) -> ForecastFrame:
+        # Two samples per day give a daily low of 18°C and a high of 28°C
+        start = np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), "D").astype("datetime64[s]")
+        n = 2 * days
+        return ForecastFrame(
+            city="unknown",
+            source="default",
+            steps_per_day=2,
+            time=start + np.arange(n) * np.timedelta64(12, "h"),
+            temperature=np.tile(np.array([18, 28], dtype=np.float32), days),
+            precipitation=np.zeros(n, dtype=np.float32),
+            rain_probability=np.zeros(n, dtype=np.float32),
+            humidity=np.full(n, 60, dtype=np.float32),
+            wind_speed=np.full(n, 2, dtype=np.float32),
+        )
+    
     async def analyze_weather_impact(
         self, 
         crop: str, 
         city: str, 
         days: int = 7
     ) -> Dict[str, Any]:
+        result = await self.analyze_crops_impact(city, [crop], days)
+        
+        if crop.lower() in result["unsupported_crops"]:
+            return {
+                "impact": "UNKNOWN",
+                "severity": "low",
+                "message": f"Weather sensitivity not configured for {crop}",
+                "recommendations": []
+            }
+        
+        if not result["impacts"]:
+            return self._get_neutral_impact()
+        
+        impact = result["impacts"][0]
+        return {
+            "crop": crop,
+            "city": city,
+            "forecast_days": days,
+            **{k: v for k, v in impact.items() if k != "crop"},
+            "weather_summary": result["weather_summary"],
+            "analyzed_at": result["analyzed_at"]
+        }
+    
+    async def analyze_crops_impact(
+        self,
+        city: str,
+        crops: Optional[List[str]] = None,
+        days: int = 7
+    ) -> Dict[str, Any]:
+        requested = [c.lower() for c in crops] if crops else list(self._crops)
+        unsupported = [c for c in requested if c not in self.crop_weather_sensitivity]
+        
+        result = {
+            "city": city,
+            "forecast_days": days,
+            "impacts": [],
+            "unsupported_crops": unsupported,
+            "weather_summary": {},
+            "analyzed_at": datetime.now(timezone.utc).isoformat()
+        }
+        
         try:
-            # Get weather forecast
             weather = await self.get_weather_forecast(city, days)
             
-            # Get crop sensitivity
-            sensitivity = self.crop_weather_sensitivity.get(crop.lower())
-            if not sensitivity:
-                return {
-                    "impact": "UNKNOWN",
-                    "severity": "low",
-                    "message": f"Weather sensitivity not configured for {crop}",
-                    "recommendations": []
-                }
-            
-            # Analyze temperature impact
-            daily = weather.get("daily", {})
-            temps_max = daily.get("temperature_2m_max", [])
-            temps_min = daily.get("temperature_2m_min", [])
-            precipitation = daily.get("precipitation_sum", [])
+            if weather.n_days == 0:
+                return result
             
-            if not temps_max:
-                return self._get_neutral_impact()
+            # Day-level aggregates come straight from reshaped views of the hourly columns
+            avg_temp_max = float(np.nanmean(weather.daily_max("temperature")))
+            avg_temp_min = float(np.nanmean(weather.daily_min("temperature")))
+            total_rain = float(np.nansum(weather.daily_sum("precipitation")))
             
-            avg_temp_max = sum(temps_max) / len(temps_max)
-            avg_temp_min = sum(temps_min) / len(temps_min)
-            total_rain = sum(precipitation)
-            
-            # Calculate impact
-            impact_analysis = self._calculate_impact(
-                crop=crop,
-                sensitivity=sensitivity,
-                avg_temp_max=avg_temp_max,
-                avg_temp_min=avg_temp_min,
-                total_rain=total_rain,
-                days=days
-            )
-            
-            return {
-                "crop": crop,
-                "city": city,
-                "forecast_days": days,
-                "impact": impact_analysis["impact"],
-                "severity": impact_analysis["severity"],
-                "confidence": impact_analysis["confidence"],
-                "message": impact_analysis["message"],
-                "recommendations": impact_analysis["recommendations"],
-                "weather_summary": {
-                    "avg_temp_max": round(avg_temp_max, 1),
-                    "avg_temp_min": round(avg_temp_min, 1),
-                    "total_precipitation_mm": round(total_rain, 1),
-                },
-                "analyzed_at": datetime.now(timezone.utc).isoformat()
+            impacts = self._evaluate_crops(avg_temp_max, avg_temp_min, total_rain, days)
+            result["impacts"] = [impacts[c] for c in dict.fromkeys(requested) if c in impacts]
+            result["weather_summary"] = {
+                "avg_temp_max": round(avg_temp_max, 1),
+                "avg_temp_min": round(avg_temp_min, 1),
+                "total_precipitation_mm": round(total_rain, 1),
             }
+            result["source"] = weather.source
+            return result
             
         except Exception as e:
             logger.error(f"Error analyzing weather impact: {e}")
-            return self._get_neutral_impact()
+            return result
     
-    def _calculate_impact(
+    def _evaluate_crops(
         self,
-        crop: str,
-        sensitivity: Dict,
         avg_temp_max: float,
         avg_temp_min: float,
         total_rain: float,
         days: int
-    ) -> Dict[str, Any]:
-        
-        recommendations = []
-        impact_factors = []
-        
-        # Temperature analysis
-        opt_min = sensitivity["optimal_temp_min"]
-        opt_max = sensitivity["optimal_temp_max"]
-        
-        temp_impact = "NEUTRAL"
-        if avg_temp_max > opt_max + 5:
-            temp_impact = "NEGATIVE"
-            impact_factors.append("High temperature stress")
-            recommendations.append("Consider irrigation to cool crops")
-        elif avg_temp_max > opt_max:
-            temp_impact = "MODERATE_NEGATIVE"
-            impact_factors.append("Above optimal temperature")
-        elif avg_temp_min < opt_min - 5:
-            temp_impact = "NEGATIVE"
-            impact_factors.append("Low temperature stress")
-            recommendations.append("Protect crops from frost")
-        elif avg_temp_min < opt_min:
-            temp_impact = "MODERATE_NEGATIVE"
-            impact_factors.append("Below optimal temperature")
-        else:
-            temp_impact = "POSITIVE"
-            impact_factors.append("Optimal temperature range")
-        
-        # Rainfall analysis
+    ) -> Dict[str, Dict[str, Any]]:
+        opt_min, opt_max = self._opt_min, self._opt_max
         rain_per_day = total_rain / days
-        rain_impact = "NEUTRAL"
-        
-        if sensitivity["rain_tolerance"] == "low":
-            if rain_per_day > 10:
-                rain_impact = "NEGATIVE"
-                impact_factors.append("Excessive rainfall (low tolerance)")
-                recommendations.append("Ensure proper drainage")
-        elif sensitivity["rain_tolerance"] == "medium":
-            if rain_per_day > 20:
-                rain_impact = "MODERATE_NEGATIVE"
-                impact_factors.append("High rainfall")
-        else:  # high tolerance
-            if rain_per_day < 2 and sensitivity["drought_sensitive"]:
-                rain_impact = "MODERATE_NEGATIVE"
-                impact_factors.append("Low rainfall (drought sensitive)")
-                recommendations.append("Increase irrigation frequency")
         
-        # Overall impact
-        if temp_impact == "NEGATIVE" or rain_impact == "NEGATIVE":
-            overall_impact = "NEGATIVE"
-            severity = "high"
-            confidence = 0.75
-        elif temp_impact == "MODERATE_NEGATIVE" or rain_impact == "MODERATE_NEGATIVE":
-            overall_impact = "MODERATE"
-            severity = "medium"
-            confidence = 0.65
-        elif temp_impact == "POSITIVE":
-            overall_impact = "POSITIVE"
-            severity = "low"
-            confidence = 0.80
-        else:
-            overall_impact = "NEUTRAL"
-            severity = "low"
-            confidence = 0.70
+        # First matching branch wins, mirroring the original if/elif chains
+        temp_case = np.select(
+            [
+                avg_temp_max > opt_max + 5,
+                avg_temp_max > opt_max,
+                avg_temp_min < opt_min - 5,
+                avg_temp_min < opt_min,
+            ],
+            [0, 1, 2, 3],
+            default=4
+        )
+        rain_case = np.select(
+            [
+                (self._rain_tolerance == 0) & (rain_per_day > 10),
+                (self._rain_tolerance == 1) & (rain_per_day > 20),
+                (self._rain_tolerance == 2) & (rain_per_day < 2) & self._drought_sensitive,
+            ],
+            [0, 1, 2],
+            default=3
+        )
         
-        # Generate message
-        message = f"{crop.upper()}: " + " | ".join(impact_factors)
+        temp_impact = np.array([o[0] for o in TEMP_OUTCOMES])[temp_case]
+        rain_impact = np.array([o[0] for o in RAIN_OUTCOMES])[rain_case]
+        overall_case = np.select(
+            [
+                (temp_impact == "NEGATIVE") | (rain_impact == "NEGATIVE"),
+                (temp_impact == "MODERATE_NEGATIVE") | (rain_impact == "MODERATE_NEGATIVE"),
+                temp_impact == "POSITIVE",
+            ],
+            [0, 1, 2],
+            default=3
+        )
         
-        if not recommendations:
-            recommendations.append("Continue normal crop management practices")
+        impacts = {}
+        for i, crop in enumerate(self._crops):
+            _, temp_factor, temp_rec = TEMP_OUTCOMES[temp_case[i]]
+            _, rain_factor, rain_rec = RAIN_OUTCOMES[rain_case[i]]
+            overall, severity, confidence = OVERALL_OUTCOMES[overall_case[i]]
+            
+            factors = [f for f in (temp_factor, rain_factor) if f]
+            recommendations = [r for r in (temp_rec, rain_rec) if r]
+            if not recommendations:
+                recommendations.append("Continue normal crop management practices")
+            
+            impacts[crop] = {
+                "crop": crop,
+                "impact": overall,
+                "severity": severity,
+                "confidence": confidence,
+                "message": f"{crop.upper()}: " + " | ".join(factors),
+                "recommendations": recommendations
+            }
         
-        return {
-            "impact": overall_impact,
-            "severity": severity,
-            "confidence": confidence,
-            "message": message,
-            "recommendations": recommendations
-        }
+        return impacts
     
     def _get_neutral_impact(self) -> Dict[str, Any]:
         return {
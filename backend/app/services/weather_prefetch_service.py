@@ -0,0 +1,56 @@
+import time
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.price_alert import PriceAlert
+from app.services.weather_service import WeatherService, normalize_city
+from app.services.weather_impact_service import weather_impact_service
+from app.core.logging_config import logger
+
+# Users without a saved location are analyzed for this city
+DEFAULT_CITY = "Delhi"
+
+
+def user_city(location: Optional[str]) -> str:
+    """The city a saved location is prefetched and analyzed under."""
+    return normalize_city(location or "") or normalize_city(DEFAULT_CITY)
+
+
+class WeatherPrefetchService:
+
+    def collect_locations(self, db: Session) -> List[str]:
+        user_rows = db.query(User.location).filter(
+            User.is_active == True,
+            User.notification_enabled == True
+        ).distinct().all()
+
+        alert_rows = db.query(PriceAlert.city).filter(
+            PriceAlert.is_active == True
+        ).distinct().all()
+
+        cities = [user_city(location) for (location,) in user_rows]
+        cities.extend(normalize_city(city) for (city,) in alert_rows if city and city.strip())
+
+        return list(dict.fromkeys(cities))
+
+    def prefetch(self, cities: List[str]) -> Dict[str, Dict]:
+        start_time = time.perf_counter()
+
+        # OpenWeather forecasts feed the agent's decision engine
+        forecasts = WeatherService.prefetch_forecasts(cities)
+
+        # Open-Meteo daily forecasts feed crop impact analysis (batched per request)
+        weather_impact_service.prefetch_forecasts(cities)
+
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"[OK] Weather prefetch: {len(forecasts)}/{len(cities)} cities in {elapsed:.2f}s")
+
+        return forecasts
+
+    def prefetch_for_monitoring(self, db: Session) -> Dict[str, Dict]:
+        return self.prefetch(self.collect_locations(db))
+
+
+# Singleton instance
+weather_prefetch_service = WeatherPrefetchService()
@@ -1,8 +1,12 @@
 import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
+from typing import Dict, Iterable
 from app.core.cache import cache_manager
+from app.services.forecast_frame import ForecastFrame
 from app.core.logging_config import logger
 
 load_dotenv()
@@ -14,10 +18,27 @@ BASE_URL = "https://api.openweathermap.org/data/2.5"
 WEATHER_CACHE_TTL = 3600  # 1 hour for current weather
 FORECAST_CACHE_TTL = 7200  # 2 hours for forecasts
 
+# Upper bound on concurrent upstream calls during a prefetch
+PREFETCH_MAX_WORKERS = 8
+
+# Forecast generations when Redis is down, so this process still sees forecasts change
+_local_generations: Dict[str, int] = {}
+_local_generations_lock = threading.Lock()
+
+
+def normalize_city(city: str) -> str:
+    """City as it appears in cache keys, so "Delhi" and " delhi" share entries."""
+    return city.strip().lower()
+
+
+def location_key(city: str, country_code: str = "IN") -> str:
+    return f"{normalize_city(city)}:{country_code.strip().upper()}"
+
+
 class WeatherService:
     @staticmethod
     def get_current_weather(city: str, country_code: str = "IN"):
-        cache_key = f"{city}:{country_code}"
+        cache_key = location_key(city, country_code)
         
         # Try to get from cache first
         cached = cache_manager.get("weather:current", cache_key)
@@ -62,48 +83,51 @@ class WeatherService:
             return {"error": f"Weather service error: {str(e)}"}
     
     @staticmethod
-    def get_forecast(city: str, country_code: str = "IN", days: int = 5):
-        cache_key = f"{city}:{country_code}:{days}"
+    def get_forecast_frame(city: str, country_code: str = "IN", days: int = 5) -> ForecastFrame:
+        """Columnar forecast, cached in binary form. Raises requests.RequestException on failure."""
+        cache_key = f"{location_key(city, country_code)}:{days}"
         
         # Try to get from cache first
-        cached = cache_manager.get("weather:forecast", cache_key)
+        cached = cache_manager.get_raw("weather:forecast_frame", cache_key)
         if cached:
             logger.info(f"Forecast cache hit for {city}", endpoint="weather")
-            return cached
+            return ForecastFrame.from_bytes(cached)
+        
+        url = f"{BASE_URL}/forecast"
+        params = {
+            "q": f"{city},{country_code}",
+            "appid": OPENWEATHER_API_KEY,
+            "units": "metric"
+        }
+        
+        logger.info(f"Fetching forecast from API for {city}", endpoint="weather")
+        response = requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        
+        # Built once per fetch; every consumer reads the same columns
+        frame = ForecastFrame.from_openweather(response.json(), limit=days * 8)  # 8 forecasts per day
         
+        cache_manager.set_raw("weather:forecast_frame", cache_key, frame.to_bytes(), FORECAST_CACHE_TTL)
+        generation_key = location_key(city, country_code)
+        if cache_manager.incr("weather:generation", generation_key) is None:
+            with _local_generations_lock:
+                _local_generations[generation_key] = _local_generations.get(generation_key, 0) + 1
+        
+        return frame
+    
+    @staticmethod
+    def forecast_generation(city: str, country_code: str = "IN") -> int:
+        """Bumped every time a new forecast for the city is fetched; counted per process without Redis."""
+        generation_key = location_key(city, country_code)
+        if not cache_manager.is_available():
+            return _local_generations.get(generation_key, 0)
+        raw = cache_manager.get_raw("weather:generation", generation_key)
+        return int(raw) if raw is not None else 0
+    
+    @staticmethod
+    def get_forecast(city: str, country_code: str = "IN", days: int = 5):
         try:
-            url = f"{BASE_URL}/forecast"
-            params = {
-                "q": f"{city},{country_code}",
-                "appid": OPENWEATHER_API_KEY,
-                "units": "metric"
-            }
-            
-            logger.info(f"Fetching forecast from API for {city}", endpoint="weather")
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            forecast_list = []
-            for item in data["list"][:days * 8]:  # 8 forecasts per day
-                forecast_list.append({
-                    "datetime": item["dt_txt"],
-                    "temperature": item["main"]["temp"],
-                    "description": item["weather"][0]["description"],
-                    "rain_probability": item.get("pop", 0) * 100,
-                    "humidity": item["main"]["humidity"]
-                })
-            
-            result = {
-                "city": data["city"]["name"],
-                "forecasts": forecast_list,
-                "cached": False
-            }
-            
-            # Cache the result
-            cache_manager.set("weather:forecast", cache_key, result, FORECAST_CACHE_TTL)
-            
-            return result
+            return WeatherService.get_forecast_frame(city, country_code, days).to_forecast_dict()
             
         except requests.Timeout:
             logger.error(f"Forecast API timeout for {city}", endpoint="weather")
@@ -111,4 +135,50 @@ class WeatherService:
         except requests.RequestException as e:
             logger.error(f"Forecast API error for {city}: {str(e)}", exc_info=e, endpoint="weather")
             return {"error": f"Forecast service error: {str(e)}"}
+    
+    @staticmethod
+    def prefetch_forecasts(
+        cities: Iterable[str],
+        country_code: str = "IN",
+        days: int = 5,
+        max_workers: int = PREFETCH_MAX_WORKERS
+    ) -> Dict[str, ForecastFrame]:
+        def fetch(city: str):
+            try:
+                return WeatherService.get_forecast_frame(city, country_code, days)
+            except requests.RequestException as e:
+                return {"error": str(e)}
+        
+        return WeatherService._fetch_concurrently(fetch, cities, max_workers, label="forecast")
+    
+    @staticmethod
+    def prefetch_current_weather(
+        cities: Iterable[str],
+        country_code: str = "IN",
+        max_workers: int = PREFETCH_MAX_WORKERS
+    ) -> Dict[str, Dict]:
+        return WeatherService._fetch_concurrently(
+            lambda city: WeatherService.get_current_weather(city, country_code),
+            cities,
+            max_workers,
+            label="current weather"
+        )
+    
+    @staticmethod
+    def _fetch_concurrently(fetch, cities: Iterable[str], max_workers: int, label: str) -> Dict[str, Dict]:
+        # Deduplicate while keeping the exact spelling, since it is part of the cache key
+        unique_cities = list(dict.fromkeys(c.strip() for c in cities if c and c.strip()))
+        if not unique_cities:
+            return {}
+        
+        logger.info(f"Prefetching {label} for {len(unique_cities)} cities", endpoint="weather")
+        
+        # The fetchers are cache-first, so warm cities cost a Redis read only
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_cities)))) as executor:
+            results = dict(zip(unique_cities, executor.map(fetch, unique_cities)))
+        
+        failed = [city for city, result in results.items() if isinstance(result, dict) and "error" in result]
+        if failed:
+            logger.warning(f"{label.capitalize()} prefetch failed for {len(failed)} cities: {', '.join(failed[:10])}", endpoint="weather")
         
+        return {city: result for city, result in results.items() if not (isinstance(result, dict) and "error" in result)}
@@ -1,8 +1,79 @@
+import glob
+import itertools
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import joblib
 import numpy as np
+import sklearn
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
 import pandas as pd
-from typing import Dict
+
+from app.core.config import settings
+from app.core.lru_cache import LRUCache
+from app.services.flat_forest import FlatForest
+from app.core.logging_config import logger
+
+# Bump when the artifact layout, the feature order or the target changes
+ARTIFACT_FORMAT = 3
+
+# The model predicts yield per hectare; totals are that times the area
+FEATURES = ['crop_encoded', 'rainfall', 'temperature', 'soil_ph', 'nitrogen', 'phosphorus', 'potassium']
+
+# Uniform ranges the synthetic training features are drawn from
+FEATURE_RANGES = {
+    'area': (0.5, 10),  # hectares
+    'rainfall': (300, 2000),  # mm
+    'temperature': (15, 35),  # celsius
+    'soil_ph': (5.5, 8.5),
+    'nitrogen': (20, 100),  # kg/ha
+    'phosphorus': (20, 80),  # kg/ha
+    'potassium': (20, 80),  # kg/ha
+}
+
+# Inputs a caller supplies per scenario, and the bounds the API accepts for them
+INPUT_FEATURES = ['area', 'rainfall', 'temperature', 'soil_ph', 'nitrogen', 'phosphorus', 'potassium']
+INPUT_LIMITS = {
+    'area': (0, None),  # > 0
+    'rainfall': (0, None),
+    'temperature': (0, 50),
+    'soil_ph': (0, 14),
+    'nitrogen': (0, None),
+    'phosphorus': (0, None),
+    'potassium': (0, None),
+}
+
+# Resolution single predictions are made at, so near-identical requests share a cache entry
+PREDICTION_RESOLUTION = {
+    'rainfall': 10,  # mm
+    'temperature': 0.5,  # celsius
+    'soil_ph': 0.1,
+    'nitrogen': 1,  # kg/ha
+    'phosphorus': 1,  # kg/ha
+    'potassium': 1,  # kg/ha
+}
+
+# Batches up to this size use the flattened forest; larger ones amortize sklearn's
+# per-call overhead and its compiled traversal is faster (both give identical output)
+FLAT_FOREST_MAX_ROWS = 1000
+
+# Upper bound on rows in one sweep; one predict call over this many stays well under a second
+MAX_SWEEP_SCENARIOS = 10000
+
+# Fertilizer optimizer: a coarse grid over the whole N-P-K box, then finer grids around the
+# best candidates until the grid spacing or the time budget runs out
+NUTRIENTS = ['nitrogen', 'phosphorus', 'potassium']
+OPTIMIZE_COARSE_STEPS = 24  # Per nutrient; 13,824 candidates
+OPTIMIZE_REFINE_STEPS = 10  # Per nutrient around each seed
+OPTIMIZE_REFINE_SEEDS = 4
+OPTIMIZE_MIN_STEP = 0.5  # kg/ha
+OPTIMIZE_TIME_BUDGET = 0.5  # seconds
+
 
 class YieldService:
     # Crop data with typical yield ranges (quintals per hectare)
@@ -19,116 +90,122 @@ class YieldService:
     
     SOIL_TYPES = ["loamy", "clay", "sandy", "black", "red", "alluvial"]
     
-    def __init__(self):
-      self.label_encoders = {}
-      self.model = self._train_model()
-      
+    def __init__(self, artifact_path: Optional[str] = None):
+        self.artifact_path = artifact_path or settings.YIELD_MODEL_PATH
+        self._artifact: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self.prediction_cache = LRUCache(settings.YIELD_CACHE_SIZE, settings.YIELD_CACHE_TTL_SECONDS)
     
-    def _train_model(self):
-        # Generate synthetic training data
-        np.random.seed(42)
-        n_samples = 1000
-        
-        crops = list(self.CROP_DATA.keys())
-        
-        training_data = []
-        for _ in range(n_samples):
-            crop = np.random.choice(crops)
-            crop_info = self.CROP_DATA[crop]
-            
-            # Generate features
-            area = np.random.uniform(0.5, 10)  # hectares
-            rainfall = np.random.uniform(300, 2000)  # mm
-            temperature = np.random.uniform(15, 35)  # celsius
-            soil_ph = np.random.uniform(5.5, 8.5)
-            nitrogen = np.random.uniform(20, 100)  # kg/ha
-            phosphorus = np.random.uniform(20, 80)  # kg/ha
-            potassium = np.random.uniform(20, 80)  # kg/ha
-            
-            # Calculate yield based on conditions
-            base_yield = (crop_info["min_yield"] + crop_info["max_yield"]) / 2
-            
-            # Adjust for environmental factors
-            temp_factor = 1 - abs(temperature - crop_info["optimal_temp"]) / 20
-            rain_factor = 1 - abs(rainfall - crop_info["optimal_rainfall"]) / 1000
-            ph_factor = 1 - abs(soil_ph - 7.0) / 2
-            nutrient_factor = (nitrogen + phosphorus + potassium) / 240
-            
-            yield_per_ha = base_yield * temp_factor * rain_factor * ph_factor * nutrient_factor
-            yield_per_ha = max(crop_info["min_yield"], min(crop_info["max_yield"], yield_per_ha))
-            
-            total_yield = yield_per_ha * area
-            
-            training_data.append({
-                'crop': crop,
-                'area': area,
-                'rainfall': rainfall,
-                'temperature': temperature,
-                'soil_ph': soil_ph,
-                'nitrogen': nitrogen,
-                'phosphorus': phosphorus,
-                'potassium': potassium,
-                'yield': total_yield
-            })
-        
-        df = pd.DataFrame(training_data)
-        
-        # Encode categorical variables
-        self.label_encoders['crop'] = LabelEncoder()
-        df['crop_encoded'] = self.label_encoders['crop'].fit_transform(df['crop'])
+    @property
+    def model(self) -> RandomForestRegressor:
+        """The sklearn estimator; only large batches need it, so a saved one is loaded on first use."""
+        artifact = self._loaded()
+        if 'model' not in artifact:
+            with self._lock:
+                if 'model' not in artifact:
+                    artifact['model'] = joblib.load(artifact['estimator_path'])
+                    logger.info(f"Yield estimator loaded from {artifact['estimator_path']}")
+        return artifact['model']
+    
+    @property
+    def forest(self) -> FlatForest:
+        """Array-backed copy of the model used for predictions; same output, less per-call overhead."""
+        return self._loaded()['forest']
+    
+    @property
+    def label_encoders(self) -> Dict[str, LabelEncoder]:
+        return self._loaded()['label_encoders']
+    
+    @property
+    def metadata(self) -> Dict:
+        return self._loaded()['metadata']
+    
+    def warmup(self, require_artifact: bool = False) -> Dict:
+        """
+        Load the model now instead of on the first prediction.
         
-        # Features and target
-        X = df[['crop_encoded', 'area', 'rainfall', 'temperature', 'soil_ph', 
-                'nitrogen', 'phosphorus', 'potassium']]
-        y = df['yield']
+        With require_artifact a missing or unusable artifact raises instead of
+        being replaced by an in-process training run.
+        """
+        if require_artifact and self._artifact is None:
+            with self._lock:
+                if self._artifact is None:
+                    self._artifact = self._load()
+        return self.metadata
+    
+    def _loaded(self) -> Dict:
+        if self._artifact is None:
+            with self._lock:
+                if self._artifact is None:
+                    self._artifact = self._load_or_train()
+        return self._artifact
+    
+    def _load(self) -> Dict:
+        start = time.perf_counter()
+        artifact = load_artifact(self.artifact_path)
+        logger.info(
+            f"Yield model {artifact['metadata']['version']} loaded from {self.artifact_path} "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return artifact
+    
+    def _load_or_train(self) -> Dict:
+        start = time.perf_counter()
         
-        # Train model
-        model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
-        model.fit(X, y)
+        if os.path.exists(self.artifact_path):
+            try:
+                return self._load()
+            except Exception as e:
+                logger.warning(f"Yield model artifact {self.artifact_path} unusable ({e}); training in-process")
+        else:
+            logger.warning(
+                f"Yield model artifact {self.artifact_path} not found; training in-process "
+                f"(run scripts/train_yield_model.py to avoid this)"
+            )
         
-        return model
+        artifact = train_artifact()
+        logger.info(f"Yield model trained in-process in {time.perf_counter() - start:.2f}s")
+        return artifact
     
     def predict_yield(self, crop: str, area: float, rainfall: float, temperature: float,
                      soil_ph: float, nitrogen: float, phosphorus: float, potassium: float) -> Dict:
+        """
+        Predict one field's yield, with condition checks and recommendations.
+        
+        Inputs are rounded to PREDICTION_RESOLUTION and the per-hectare part of
+        the result is cached under (crop, rounded inputs), so requests that differ
+        only in insignificant decimals or in area share one model call.
+        """
         try:
-            if crop.lower() not in self.CROP_DATA:
+            crop = crop.lower()
+            if crop not in self.CROP_DATA:
                 return {"error": f"Crop '{crop}' not supported. Supported crops: {', '.join(self.CROP_DATA.keys())}"}
             
-            crop_info = self.CROP_DATA[crop.lower()]
-            
-            # Encode crop
-            crop_encoded = self.label_encoders['crop'].transform([crop.lower()])[0]
-            
-            # Prepare features
-            features = np.array([[crop_encoded, area, rainfall, temperature, soil_ph,
-                                nitrogen, phosphorus, potassium]])
-            
-            # Predict
-            predicted_yield = self.model.predict(features)[0]
-            yield_per_hectare = predicted_yield / area
+            crop_info = self.CROP_DATA[crop]
+            inputs = quantize_inputs(rainfall=rainfall, temperature=temperature, soil_ph=soil_ph,
+                                     nitrogen=nitrogen, phosphorus=phosphorus, potassium=potassium)
             
-            # Calculate confidence and recommendations
-            recommendations = self._generate_recommendations(
-                crop.lower(), temperature, rainfall, soil_ph, nitrogen, phosphorus, potassium
-            )
+            key = (crop, *inputs.values())
+            per_hectare = self.prediction_cache.get(key)
+            if per_hectare is None:
+                per_hectare = self._predict_per_hectare(crop, inputs)
+                self.prediction_cache.set(key, per_hectare)
             
-            # Calculate optimal vs actual
-            optimal_conditions = self._check_optimal_conditions(
-                crop.lower(), temperature, rainfall, soil_ph
-            )
+            predicted_yield = per_hectare["yield"] * area
             
             return {
-                "crop": crop.lower(),
+                "crop": crop,
                 "area_hectares": round(area, 2),
                 "predicted_total_yield": round(predicted_yield, 2),
-                "predicted_yield_per_hectare": round(yield_per_hectare, 2),
+                "predicted_yield_per_hectare": round(per_hectare["yield"], 2),
                 "unit": "quintals",
                 "expected_range": {
                     "min": round(crop_info["min_yield"] * area, 2),
                     "max": round(crop_info["max_yield"] * area, 2)
                 },
-                "optimal_conditions": optimal_conditions,
-                "recommendations": recommendations,
+                # Copies, so callers cannot alter the cached entry
+                "optimal_conditions": dict(per_hectare["optimal_conditions"]),
+                "recommendations": [dict(r) for r in per_hectare["recommendations"]],
                 "input_parameters": {
                     "rainfall_mm": rainfall,
                     "temperature_celsius": temperature,
@@ -142,6 +219,283 @@ class YieldService:
         except Exception as e:
             return {"error": str(e)}
     
+    def _predict_per_hectare(self, crop: str, inputs: Dict[str, float]) -> Dict:
+        # Predict
+        predicted = float(self._predict(self._build_feature_matrix(crop, inputs))[0])
+        
+        # Calculate confidence and recommendations
+        recommendations = self._generate_recommendations(
+            crop, inputs['temperature'], inputs['rainfall'], inputs['soil_ph'],
+            inputs['nitrogen'], inputs['phosphorus'], inputs['potassium']
+        )
+        
+        # Calculate optimal vs actual
+        optimal_conditions = self._check_optimal_conditions(
+            crop, inputs['temperature'], inputs['rainfall'], inputs['soil_ph']
+        )
+        
+        return {"yield": predicted, "optimal_conditions": optimal_conditions, "recommendations": recommendations}
+    
+    def memory_stats(self) -> Dict:
+        if self._artifact is None:
+            return {"loaded": False}
+        
+        forest = self._artifact['forest']
+        return {
+            "loaded": True,
+            "model_version": self._artifact['metadata']['version'],
+            "forest_nodes": forest.n_nodes,
+            "forest_mb": round(forest.nbytes / (1024 * 1024), 2),
+            # Mapped arrays live in the page cache, shared by every worker on the node
+            "forest_memory_mapped": forest.memory_mapped,
+            "estimator_loaded": 'model' in self._artifact,
+        }
+    
+    def cache_stats(self) -> Dict:
+        return {
+            "model_version": self.metadata['version'] if self._artifact is not None else None,
+            "resolution": PREDICTION_RESOLUTION,
+            **self.prediction_cache.stats()
+        }
+    
+    def sweep(
+        self,
+        crop: str,
+        base: Mapping[str, float],
+        ranges: Optional[Mapping[str, Sequence[float]]] = None,
+        scenarios: Optional[Sequence[Mapping[str, float]]] = None
+    ) -> Dict:
+        """
+        Predict many "what if" variations of one field with a single model call.
+        
+        Args:
+            base: Value of every input feature, used wherever a scenario does not override it
+            ranges: Values to try per feature; every combination becomes a scenario
+            scenarios: Explicit overrides, one scenario each (appended after the grid)
+        
+        Returns a compact table: only the inputs that vary get a column.
+        Raises ValueError for unknown crops or features, out-of-range values and
+        requests larger than MAX_SWEEP_SCENARIOS.
+        """
+        crop = crop.lower()
+        if crop not in self.CROP_DATA:
+            raise ValueError(f"Crop '{crop}' not supported. Supported crops: {', '.join(self.CROP_DATA.keys())}")
+        
+        ranges = ranges or {}
+        scenarios = scenarios or []
+        missing = set(INPUT_FEATURES) - set(base)
+        if missing:
+            raise ValueError(f"Base scenario is missing: {', '.join(sorted(missing))}")
+        self._check_feature_names(ranges, *scenarios)
+        
+        # Python ints: a numpy product of large ranges wraps around and can slip past the limit
+        grid_size = math.prod(len(values) for values in ranges.values()) if ranges else 0
+        total = grid_size + len(scenarios)
+        if total == 0:
+            raise ValueError("Provide ranges or scenarios to sweep")
+        if total > MAX_SWEEP_SCENARIOS:
+            raise ValueError(f"{total} scenarios requested; at most {MAX_SWEEP_SCENARIOS} per sweep")
+        
+        varied = [name for name in INPUT_FEATURES if name in ranges or any(name in s for s in scenarios)]
+        columns = {name: np.full(total, float(base[name])) for name in INPUT_FEATURES}
+        
+        if ranges:
+            # Cartesian product in the order the ranges were given, last one varying fastest
+            grid = np.array(list(itertools.product(*ranges.values())), dtype=float).reshape(grid_size, len(ranges))
+            for i, name in enumerate(ranges):
+                columns[name][:grid_size] = grid[:, i]
+        
+        for row, overrides in enumerate(scenarios, start=grid_size):
+            for name, value in overrides.items():
+                columns[name][row] = value
+        
+        self._check_limits(columns)
+        
+        per_hectare = self._predict(self._build_feature_matrix(crop, columns))
+        total_yield = per_hectare * columns['area']
+        
+        table = np.column_stack([columns[name] for name in varied] + [total_yield, per_hectare])
+        best = int(np.argmax(per_hectare))
+        
+        return {
+            "crop": crop,
+            "unit": "quintals",
+            "scenarios": total,
+            "fixed": {name: float(base[name]) for name in INPUT_FEATURES if name not in varied},
+            "columns": varied + ["predicted_total_yield", "predicted_yield_per_hectare"],
+            "rows": np.round(table, 2).tolist(),
+            "best": {
+                "row": best,
+                **{name: round(float(columns[name][best]), 2) for name in varied},
+                "predicted_yield_per_hectare": round(float(per_hectare[best]), 2)
+            }
+        }
+    
+    def optimize_inputs(
+        self,
+        crop: str,
+        base: Mapping[str, float],
+        objective: str = "yield",
+        costs: Optional[Mapping[str, float]] = None,
+        price_per_quintal: Optional[float] = None,
+        bounds: Optional[Mapping[str, Tuple[float, float]]] = None,
+        time_budget: float = OPTIMIZE_TIME_BUDGET
+    ) -> Dict:
+        """
+        Search nitrogen, phosphorus and potassium for the mix with the best predicted outcome.
+        
+        Args:
+            base: Current inputs; the non-nutrient values are held fixed and the
+                nutrient values are reported as the baseline
+            objective: "yield" (total quintals) or "profit" (revenue minus fertilizer cost)
+            costs: Price per kg of each nutrient; missing nutrients cost nothing
+            price_per_quintal: Crop price, required for "profit"
+            bounds: (low, high) kg/ha per nutrient; defaults to the range the model was trained on
+            time_budget: Seconds after which no further refinement round is started
+        
+        The forest is piecewise constant, so ties are common; among equally good
+        mixes the one with the least fertilizer wins.
+        """
+        start = time.perf_counter()
+        crop = crop.lower()
+        if crop not in self.CROP_DATA:
+            raise ValueError(f"Crop '{crop}' not supported. Supported crops: {', '.join(self.CROP_DATA.keys())}")
+        if objective not in ("yield", "profit"):
+            raise ValueError("objective must be 'yield' or 'profit'")
+        if objective == "profit" and price_per_quintal is None:
+            raise ValueError("price_per_quintal is required to optimize profit")
+        
+        costs = costs or {}
+        bounds = bounds or {}
+        self._check_feature_names(costs, bounds)
+        unsupported = (set(costs) | set(bounds)) - set(NUTRIENTS)
+        if unsupported:
+            raise ValueError(f"Only {', '.join(NUTRIENTS)} can be optimized, not {', '.join(sorted(unsupported))}")
+        
+        fixed = {name: np.array([float(base[name])]) for name in INPUT_FEATURES}
+        self._check_limits(fixed)
+        area = float(base['area'])
+        
+        trained_ranges = self.metadata.get('feature_ranges', FEATURE_RANGES)
+        low, high = np.array([bounds.get(n, trained_ranges[n]) for n in NUTRIENTS], dtype=float).T
+        if np.any(low < 0) or np.any(low > high):
+            raise ValueError("Nutrient bounds must satisfy 0 <= low <= high")
+        cost_per_ha = np.array([float(costs.get(n, 0.0)) for n in NUTRIENTS])
+        
+        def evaluate(candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            columns = {**fixed, **{n: candidates[:, i] for i, n in enumerate(NUTRIENTS)}}
+            total_yield = self._predict(self._build_feature_matrix(crop, columns)) * area
+            if objective == "yield":
+                return total_yield, total_yield
+            return total_yield * price_per_quintal - area * (candidates @ cost_per_ha), total_yield
+        
+        def grid(lo: np.ndarray, hi: np.ndarray, steps: int) -> np.ndarray:
+            axes = [np.linspace(l, h, steps) for l, h in zip(lo, hi)]
+            return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(NUTRIENTS))
+        
+        def ranked(candidates: np.ndarray, scores: np.ndarray) -> np.ndarray:
+            # Best score first; less total fertilizer breaks ties
+            return np.lexsort((candidates.sum(axis=1), -scores))
+        
+        current = np.array([[float(base[n]) for n in NUTRIENTS]])
+        current_score, current_yield = evaluate(current)
+        
+        candidates = grid(low, high, OPTIMIZE_COARSE_STEPS)
+        if np.all((current >= low) & (current <= high)):
+            # Never recommend something worse than what the farmer already does
+            candidates = np.concatenate([current, candidates])
+        scores, yields = evaluate(candidates)
+        step = (high - low) / (OPTIMIZE_COARSE_STEPS - 1)
+        evaluated, rounds = len(candidates), 1
+        last_round = time.perf_counter() - start
+        
+        while step.max() > OPTIMIZE_MIN_STEP:
+            round_start = time.perf_counter()
+            # Stop when another round of the same size would overrun the budget
+            if round_start - start + last_round > time_budget:
+                break
+            
+            order = ranked(candidates, scores)[:OPTIMIZE_REFINE_SEEDS]
+            seeds, seed_scores, seed_yields = candidates[order], scores[order], yields[order]
+            
+            refined = np.concatenate([
+                grid(np.maximum(seed - step, low), np.minimum(seed + step, high), OPTIMIZE_REFINE_STEPS)
+                for seed in seeds
+            ])
+            refined_scores, refined_yields = evaluate(refined)
+            
+            candidates = np.concatenate([seeds, refined])
+            scores = np.concatenate([seed_scores, refined_scores])
+            yields = np.concatenate([seed_yields, refined_yields])
+            
+            step = 2 * step / (OPTIMIZE_REFINE_STEPS - 1)
+            evaluated += len(refined)
+            rounds += 1
+            last_round = time.perf_counter() - round_start
+        
+        best = ranked(candidates, scores)[0]
+        
+        def outcome(mix: np.ndarray, total_yield: float, score: float) -> Dict:
+            result = {
+                **{n: round(float(mix[i]), 1) for i, n in enumerate(NUTRIENTS)},
+                "predicted_total_yield": round(float(total_yield), 2),
+                "predicted_yield_per_hectare": round(float(total_yield) / area, 2),
+                "fertilizer_cost": round(area * float(mix @ cost_per_ha), 2),
+            }
+            if objective == "profit":
+                result["profit"] = round(float(score), 2)
+            return result
+        
+        return {
+            "crop": crop,
+            "objective": objective,
+            "unit": "quintals",
+            "recommended": outcome(candidates[best], yields[best], scores[best]),
+            "current": outcome(current[0], current_yield[0], current_score[0]),
+            "improvement": round(float(scores[best] - current_score[0]), 2),
+            "search": {
+                "bounds": {n: [float(low[i]), float(high[i])] for i, n in enumerate(NUTRIENTS)},
+                "candidates_evaluated": evaluated,
+                "rounds": rounds,
+                "final_step_kg_per_ha": round(float(step.max()), 2),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+        }
+    
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        if len(features) <= FLAT_FOREST_MAX_ROWS:
+            return self.forest.predict(features)
+        return self.model.predict(features)
+    
+    def _build_feature_matrix(self, crop: str, columns: Mapping[str, Union[float, np.ndarray]]) -> np.ndarray:
+        """(n, len(FEATURES)) float matrix in model order; scalar inputs are broadcast."""
+        crop_encoded = self.label_encoders['crop'].transform([crop])[0]
+        n = max((np.size(value) for value in columns.values()), default=1)
+        
+        matrix = np.empty((n, len(FEATURES)), dtype=float)
+        matrix[:, 0] = crop_encoded
+        for i, name in enumerate(FEATURES[1:], start=1):
+            matrix[:, i] = columns[name]
+        return matrix
+    
+    @staticmethod
+    def _check_feature_names(*specs: Mapping[str, object]):
+        unknown = set().union(*specs) - set(INPUT_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}. Supported: {', '.join(INPUT_FEATURES)}")
+    
+    @staticmethod
+    def _check_limits(columns: Mapping[str, np.ndarray]):
+        for name, (low, high) in INPUT_LIMITS.items():
+            values = columns[name]
+            if not np.all(np.isfinite(values)):
+                raise ValueError(f"{name} must be a finite number")
+            if name == 'area' and np.any(values <= 0):
+                raise ValueError("area must be greater than 0")
+            if np.any(values < low) or (high is not None and np.any(values > high)):
+                limit = f"between {low} and {high}" if high is not None else f"at least {low}"
+                raise ValueError(f"{name} must be {limit}")
+    
     def _check_optimal_conditions(self, crop: str, temperature: float, 
                                   rainfall: float, soil_ph: float) -> Dict:
         crop_info = self.CROP_DATA[crop]
@@ -249,3 +603,175 @@ class YieldService:
     @staticmethod
     def get_supported_crops():
         return list(YieldService.CROP_DATA.keys())
+
+
+def quantize_inputs(**inputs: float) -> Dict[str, float]:
+    """Round each input to its PREDICTION_RESOLUTION step (in PREDICTION_RESOLUTION order)."""
+    return {
+        # The outer round strips float noise such as 6.300000000000001
+        name: round(round(inputs[name] / step) * step, 6)
+        for name, step in PREDICTION_RESOLUTION.items()
+    }
+
+
+def generate_training_data(
+    n_samples: int = 1000,
+    seed: int = 42,
+    feature_ranges: Optional[Dict[str, Tuple[float, float]]] = None
+) -> pd.DataFrame:
+    """
+    Synthetic training set: uniform features per FEATURE_RANGES and a yield from
+    the agronomic rule below, computed for all samples at once.
+    
+    Args:
+        feature_ranges: Overrides for some or all of FEATURE_RANGES
+    """
+    ranges = {**FEATURE_RANGES, **(feature_ranges or {})}
+    unknown = set(ranges) - set(FEATURE_RANGES)
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+    
+    rng = np.random.default_rng(seed)
+    
+    crops = np.array(list(YieldService.CROP_DATA.keys()), dtype=object)
+    crop_idx = rng.integers(len(crops), size=n_samples)
+    
+    # Generate features
+    features = {name: rng.uniform(low, high, n_samples) for name, (low, high) in ranges.items()}
+    
+    # Per-sample crop parameters
+    def crop_column(key: str) -> np.ndarray:
+        return np.array([YieldService.CROP_DATA[crop][key] for crop in crops], dtype=float)[crop_idx]
+    
+    min_yield = crop_column("min_yield")
+    max_yield = crop_column("max_yield")
+    
+    # Calculate yield based on conditions
+    base_yield = (min_yield + max_yield) / 2
+    
+    # Adjust for environmental factors
+    temp_factor = 1 - np.abs(features['temperature'] - crop_column("optimal_temp")) / 20
+    rain_factor = 1 - np.abs(features['rainfall'] - crop_column("optimal_rainfall")) / 1000
+    ph_factor = 1 - np.abs(features['soil_ph'] - 7.0) / 2
+    nutrient_factor = (features['nitrogen'] + features['phosphorus'] + features['potassium']) / 240
+    
+    yield_per_ha = np.clip(base_yield * temp_factor * rain_factor * ph_factor * nutrient_factor, min_yield, max_yield)
+    
+    return pd.DataFrame({
+        'crop': crops[crop_idx],
+        **features,
+        'yield': yield_per_ha * features['area'],
+    })
+
+
+def train_artifact(
+    n_samples: int = 1000,
+    n_estimators: int = 100,
+    seed: int = 42,
+    feature_ranges: Optional[Dict[str, Tuple[float, float]]] = None
+) -> Dict:
+    """Train the yield model on synthetic data; returns the artifact save_artifact writes."""
+    df = generate_training_data(n_samples, seed, feature_ranges)
+    
+    # Encode categorical variables
+    label_encoders = {'crop': LabelEncoder()}
+    df['crop_encoded'] = label_encoders['crop'].fit_transform(df['crop'])
+    
+    # Train model (on plain arrays, matching how predict_yield passes features);
+    # all cores for the fit, single-threaded again for per-request predictions
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=seed, max_depth=10, n_jobs=-1)
+    model.fit(df[FEATURES].to_numpy(), (df['yield'] / df['area']).to_numpy())
+    model.set_params(n_jobs=None)
+    
+    forest = FlatForest.from_sklearn(model)
+    trained_at = datetime.now(timezone.utc)
+    return {
+        'model': model,
+        'forest': forest,
+        'label_encoders': label_encoders,
+        'metadata': {
+            'format': ARTIFACT_FORMAT,
+            # Names the forest/estimator files, so two trainings must never share one
+            'version': f"{trained_at.strftime('%Y%m%d%H%M%S%f')}-{forest.digest()[:8]}",
+            'trained_at': trained_at.isoformat(),
+            'sklearn_version': sklearn.__version__,
+            'features': FEATURES,
+            'target': 'yield_per_hectare',
+            'crops': list(label_encoders['crop'].classes_),
+            'n_samples': n_samples,
+            'n_estimators': n_estimators,
+            'seed': seed,
+            'feature_ranges': {**FEATURE_RANGES, **(feature_ranges or {})},
+        }
+    }
+
+
+def artifact_files(path: str, version: str) -> Tuple[str, str]:
+    """Forest and estimator files that belong to the manifest at path for a model version."""
+    stem = os.path.splitext(path)[0]
+    return f"{stem}-{version}.forest", f"{stem}-{version}.estimator.joblib"
+
+
+def save_artifact(artifact: Dict, path: str):
+    """
+    Write an artifact as three files:
+    
+        path                               manifest: metadata and label encoders
+        <stem>-<version>.forest            flattened forest, memory-mapped by load_artifact
+        <stem>-<version>.estimator.joblib  sklearn estimator, loaded only for large batches
+    
+    The manifest is swapped in last, so a loading worker sees one version or the
+    other, never a mix. Files of the version being replaced are kept for workers
+    that still use it; anything older is removed.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    forest_path, estimator_path = artifact_files(path, artifact['metadata']['version'])
+    keep = {forest_path, estimator_path}
+    if os.path.exists(path):
+        try:
+            keep.update(artifact_files(path, joblib.load(path)['metadata']['version']))
+        except Exception:
+            pass  # Unreadable previous manifest; nothing of it worth keeping
+    
+    artifact['forest'].save(forest_path)
+    
+    # Write next to the target and swap, so a running worker never reads half a file
+    tmp_path = f"{estimator_path}.tmp"
+    joblib.dump(artifact['model'], tmp_path)
+    os.replace(tmp_path, estimator_path)
+    
+    tmp_path = f"{path}.tmp"
+    joblib.dump({'label_encoders': artifact['label_encoders'], 'metadata': artifact['metadata']}, tmp_path)
+    os.replace(tmp_path, path)
+    
+    stem = os.path.splitext(path)[0]
+    for stale in glob.glob(f"{glob.escape(stem)}-*.forest") + glob.glob(f"{glob.escape(stem)}-*.estimator.joblib"):
+        if stale not in keep:
+            os.remove(stale)
+
+
+def load_artifact(path: str, mmap: bool = True) -> Dict:
+    """
+    Load the manifest at path and map its forest; the estimator is left on disk
+    (see YieldService.model) so workers do not each hold a private copy of it.
+    """
+    artifact = joblib.load(path)
+    metadata = artifact['metadata']
+    
+    if metadata.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"artifact format {metadata.get('format')}, expected {ARTIFACT_FORMAT}")
+    if metadata.get('sklearn_version') != sklearn.__version__:
+        # Pickled trees are only guaranteed to load on the version that wrote them
+        raise ValueError(f"trained with scikit-learn {metadata.get('sklearn_version')}, running {sklearn.__version__}")
+    
+    forest_path, estimator_path = artifact_files(path, metadata['version'])
+    artifact['forest'] = FlatForest.load(forest_path, mmap=mmap)
+    artifact['estimator_path'] = estimator_path
+    return artifact
+
+
+# Singleton instance
+yield_service = YieldService()
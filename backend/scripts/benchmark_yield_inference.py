@@ -0,0 +1,54 @@
+"""
+Yield Inference Benchmark
+Compares sklearn's forest.predict with the flattened forest for single rows and batches
+Usage: python scripts/benchmark_yield_inference.py [--repeats 1000] [--batch 1000 10000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.yield_service import FEATURES, generate_training_data, yield_service
+
+
+def percentiles(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(timings, [50, 99]) * 1000
+    return p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark yield model inference")
+    parser.add_argument("--repeats", type=int, default=1000, help="Timed calls per single-row measurement")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    model, forest = yield_service.model, yield_service.forest
+    print(f"{forest.n_trees} trees, {forest.n_nodes} nodes, depth {forest.depth}")
+
+    df = generate_training_data(max(args.batch), seed=1)
+    df['crop_encoded'] = yield_service.label_encoders['crop'].transform(df['crop'])
+    X = df[FEATURES].to_numpy()
+
+    if not np.array_equal(model.predict(X), forest.predict(X)):
+        print("WARNING: flattened forest output differs from sklearn")
+
+    print(f"{'rows':>8} {'sklearn p50/p99 (ms)':>22} {'flat p50/p99 (ms)':>20}")
+    for rows, repeats in [(1, args.repeats)] + [(n, max(5, args.repeats // 100)) for n in args.batch]:
+        batch = X[:rows]
+        sk = percentiles(lambda: model.predict(batch), repeats)
+        flat = percentiles(lambda: forest.predict(batch), repeats)
+        print(f"{rows:>8} {sk[0]:>10.3f} / {sk[1]:<9.3f} {flat[0]:>9.3f} / {flat[1]:<9.3f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Yield Training Benchmark
+Times synthetic data generation and model training at several sample counts
+Usage: python scripts/benchmark_yield_training.py [--samples 1000 100000 1000000] [--estimators 100]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.yield_service import generate_training_data, train_artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark yield model training")
+    parser.add_argument("--samples", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--estimators", type=int, default=100)
+    parser.add_argument("--skip-training", action="store_true", help="Only time data generation")
+    args = parser.parse_args()
+    
+    print(f"{'samples':>10} {'generate (s)':>14} {'train (s)':>11}")
+    for n in args.samples:
+        start = time.perf_counter()
+        generate_training_data(n)
+        generate_seconds = time.perf_counter() - start
+        
+        train_seconds = float("nan")
+        if not args.skip_training:
+            start = time.perf_counter()
+            train_artifact(n_samples=n, n_estimators=args.estimators)
+            train_seconds = time.perf_counter() - start
+        
+        print(f"{n:>10} {generate_seconds:>14.3f} {train_seconds:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
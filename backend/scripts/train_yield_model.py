@@ -0,0 +1,64 @@
+"""
+Yield Model Training Script
+Trains the crop yield model and writes the versioned artifact the API loads
+Run at image build time, or whenever the training data or model settings change
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.yield_service import FEATURE_RANGES, train_artifact, save_artifact
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_range(value: str):
+    # name=low:high, e.g. rainfall=200:2500
+    try:
+        name, bounds = value.split("=", 1)
+        low, high = (float(b) for b in bounds.split(":", 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=LOW:HIGH, got '{value}'")
+    if name not in FEATURE_RANGES or low >= high:
+        raise argparse.ArgumentTypeError(f"invalid range '{value}' (features: {', '.join(FEATURE_RANGES)})")
+    return name, (low, high)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the crop yield model")
+    parser.add_argument("--output", default=settings.YIELD_MODEL_PATH, help="Artifact path")
+    parser.add_argument("--samples", type=int, default=1000, help="Synthetic training samples")
+    parser.add_argument("--estimators", type=int, default=100, help="Trees in the forest")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument(
+        "--range", type=parse_range, action="append", default=[], metavar="NAME=LOW:HIGH",
+        help="Override a feature's sampling range (repeatable)"
+    )
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    artifact = train_artifact(
+        n_samples=args.samples,
+        n_estimators=args.estimators,
+        seed=args.seed,
+        feature_ranges=dict(args.range)
+    )
+    save_artifact(artifact, args.output)
+    
+    metadata = artifact['metadata']
+    logger.info(f"✅ Yield model {metadata['version']} written to {args.output} in {time.perf_counter() - start:.2f}s")
+    logger.info(f"   {metadata['n_estimators']} trees, {metadata['n_samples']} samples, crops: {', '.join(metadata['crops'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.database import Base
+from app.models.agent_analysis import AgentAnalysis
+from app.models.user import User
+from app.services.agent_service import SmartCropAgent
+from app.services.analysis_store import AnalysisStore
+from app.services.data_integration_service import data_service
+
+
+def slow(result, delay):
+    def call(*args, **kwargs):
+        time.sleep(delay)
+        return result
+    return call
+
+
+PRICES = pd.DataFrame({"date": pd.date_range(end=pd.Timestamp.today().normalize(), periods=30), "price": [20.0] * 29 + [22.0]})
+PREDICTION = {"predictions": [{"date": "2024-02-05", "predicted_price": 25.0}]}
+
+
+@pytest.mark.unit
+class TestAnalyzePipeline:
+
+    @pytest.fixture
+    def agent(self):
+        agent = SmartCropAgent()
+        agent.llm = None
+        with patch("app.services.agent_service.analysis_store.add", side_effect=len):
+            yield agent
+        agent.shutdown()
+
+    def test_inputs_fetched_concurrently(self, agent):
+        with patch.object(data_service, "get_price_data", slow(PRICES, 0.3)), \
+             patch("app.services.agent_service.PriceService.predict_prices", slow(PREDICTION, 0.3)), \
+             patch.object(agent.weather_service, "get_forecast_frame", slow(None, 0.3)):
+            start = time.perf_counter()
+            result = asyncio.run(agent.analyze_crop_async("tomato", "Pune"))
+            elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.8
+        assert result["predicted_price"] == 25.0
+        assert {"price_data", "prediction", "weather", "decision", "save"} <= set(result["metadata"]["timings"])
+
+    def test_slow_optional_step_times_out(self, agent):
+        agent.WEATHER_TIMEOUT = 0.1
+
+        with patch.object(data_service, "get_price_data", return_value=PRICES), \
+             patch("app.services.agent_service.PriceService.predict_prices", return_value=PREDICTION), \
+             patch.object(agent.weather_service, "get_forecast_frame", slow(None, 1.0)):
+            result = agent.analyze_crop("tomato", "Pune")
+
+        assert result["decision"]["action"]
+        assert result["metadata"]["timings"]["weather"] < 0.5
+
+    def test_response_carries_template_insights(self, agent):
+        with patch.object(data_service, "get_price_data", return_value=PRICES), \
+             patch("app.services.agent_service.PriceService.predict_prices", return_value=PREDICTION):
+            result = agent.analyze_crop("tomato", fetch_weather=False)
+
+        assert result["llm_insights_status"] == "fallback"
+        assert result["llm_insights"].startswith("Tomato ka bhav abhi stable hai (Rs.22.00/kg). Price predicted to rise")
+        assert result["analysis_key"]
+
+    def test_blocking_entry_point_shares_one_loop(self, agent):
+        loops = []
+
+        def price_data(*args, **kwargs):
+            loops.append(agent._loop)
+            return PRICES
+
+        async def inside_running_loop():
+            return agent.analyze_crop("tomato", fetch_weather=False)
+
+        with patch.object(data_service, "get_price_data", price_data), \
+             patch("app.services.agent_service.PriceService.predict_prices", return_value=PREDICTION):
+            results = [asyncio.run(inside_running_loop())]
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                results += pool.map(lambda crop: agent.analyze_crop(crop, fetch_weather=False), ["onion", "rice", "wheat"])
+
+        assert all(r["decision"]["action"] for r in results)
+        assert len(loops) == 4 and len(set(map(id, loops))) == 1
+
+    def test_missing_prices_is_an_error(self, agent):
+        with patch.object(data_service, "get_price_data", side_effect=RuntimeError("db down")), \
+             patch("app.services.agent_service.PriceService.predict_prices", return_value=PREDICTION):
+            result = agent.analyze_crop("tomato", fetch_weather=False)
+
+        assert result["confidence"] == 0.0
+        assert "price_data" in result["metadata"]["timings"]
+
+
+@pytest.mark.unit
+class TestBackgroundInsights:
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = AnalysisStore(spool_path=str(tmp_path / "analyses.spool"))
+        yield store
+        store.stop()
+
+    @pytest.fixture
+    def session_factory(self, store):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+
+        @contextmanager
+        def test_session():
+            session = factory()
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+
+        with patch("app.services.analysis_store.get_db_session", test_session), \
+             patch("app.services.analysis_store.get_db_session_no_commit", test_session), \
+             patch("app.services.agent_service.analysis_store", store):
+            yield factory
+        engine.dispose()
+
+    def run_analysis(self, agent):
+        with patch.object(data_service, "get_price_data", return_value=PRICES), \
+             patch("app.services.agent_service.PriceService.predict_prices", return_value=PREDICTION):
+            result = agent.analyze_crop("onion", fetch_weather=False)
+        agent.llm_executor.shutdown(wait=True)
+        return agent.get_insights(result["analysis_key"]), result
+
+    def test_insights_readable_before_and_after_flush(self, session_factory, store):
+        agent = SmartCropAgent()
+        agent.llm = None
+
+        insights, result = self.run_analysis(agent)
+        assert insights["status"] == "fallback"
+
+        store.flush()
+
+        db = session_factory()
+        record = db.query(AgentAnalysis).one()
+        assert record.analysis_key == result["analysis_key"]
+        assert agent.get_insights(result["analysis_key"])["llm_insights"] == record.llm_insights
+        db.close()
+
+    def test_llm_text_attached_after_response(self, session_factory):
+        agent = SmartCropAgent()
+        agent.llm = MagicMock()
+        agent.llm.generate_content.return_value = MagicMock(text=" Pyaz abhi mat bechiye. ")
+
+        insights, result = self.run_analysis(agent)
+
+        assert result["llm_insights_status"] == "pending"
+        assert insights["status"] == "ready"
+        assert insights["llm_insights"] == "Pyaz abhi mat bechiye."
+
+    def test_missed_deadline_keeps_template(self, session_factory):
+        agent = SmartCropAgent()
+        agent.llm = MagicMock()
+        agent.llm.generate_content.side_effect = TimeoutError("deadline exceeded")
+
+        insights, result = self.run_analysis(agent)
+
+        assert insights["status"] == "fallback"
+        assert insights["llm_insights"] == result["llm_insights"]
+
+    def analyze_behind_busy_worker(self, agent, release):
+        """Queue an analysis's LLM job behind one that holds the only worker until release is set."""
+        agent.llm_executor = ThreadPoolExecutor(max_workers=1)
+        agent.llm_executor.submit(release.wait, 5)
+        with patch.object(data_service, "get_price_data", return_value=PRICES), \
+             patch("app.services.agent_service.PriceService.predict_prices", return_value=PREDICTION):
+            return agent.analyze_crop("onion", fetch_weather=False)
+
+    def test_jobs_cancelled_at_shutdown_fall_back(self, session_factory):
+        agent = SmartCropAgent()
+        agent.llm = MagicMock()
+        release = threading.Event()
+
+        result = self.analyze_behind_busy_worker(agent, release)
+        agent.shutdown()
+        release.set()
+
+        assert agent.get_insights(result["analysis_key"])["status"] == "fallback"
+        agent.llm.generate_content.assert_not_called()
+
+    def test_queue_wait_counts_toward_deadline(self, session_factory):
+        agent = SmartCropAgent()
+        agent.llm = MagicMock()
+        agent.llm.generate_content.return_value = MagicMock(text="Pyaz abhi mat bechiye.")
+        release = threading.Event()
+
+        with patch.object(settings, "LLM_INSIGHTS_DEADLINE_SECONDS", 0.2):
+            result = self.analyze_behind_busy_worker(agent, release)
+            time.sleep(0.3)
+            release.set()
+            agent.llm_executor.shutdown(wait=True)
+
+        assert agent.get_insights(result["analysis_key"])["status"] == "fallback"
+        agent.llm.generate_content.assert_not_called()
+
+    def test_insights_written_directly_when_queue_is_full(self, session_factory, store):
+        agent = SmartCropAgent()
+        agent.llm = MagicMock()
+        agent.llm.generate_content.return_value = MagicMock(text="Pyaz abhi mat bechiye.")
+
+        with patch.object(store, "amend", return_value=False):
+            _, result = self.run_analysis(agent)
+        store.flush()
+
+        db = session_factory()
+        record = db.query(AgentAnalysis).one()
+        assert (record.llm_insights_status, record.llm_insights) == ("ready", "Pyaz abhi mat bechiye.")
+        db.close()
+
+
+@pytest.mark.unit
+class TestBatchAnalysis:
+
+    @staticmethod
+    def run_batch(tmp_path, items, get_price_data):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+
+        @contextmanager
+        def test_session():
+            session = factory()
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+
+        store = AnalysisStore(spool_path=str(tmp_path / "analyses.spool"))
+        agent = SmartCropAgent()
+        agent.llm = None
+
+        with patch("app.services.analysis_store.get_db_session", test_session), \
+             patch("app.services.agent_service.analysis_store", store), \
+             patch.object(data_service, "get_price_data", side_effect=get_price_data) as prices, \
+             patch("app.services.agent_service.PriceService.predict_prices", return_value=PREDICTION) as predict, \
+             patch.object(agent.weather_service, "get_forecast_frame", return_value=None) as weather:
+            batch = asyncio.run(agent.analyze_batch_async(items))
+            store.stop()
+
+        db = factory()
+        stored = {row.analysis_key for row in db.query(AgentAnalysis)}
+        db.close()
+        engine.dispose()
+        return batch, stored, (prices.call_count, predict.call_count, weather.call_count)
+
+    def test_inputs_loaded_once_per_crop_and_city(self, tmp_path):
+        items = [
+            {"crop": "onion", "city": "Pune", "days": 7},
+            {"crop": "onion", "city": "Delhi", "days": 30},
+            {"crop": "wheat", "city": "Pune", "days": 7},
+        ]
+        batch, stored, calls = self.run_batch(tmp_path, items, lambda crop, **kwargs: PRICES)
+
+        # Prices per crop, predictions per (crop, days), forecasts per city
+        assert calls == (2, 3, 2)
+        assert [(r["crop"], r["city"], r["days_ahead"]) for r in batch["results"]] == [
+            ("onion", "Pune", 7), ("onion", "Delhi", 30), ("wheat", "Pune", 7)
+        ]
+        assert stored == {r["analysis_key"] for r in batch["results"]}
+
+    def test_failed_price_load_only_fails_its_items(self, tmp_path):
+        def get_price_data(crop, **kwargs):
+            if crop == "wheat":
+                raise ConnectionError("price source down")
+            return PRICES
+
+        items = [{"crop": "wheat", "city": "Pune", "days": 7}, {"crop": "onion", "city": "Pune", "days": 7}]
+        batch, stored, calls = self.run_batch(tmp_path, items, get_price_data)
+
+        wheat, onion = batch["results"]
+        assert wheat["reasoning"] == "Analysis failed: No price data available"
+        assert onion["analysis_key"] in stored
+        # The failed crop is not retried outside its guarded step
+        assert calls[0] == 2
+
+
+def monitoring_analysis(crop, city, **kwargs):
+    action = "WAIT" if crop == "rice" else "HOLD"
+    return {
+        "crop": crop,
+        "city": city,
+        "decision": {"action": action, "confidence": 0.8, "reason": "Prices rising", "expected_price": 30.0},
+        "llm_insights": "Rukiye",
+        "timestamp": "2026-01-01T07:00:00",
+    }
+
+
+@pytest.mark.unit
+class TestDailyMonitoring:
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = AnalysisStore(spool_path=str(tmp_path / "analyses.spool"))
+        yield store
+        store.stop()
+
+    @pytest.fixture
+    def session_factory(self, store):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+
+        db = factory()
+        db.add_all([
+            User(id=1, email="a@example.com", hashed_password="x", location="Pune", favorite_crops=["Rice", "rice"], risk_tolerance="medium"),
+            User(id=2, email="b@example.com", hashed_password="x", location=" pune ", favorite_crops=["rice", "Wheat"], risk_tolerance="low"),
+            User(id=3, email="c@example.com", hashed_password="x", location="  ", favorite_crops=["wheat"]),
+            User(id=4, email="d@example.com", hashed_password="x", location="Pune", favorite_crops=[], risk_tolerance="high"),
+            User(id=5, email="e@example.com", hashed_password="x", location="Pune", favorite_crops=["rice"], notification_enabled=False),
+            User(id=6, email="f@example.com", hashed_password="x", location="Pune", favorite_crops=["rice"], risk_tolerance="high"),
+        ])
+        db.commit()
+        db.close()
+
+        @contextmanager
+        def test_session():
+            session = factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        with patch("app.services.agent_service.get_db_session_no_commit", test_session), \
+             patch.object(data_service, "price_data_version", return_value="2026-10-18|180|x"), \
+             patch("app.services.agent_service.weather_prefetch_service") as prefetch:
+            prefetch.collect_locations.return_value = ["pune", "delhi"]
+            prefetch.prefetch.return_value = {}
+            yield factory
+        engine.dispose()
+
+    def run(self, agent, checkpoint=None, last_run=None):
+        alerts = []
+        cache = MagicMock()
+        cache.get.side_effect = lambda namespace, key: {"checkpoint": checkpoint, "last_run": last_run}[key]
+
+        with patch("app.services.agent_service.cache_manager", cache), \
+             patch.object(agent, "analyze_crop", side_effect=monitoring_analysis) as analyze:
+            summary = agent.run_daily_monitoring(on_alert=alerts.append)
+
+        return summary, alerts, analyze, cache
+
+    def test_each_pair_analyzed_once_across_chunks(self, session_factory):
+        agent = SmartCropAgent()
+        agent.MONITORING_CHUNK_SIZE = 2
+
+        summary, alerts, analyze, cache = self.run(agent)
+
+        pairs = sorted(call.args[:2] for call in analyze.call_args_list)
+        assert pairs == [("rice", "pune"), ("wheat", "delhi"), ("wheat", "pune")]
+        assert [(a["user_id"], a["action"], a["reasoning"][:6]) for a in alerts] == [
+            (1, "WAIT", "Rukiye"),
+            (2, "SELL_NOW", "Prices"),
+            (6, "WAIT", "Rukiye"),
+        ]
+        assert summary["users"] == 5
+        assert summary["alerts"] == 3
+        assert summary["skipped"] == 0
+        assert cache.set.call_count == 4  # One checkpoint per chunk, then the finished-run marker
+        cache.delete.assert_called_once_with("agent:monitoring", "checkpoint")
+
+    def test_resumes_after_checkpoint(self, session_factory):
+        checkpoint = {"run_date": datetime.now().date().isoformat(), "last_user_id": 3, "users": 3, "alerts": 2}
+
+        summary, alerts, analyze, _ = self.run(SmartCropAgent(), checkpoint)
+
+        assert [a["user_id"] for a in alerts] == [6]
+        assert summary["users"] == 5
+        assert summary["resumed_from_user_id"] == 3
+
+    def test_unchanged_pairs_skipped_and_not_renotified(self, session_factory):
+        agent = SmartCropAgent()
+        last_run = datetime.now(timezone.utc) + timedelta(hours=1)
+
+        db = session_factory()
+        db.add(AgentAnalysis(
+            crop="rice", city="pune", current_price=25.0, action="WAIT", confidence=0.8, reason="Prices rising",
+            risk_level="LOW", expected_price=30.0, llm_insights="Rukiye", analysis_key="prev",
+            input_fingerprint=agent._input_fingerprint("rice", "pune", None, {})
+        ))
+        # User 6 changed their profile after the last run
+        db.get(User, 6).updated_at = last_run + timedelta(hours=1)
+        db.commit()
+        db.close()
+
+        summary, alerts, analyze, _ = self.run(agent, last_run={"started_at": last_run.isoformat()})
+
+        assert sorted(call.args[:2] for call in analyze.call_args_list) == [("wheat", "delhi"), ("wheat", "pune")]
+        assert [(a["user_id"], a["action"], a["reasoning"]) for a in alerts] == [(6, "WAIT", "Rukiye")]
+        assert summary["skipped"] == 1
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app.services.analysis_cache import AnalysisResultCache
+
+
+class DictCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, namespace, key):
+        return self.values.get((namespace, key))
+
+    def set(self, namespace, key, value, ttl=3600):
+        self.values[(namespace, key)] = value
+        return True
+
+
+@pytest.mark.unit
+class TestAnalysisResultCache:
+
+    @pytest.fixture(autouse=True)
+    def store(self):
+        store = DictCache()
+        with patch("app.services.analysis_cache.cache_manager", store):
+            yield store
+
+    def test_concurrent_requests_share_one_computation(self):
+        cache = AnalysisResultCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"decision": {"action": "HOLD"}, "analysis_key": "k1"}
+
+        async def burst():
+            return await asyncio.gather(*(cache.get_or_compute("onion:pune", compute) for _ in range(5)))
+
+        results = asyncio.run(burst())
+
+        assert len(calls) == 1
+        assert [computed for _, computed in results] == [True, False, False, False, False]
+        assert {r["analysis_key"] for r, _ in results} == {"k1"}
+
+        # Stored for later requests until the key (inputs) change
+        assert asyncio.run(cache.get_or_compute("onion:pune", compute)) == ({"decision": {"action": "HOLD"}, "analysis_key": "k1"}, False)
+        asyncio.run(cache.get_or_compute("onion:pune:gen2", compute))
+        assert len(calls) == 2
+        assert cache.stats() == {"hits": 1, "misses": 2, "coalesced": 4}
+
+    def test_stored_under_inputs_read_after_compute(self, store):
+        cache = AnalysisResultCache()
+        generation = [1]
+
+        async def compute():
+            generation[0] += 1  # The analysis fetched a fresh forecast
+            return {"decision": {"action": "SELL"}}
+
+        async def current_key():
+            return f"onion:pune:{generation[0]}"
+
+        asyncio.run(cache.get_or_compute("onion:pune:1", compute, store_key=current_key))
+
+        assert list(store.values) == [("agent:analysis", "onion:pune:2")]
+
+    def test_errors_are_not_stored(self, store):
+        cache = AnalysisResultCache()
+
+        async def compute():
+            return {"confidence": 0.0, "reasoning": "Analysis failed: no data"}
+
+        asyncio.run(cache.get_or_compute("onion:pune", compute))
+
+        assert store.values == {}
+
+    def test_key_tracks_inputs(self):
+        key = AnalysisResultCache.make_key("Onion", "Pune", 7, None, "2026-10-19|2026-10-19|180|x", 3)
+
+        assert key == "onion:pune:7:medium:2026-10-19|2026-10-19|180|x:3"
+        assert key != AnalysisResultCache.make_key("Onion", "Pune", 7, None, "2026-10-19|2026-10-19|180|x", 4)
@@ -0,0 +1,108 @@
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.agent_analysis import AgentAnalysis
+from app.services.analysis_store import AnalysisStore
+
+
+def analysis_row(key):
+    return {
+        "crop": "onion", "city": "Pune", "current_price": 20.0, "predicted_price": 22.0,
+        "action": "HOLD", "confidence": 0.4, "reason": "stable", "best_action_date": None,
+        "expected_price": 20.0, "risk_level": "MEDIUM", "market_signals": [{"strength": 0.3}],
+        "llm_insights": "template", "llm_insights_status": "pending", "analysis_key": key,
+        "analysis_duration": 0.1,
+    }
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+
+    @contextmanager
+    def test_session():
+        session = factory()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    with patch("app.services.analysis_store.get_db_session", test_session), \
+         patch("app.services.analysis_store.get_db_session_no_commit", test_session):
+        yield factory
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestAnalysisStore:
+
+    def test_rows_and_amends_written_in_one_flush(self, session_factory, tmp_path):
+        store = AnalysisStore(batch_size=100, flush_interval=60, spool_path=str(tmp_path / "spool"))
+
+        store.add([analysis_row("a"), analysis_row("b")])
+        store.amend("a", llm_insights="llm text", llm_insights_status="ready")
+        assert store.get("a") == {"llm_insights": "llm text", "llm_insights_status": "ready"}
+
+        store.flush()
+        store.amend("b", llm_insights_status="fallback")
+        store.stop()
+
+        db = session_factory()
+        rows = {r.analysis_key: r for r in db.query(AgentAnalysis)}
+        assert rows["a"].llm_insights == "llm text"
+        assert rows["b"].llm_insights_status == "fallback"
+        assert open(store.writer.stats()["spool_file"]).read() == ""
+        db.close()
+
+    def test_spooled_rows_recovered_once(self, session_factory, tmp_path):
+        spool = str(tmp_path / "spool")
+
+        # A process that queued rows but died before flushing
+        crashed = AnalysisStore(flush_interval=60, spool_path=spool)
+        crashed.writer._ensure_started = lambda: None
+        crashed.add([analysis_row("a"), analysis_row("b")])
+        crashed.writer._close_spool()
+
+        # "a" made it to the database before the crash
+        earlier = AnalysisStore(spool_path=None)
+        earlier.add([analysis_row("a")])
+        earlier.stop()
+
+        restarted = AnalysisStore(flush_interval=60, spool_path=spool)
+        assert restarted.recover() == 2
+        restarted.stop()
+
+        db = session_factory()
+        assert sorted(r.analysis_key for r in db.query(AgentAnalysis)) == ["a", "b"]
+        db.close()
+
+    def test_failed_batch_retried_and_readable_until_written(self, session_factory, tmp_path):
+        store = AnalysisStore(batch_size=100, flush_interval=60, spool_path=str(tmp_path / "spool"))
+        store.writer._ensure_started = lambda: None
+
+        store.add([analysis_row("a")])
+        with patch.object(store, "_execute", side_effect=RuntimeError("db down")):
+            store.flush()
+
+        assert store.writer.stats()["retrying"] == 1
+        assert store.get("a")["llm_insights_status"] == "pending"
+
+        store.add([analysis_row("b")])
+        assert store.flush() == 2
+
+        # Once the retry lands the journal starts over
+        assert store.writer.stats()["retrying"] == 0
+        assert open(store.writer.stats()["spool_file"]).read() == ""
+        store.stop()
+
+        db = session_factory()
+        assert sorted(r.analysis_key for r in db.query(AgentAnalysis)) == ["a", "b"]
+        db.close()
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from app.services.data_context import DataContext
+
+
+def history(days):
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days + 1)
+    return pd.DataFrame({"date": dates, "price": range(len(dates))})
+
+
+@pytest.mark.unit
+class TestDataContext:
+
+    def test_shorter_window_is_sliced_from_longer(self):
+        source = MagicMock()
+        source.get_price_data.side_effect = lambda crop, days, force_synthetic: history(days)
+        context = DataContext(source)
+
+        full = context.get_price_data("Wheat", days=180)
+        recent = context.get_price_data("wheat", days=30)
+
+        assert source.get_price_data.call_count == 1
+        assert len(full) == 181
+        assert len(recent) == 31
+        assert recent["price"].iloc[-1] == full["price"].iloc[-1]
+
+    def test_expected_window_covers_concurrent_callers(self):
+        source = MagicMock()
+        source.get_price_data.side_effect = lambda crop, days, force_synthetic: history(days)
+        context = DataContext(source)
+        context.expect("onion", 180)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            frames = list(executor.map(lambda days: context.get_price_data("onion", days=days), [30, 180, 2, 60]))
+
+        source.get_price_data.assert_called_once_with("onion", days=180, force_synthetic=False)
+        assert [len(f) for f in frames] == [31, 181, 3, 61]
+        assert context.stats() == {"loads": 1, "hits": 3, "series": 1}
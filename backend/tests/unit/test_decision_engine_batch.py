@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.services.decision_engine import DecisionEngine, SIGNAL_TYPES
+from app.services.forecast_frame import ForecastFrame
+
+CROPS = ["tomato", "onion", "potato", "wheat", "rice", "soyabean", "cotton"]
+
+
+def random_frame(rng, days):
+    n = days * 4
+    return ForecastFrame(
+        city="Pune",
+        source="test",
+        steps_per_day=4,
+        time=np.datetime64("2026-06-01") + np.arange(n) * np.timedelta64(6, "h"),
+        temperature=rng.uniform(15, 40, n).astype(np.float32),
+        precipitation=(rng.random(n) < 0.4) * rng.uniform(0, 3, n).astype(np.float32),
+        rain_probability=rng.uniform(0, 100, n).astype(np.float32),
+        humidity=np.full(n, 60, dtype=np.float32),
+        wind_speed=np.full(n, 3, dtype=np.float32),
+    )
+
+
+def random_rows(rng, n, horizon=10):
+    dates = [f"2026-06-{d:02d}" for d in range(2, 2 + horizon)]
+    rows = []
+    for _ in range(n):
+        current = float(rng.uniform(10, 50))
+        length = int(rng.integers(0, horizon + 1))
+        drift = rng.uniform(-0.4, 0.5)
+        path = [current * (1 + drift * (d + 1) / 7 + rng.normal(0, 0.02)) for d in range(length)]
+        rows.append({
+            "crop": CROPS[rng.integers(len(CROPS))],
+            "current": current,
+            "predictions": [{"date": dates[d], "price": p, "confidence": 0.75} for d, p in enumerate(path)],
+            "trend": {
+                "change_7d": float(rng.uniform(-12, 12)),
+                "change_30d": float(rng.uniform(-25, 25)),
+                "volatility": float(rng.uniform(0, 25)),
+            },
+            "frame": random_frame(rng, int(rng.integers(1, 7))) if rng.random() < 0.7 else None,
+            "risk": [None, "low", "medium", "high"][rng.integers(4)],
+        })
+    return rows, dates
+
+
+@pytest.mark.unit
+class TestAnalyzeMany:
+
+    def test_matches_scalar_engine(self):
+        rng = np.random.default_rng(7)
+        engine = DecisionEngine()
+        rows, dates = random_rows(rng, 600)
+        horizon = len(dates)
+
+        paths = np.full((len(rows), horizon), np.nan)
+        for i, row in enumerate(rows):
+            paths[i, :len(row["predictions"])] = [p["price"] for p in row["predictions"]]
+
+        batch = engine.analyze_many(
+            crops=[r["crop"] for r in rows],
+            current_prices=np.array([r["current"] for r in rows]),
+            predicted_paths=paths,
+            change_7d=np.array([r["trend"]["change_7d"] for r in rows]),
+            change_30d=np.array([r["trend"]["change_30d"] for r in rows]),
+            volatility=np.array([r["trend"]["volatility"] for r in rows]),
+            weather=np.array([engine.weather_features(r["frame"]) if r["frame"] else (np.nan,) * 3 for r in rows]),
+            prediction_dates=np.array(dates, dtype=object),
+            risk_tolerance=[r["risk"] for r in rows],
+        )
+
+        seen_actions = set()
+        for i, row in enumerate(rows):
+            expected = engine.analyze(
+                crop=row["crop"],
+                current_price=row["current"],
+                predicted_prices=row["predictions"],
+                price_trend=row["trend"],
+                weather_forecast=row["frame"],
+                user_preferences={"risk_tolerance": row["risk"]} if row["risk"] else None,
+            )
+            actual = engine.decision_at(batch, i)
+
+            assert batch.actions[i] == expected.action
+            assert batch.risk_levels[i] == expected.risk_level
+            assert batch.confidence[i] == expected.confidence
+            assert batch.expected_price[i] == expected.expected_price
+            assert batch.best_sell_date[i] == expected.best_sell_date
+            assert batch.bullish_score[i] == expected.metadata["bullish_score"]
+            assert batch.bearish_score[i] == expected.metadata["bearish_score"]
+
+            present = batch.signal_types[i] >= 0
+            assert [SIGNAL_TYPES[t] for t in batch.signal_types[i][present]] == [s.signal_type for s in expected.signals]
+            assert list(batch.signal_strengths[i][present]) == [s.strength for s in expected.signals]
+
+            assert actual.reasoning == expected.reasoning
+            assert actual.signals == expected.signals
+            seen_actions.add(expected.action)
+
+        assert seen_actions == {"SELL_NOW", "WAIT", "HOLD"}
@@ -0,0 +1,105 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.core.batch_writer import BatchWriter
+from app.services.decision_engine import DecisionEngine
+
+TREND = {"change_7d": 2.0, "change_30d": 4.0, "volatility": 8.0}
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, rows):
+        self.batches.append(list(rows))
+
+
+@pytest.mark.unit
+class TestDecisionHistory:
+
+    def test_history_is_bounded_and_thread_safe(self):
+        sink = ListSink()
+        engine = DecisionEngine(history_size=50, writer=BatchWriter("test", sink, max_batch=100))
+
+        def worker():
+            for _ in range(40):
+                engine.analyze("onion", 20.0, [{"date": "2026-06-02", "price": 25.0, "confidence": 0.8}], TREND)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.shutdown()
+
+        assert len(engine.decision_history) == 50
+        assert sum(len(b) for b in sink.batches) == 320
+        assert all(len(b) <= 100 for b in sink.batches)
+
+        recent = engine.recent_decisions(limit=3)
+        assert len(recent) == 3
+        assert recent[0]["crop"] == "onion" and recent[0]["action"] == "HOLD"
+
+        stats = engine.memory_stats()
+        assert stats["history_capacity"] == 50
+        assert stats["history_bytes_estimate"] > 0
+        assert stats["writer"]["written"] == 320
+
+    def test_decisions_not_written_without_a_writer(self):
+        engine = DecisionEngine(history_size=5)
+        engine.analyze("onion", 20.0, [{"date": "2026-06-02", "price": 25.0, "confidence": 0.8}], TREND)
+        engine.shutdown()
+
+        assert len(engine.decision_history) == 1
+        assert engine.memory_stats()["writer"] is None
+
+    def test_writer_drops_when_full_and_survives_failures(self):
+        def broken(rows):
+            raise RuntimeError("db down")
+
+        writer = BatchWriter("test", broken, max_batch=2, flush_interval=60, max_queue=3)
+        writer._ensure_started = lambda: None  # Keep the queue filling without a consumer
+
+        accepted = [writer.submit(i) for i in range(5)]
+        assert accepted == [True, True, True, False, False]
+
+        writer.flush()
+        stats = writer.stats()
+        assert stats["dropped"] == 2
+        assert stats["failed"] == 3
+        assert stats["pending"] == 0
+
+        # Failed items are kept for retry and still take up capacity
+        assert stats["retrying"] == 3
+        assert writer.submit(5) is False
+
+    def test_writers_sharing_a_spool_directory(self, tmp_path):
+        spool = str(tmp_path / "decisions.spool")
+        sinks = {tag: ListSink() for tag in "abc"}
+        writers = {}
+        for tag in "abc":
+            with patch("app.core.batch_writer._process_tag", return_value=f"host-{tag}"):
+                writers[tag] = BatchWriter(tag, sinks[tag], flush_interval=60, spool_path=spool)
+                writers[tag]._ensure_started = lambda: None
+                writers[tag].submit({"from": tag})
+
+        # "c" crashes; "b" writes everything it accepted and starts its journal over
+        writers["c"]._close_spool()
+        writers["b"].flush()
+        live = tmp_path / "decisions.host-a.spool"
+        assert live.read_text().count("\n") == 1
+
+        # Only the crashed process's journal is claimed; "a" still holds its own
+        assert writers["b"].recover() == 1
+        writers["b"].flush()
+        assert sinks["b"].batches == [[{"from": "b"}], [{"from": "c"}]]
+        assert not (tmp_path / "decisions.host-c.spool").exists()
+        assert live.read_text().count("\n") == 1
+
+        writers["a"].stop()
+        writers["b"].stop()
+        assert sinks["a"].batches == [[{"from": "a"}]]
+        assert live.read_text() == ""
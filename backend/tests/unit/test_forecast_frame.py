@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app.services.forecast_frame import ForecastFrame
+from app.services.decision_engine import DecisionEngine
+
+
+# 2023-11-15 00:00 IST
+IST_MIDNIGHT = 1699986600
+
+
+def openweather_payload(n=16, rain_mm=0.0, pop=0.0, start=IST_MIDNIGHT):
+    return {
+        "city": {"name": "Nashik", "timezone": 19800},
+        "list": [
+            {
+                "dt": start + i * 3 * 3600,
+                "main": {"temp": 20 + i % 8, "humidity": 70},
+                "weather": [{"description": "light rain" if rain_mm else "clear sky"}],
+                "wind": {"speed": 4},
+                "rain": {"3h": rain_mm},
+                "pop": pop,
+            }
+            for i in range(n)
+        ],
+    }
+
+
+@pytest.mark.unit
+class TestForecastFrame:
+
+    def test_bytes_round_trip(self):
+        frame = ForecastFrame.from_openweather(openweather_payload(rain_mm=2.5, pop=0.8))
+
+        restored = ForecastFrame.from_bytes(frame.to_bytes())
+
+        assert restored.city == "Nashik"
+        assert restored.steps_per_day == 8
+        assert np.array_equal(restored.time, frame.time)
+        assert np.array_equal(restored.temperature, frame.temperature)
+        assert restored.descriptions == frame.descriptions
+        assert restored.to_forecast_dict() == frame.to_forecast_dict()
+
+    def test_daily_views_share_memory(self):
+        frame = ForecastFrame.from_openweather(openweather_payload(n=16))
+
+        daily = frame.daily("temperature")
+
+        assert daily.shape == (2, 8)
+        assert np.shares_memory(daily, frame.temperature)
+        assert frame.daily_dates() == ["2023-11-15", "2023-11-16"]
+        assert frame.daily_max("temperature").tolist() == [27, 27]
+        assert frame.daily_min("temperature").tolist() == [20, 20]
+
+    def test_days_are_local_calendar_days(self):
+        # 15:00 UTC is 20:30 IST: the first IST day only has its last two slots
+        frame = ForecastFrame.from_openweather(openweather_payload(n=16, start=IST_MIDNIGHT - 3 * 3600 - 30 * 60))
+
+        daily = frame.daily("temperature")
+
+        assert frame.daily_dates() == ["2023-11-14", "2023-11-15", "2023-11-16"]
+        assert daily.shape == (3, 8)
+        assert np.isnan(daily[0, :6]).all() and np.isnan(daily[2, 6:]).all()
+        assert daily[1].tolist() == [22, 23, 24, 25, 26, 27, 20, 21]
+        assert frame.daily_max("temperature").tolist() == [21, 27, 27]
+        assert ForecastFrame.from_bytes(frame.to_bytes()).daily_dates() == frame.daily_dates()
+
+    def test_rain_signal_from_frame(self):
+        frame = ForecastFrame.from_openweather(openweather_payload(n=24, rain_mm=1.0, pop=0.7))
+
+        signal = DecisionEngine()._analyze_weather_impact("tomato", frame)
+
+        assert signal is not None
+        assert signal.signal_type == "BULLISH"
+        assert signal.data_source == "WEATHER_FORECAST"
+        assert "3 days, 24mm" in signal.reason
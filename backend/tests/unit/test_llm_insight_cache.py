@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.services.llm_insight_cache import LLMInsightCache
+
+
+class DictCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, namespace, key):
+        return self.values.get((namespace, key))
+
+    def set(self, namespace, key, value, ttl=3600):
+        self.values[(namespace, key)] = value
+        return True
+
+    def get_raw(self, namespace, key):
+        value = self.values.get((namespace, key))
+        return None if value is None else str(value).encode()
+
+    def incr(self, namespace, key, amount=1):
+        self.values[(namespace, key)] = self.values.get((namespace, key), 0) + amount
+        return self.values[(namespace, key)]
+
+
+@pytest.mark.unit
+class TestLLMInsightCache:
+
+    @pytest.fixture(autouse=True)
+    def cache(self):
+        with patch("app.services.llm_insight_cache.cache_manager", DictCache()):
+            yield
+
+    def test_normalized_prompt_hits_cache(self):
+        cache = LLMInsightCache()
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return "Abhi bechiye.", 120
+
+        first = cache.get_or_generate("gemini", "Crop: onion\nDecision:  SELL_NOW", generate)
+        second = cache.get_or_generate("gemini", "Crop: onion Decision: SELL_NOW  ", generate)
+        cache.get_or_generate("other-model", "Crop: onion Decision: SELL_NOW", generate)
+
+        assert first == second == "Abhi bechiye."
+        assert len(calls) == 2
+        assert cache.stats() == {"hits": 1, "misses": 2, "tokens_saved": 120, "hit_ratio": 0.3333}
+
+    def test_concurrent_identical_prompts_call_model_once(self):
+        cache = LLMInsightCache()
+        calls = []
+        lock = threading.Lock()
+
+        def generate():
+            with lock:
+                calls.append(1)
+            time.sleep(0.2)
+            return "Rukiye, bhav badhega.", None
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: cache.get_or_generate("gemini", "same prompt", generate), range(8)))
+
+        assert len(calls) == 1
+        assert set(results) == {"Rukiye, bhav badhega."}
+        assert cache.stats()["hits"] == 7
@@ -0,0 +1,262 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.user import User
+from app.models.notification import Notification
+from app.models.price_alert import PriceAlert
+from app.services import alert_index as index_module
+from app.services import alert_service as alert_module
+from app.services.alert_index import PriceAlertIndex
+from app.services.alert_service import AlertService
+from app.services.data_context import DataContext
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def prices(values):
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=len(values))
+    return pd.DataFrame({"date": dates, "price": values})
+
+
+@pytest.mark.unit
+class TestPriceAlertSweep:
+
+    def test_groups_share_price_loads_and_batches_commit(self, session_factory, monkeypatch):
+        db = session_factory()
+        users = [User(email=f"u{i}@example.com", hashed_password="x") for i in range(2)]
+        db.add_all(users)
+        db.flush()
+
+        def alert(user, crop, city, alert_type, price=None, pct=None, method="IN_APP", last=None):
+            return PriceAlert(user_id=user.id, crop=crop, city=city, alert_type=alert_type, threshold_price=price,
+                              threshold_percentage=pct, notification_method=method, last_triggered_at=last)
+
+        db.add_all([
+            alert(users[0], "onion", "Delhi", "ABOVE", price=20, method="EMAIL"),  # fires
+            alert(users[1], "onion", "Delhi", "ABOVE", price=30),
+            alert(users[0], "onion", "Pune", "BELOW", price=30),  # fires
+            alert(users[1], "onion", "Pune", "CHANGE", pct=10),  # 25 -> 22: fires
+            alert(users[1], "onion", "Pune", "ABOVE", price=1, last=datetime.now(timezone.utc) - timedelta(minutes=5)),
+            alert(users[0], "tomato", "Delhi", "CHANGE", pct=5),  # no previous day
+            alert(users[0], "potato", "Delhi", "ABOVE", price=1),  # no data
+        ])
+        db.commit()
+
+        sessions = []
+
+        @contextmanager
+        def test_session():
+            session = session_factory()
+            sessions.append(session)
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+
+        frames = {"onion": prices([25.0, 22.0]), "tomato": prices([40.0]), "potato": prices([])}
+        source = MagicMock()
+        source.get_price_data.side_effect = lambda crop, days, force_synthetic: frames[crop].tail(days)
+
+        service = AlertService(index=PriceAlertIndex())
+        service.email_service = MagicMock(send_email=AsyncMock(return_value=True))
+        monkeypatch.setattr(alert_module, "ALERT_BATCH_SIZE", 2)
+
+        with patch("app.services.alert_service.get_db_session", test_session), \
+             patch("app.services.alert_service.get_db_session_no_commit", test_session), \
+             patch("app.services.alert_index.get_db_session_no_commit", test_session):
+            result = asyncio.run(service.check_all_alerts(DataContext(source)))
+
+            # Nothing new has crossed: only the alert held back by its cooldown is looked at again
+            repeat = asyncio.run(service.check_all_alerts(DataContext(source)))
+
+        # Two CHANGE alerts plus the three threshold alerts the first price satisfies
+        assert (result["checked"], result["triggered"], result["groups"]) == (5, 3, 4)
+        assert (result["indexed"], result["candidates"]) == (5, 3)
+        assert (repeat["candidates"], repeat["triggered"]) == (1, 0)
+        # One load per crop, however many groups and alert types use it
+        assert source.get_price_data.call_count == 6
+        # Index build, CHANGE alerts, crossed alerts, then one transaction per batch of two
+        assert len(sessions) == 5 + 2
+
+        service.email_service.send_email.assert_awaited_once()
+        assert service.email_service.send_email.await_args.kwargs["to_email"] == "u0@example.com"
+
+        notifications = db.query(Notification).order_by(Notification.id).all()
+        assert sorted(n.message for n in notifications) == [
+            "Price Rs.22.00 is above your threshold of Rs.20.00",
+            "Price Rs.22.00 is below your threshold of Rs.30.00",
+            "Price decreased by 12.0% (Rs.22.00)",
+        ]
+        assert {json.loads(n.extra_data)["city"] for n in notifications} == {"Delhi", "Pune"}
+
+        db.expire_all()
+        assert db.query(PriceAlert).filter(PriceAlert.last_triggered_at.isnot(None)).count() == 4
+
+    def test_failed_commit_sends_no_email(self):
+        service = AlertService(index=PriceAlertIndex())
+        service.email_service = MagicMock(send_email=AsyncMock(return_value=True))
+        batch = pd.DataFrame([{
+            "id": "a1", "user_id": 1, "crop": "onion", "city": "Delhi", "alert_type": "ABOVE", "threshold_price": 20.0,
+            "threshold_percentage": None, "notification_method": "EMAIL", "last_triggered_at": None,
+            "email": "u@example.com",
+        }])
+
+        with patch("app.services.alert_service.get_db_session", side_effect=RuntimeError("db down")):
+            with pytest.raises(RuntimeError):
+                asyncio.run(service._trigger_batch(batch, [22.0], [float("nan")], datetime.now(timezone.utc)))
+
+        # Nothing recorded, nothing sent: next run retries the alert without a duplicate email
+        service.email_service.send_email.assert_not_awaited()
+
+
+class FakeCache:
+    """Dict-backed stand-in for the Redis cache manager."""
+
+    def __init__(self):
+        self.data = {}
+        self.writes = []
+
+    def get(self, namespace, key):
+        return json.loads(self.data[(namespace, key)]) if (namespace, key) in self.data else None
+
+    def set(self, namespace, key, value, ttl=3600):
+        self.data[(namespace, key)] = json.dumps(value)
+        self.writes.append(key)
+        return True
+
+    def incr(self, namespace, key, amount=1):
+        self.data[(namespace, key)] = int(self.data.get((namespace, key), 0)) + amount
+        return self.data[(namespace, key)]
+
+
+@pytest.mark.unit
+class TestPriceAlertIndex:
+
+    @staticmethod
+    def alert(alert_id, alert_type, price, crop="onion", city="Delhi", active=True):
+        return MagicMock(id=alert_id, crop=crop, city=city, alert_type=alert_type, threshold_price=price, is_active=active)
+
+    @staticmethod
+    def build(index, alerts):
+        with patch("app.services.alert_index.get_db_session_no_commit") as session:
+            session.return_value.__enter__.return_value.execute.return_value.all.return_value = [
+                (a.id, a.crop, a.city, a.alert_type, a.threshold_price, None)
+                for a in sorted(alerts, key=lambda a: a.threshold_price)
+            ]
+            index.sync()
+
+    def test_returns_only_crossed_thresholds(self, monkeypatch):
+        monkeypatch.setattr(index_module, "cache_manager", FakeCache())
+        key = ("onion", "Delhi")
+        index = PriceAlertIndex()
+        self.build(index, [
+            self.alert("a20", "ABOVE", 20), self.alert("a25", "ABOVE", 25), self.alert("a30", "ABOVE", 30),
+            self.alert("b15", "BELOW", 15), self.alert("b22", "BELOW", 22),
+        ])
+
+        # First price: judged on the level
+        assert sorted(index.crossed(key, 21.0)) == ["a20", "b22"]
+        assert index.crossed(key, 21.0) == []
+        # Up through 25 (ABOVE needs price > threshold), then down through 22 and 15
+        assert index.crossed(key, 26.0) == ["a25"]
+        assert index.crossed(key, 25.0) == []
+        assert index.crossed(key, 14.0) == ["b15", "b22"]
+
+        # Changes from the router apply in place; a new alert already satisfied fires once
+        index.upsert(self.alert("a10", "ABOVE", 10))
+        index.upsert(self.alert("a20", "ABOVE", 20, active=False))
+        index.remove("b15")
+        assert index.crossed(key, 12.0) == ["a10"]
+        assert index.crossed(key, 31.0) == ["a25", "a30"]
+        assert index.stats()["rebuilds"] == 1
+
+    def test_restores_from_redis_and_rebuilds_after_outside_changes(self, monkeypatch):
+        cache = FakeCache()
+        monkeypatch.setattr(index_module, "cache_manager", cache)
+        key = ("onion", "Delhi")
+        alerts = [self.alert("a20", "ABOVE", 20), self.alert("b15", "BELOW", 15)]
+
+        first = PriceAlertIndex()
+        self.build(first, alerts)
+        assert first.crossed(key, 18.0) == []
+        first.upsert(self.alert("a17", "ABOVE", 17))
+        assert first.stats()["stale"] is False
+        first.persist()
+
+        # A restarted worker picks up the thresholds, pending alerts and last price without a query
+        restarted = PriceAlertIndex()
+        restarted.sync()
+        assert restarted.stats()["restores"] == 1
+        assert restarted.crossed(key, 21.0) == ["a20", "a17"]
+        restarted.persist()
+
+        # A check that only moves the price leaves the threshold lists alone
+        cache.writes.clear()
+        assert restarted.crossed(key, 22.0) == []
+        restarted.persist()
+        assert not [key for key in cache.writes if key.startswith("group:")]
+
+        # Another worker changed an alert: the next sync rebuilds but keeps crossing from the last price
+        PriceAlertIndex().remove("a17")
+        first.persist()
+        self.build(restarted, alerts)
+        assert restarted.stats()["rebuilds"] == 1
+        assert restarted.crossed(key, 14.0) == ["b15"]
+
+    def test_candidates_survive_a_failed_check(self, monkeypatch):
+        monkeypatch.setattr(index_module, "cache_manager", FakeCache())
+        key = ("onion", "Delhi")
+        index = PriceAlertIndex()
+        self.build(index, [self.alert("a20", "ABOVE", 20), self.alert("a30", "ABOVE", 30)])
+
+        service = AlertService(index=index)
+        service._load_active_alerts = lambda *criteria: pd.DataFrame(columns=["crop", "city"])
+        service._group_prices = lambda crop, city, context: (25.0, float("nan"))
+        service._load_alerts_by_id = MagicMock(side_effect=RuntimeError("database went away"))
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(service.check_all_alerts(DataContext(MagicMock())))
+
+        # The price has moved on, but the undelivered crossing is still owed
+        assert index.crossed(key, 25.0) == ["a20"]
+
+    def test_candidate_moved_by_another_worker_waits_for_rebuild(self, monkeypatch):
+        monkeypatch.setattr(index_module, "cache_manager", FakeCache())
+        index = PriceAlertIndex()
+        self.build(index, [self.alert("a20", "ABOVE", 20)])
+
+        # Another worker moved the alert to Pune before this copy synced
+        service = AlertService(index=index)
+        service._load_active_alerts = lambda *criteria: pd.DataFrame(columns=["id", "crop", "city"])
+        service._group_prices = lambda crop, city, context: (25.0, float("nan"))
+        service._load_alerts_by_id = lambda ids: pd.DataFrame({"id": ids, "crop": "onion", "city": "Pune"})
+
+        result = asyncio.run(service.check_all_alerts(DataContext(MagicMock())))
+
+        assert (result["candidates"], result["checked"], result["triggered"]) == (1, 0, 0)
+        assert index.stats()["stale"] is True
+
+        # Judged in its new group once the index is rebuilt
+        self.build(index, [self.alert("a20", "ABOVE", 20, city="Pune")])
+        assert index.crossed(("onion", "Pune"), 25.0) == ["a20"]
@@ -0,0 +1,92 @@
+import pytest
+from contextlib import contextmanager
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.user import User
+from app.models.notification import Notification
+from app.services.weather_alert_service import WeatherAlertService
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestWeatherAlertRules:
+
+    def test_first_rule_in_group_wins(self):
+        service = WeatherAlertService()
+
+        alerts = service.alerts_for_conditions({"temperature": 42, "humidity": 90, "wind_speed": 3})
+
+        assert [a["type"] for a in alerts] == ["extreme_heat", "high_humidity"]
+        assert alerts[0]["message"].startswith("Extreme heat alert! Temperature is 42°C")
+
+    def test_rules_evaluated_per_location(self):
+        service = WeatherAlertService()
+        readings = [
+            {"temperature": 36.5, "humidity": 20, "wind_speed": 16},
+            {"temperature": 2, "humidity": 50, "wind_speed": 4},
+            {},
+        ]
+
+        hits = service.evaluate(service._conditions_matrix(readings))
+        fired = [[r.type for r, hit in zip(service.rules, hits[:, i]) if hit] for i in range(3)]
+
+        assert fired == [["heat_warning", "low_humidity", "strong_wind"], ["frost_warning"], []]
+
+    def test_sweep_fans_out_to_users(self, session_factory):
+        db = session_factory()
+        db.add_all([
+            User(email="a@example.com", hashed_password="x", location="Jaipur", is_active=True, notification_enabled=True),
+            User(email="b@example.com", hashed_password="x", location=" Jaipur ", is_active=True, notification_enabled=True),
+            User(email="c@example.com", hashed_password="x", location="Shimla", is_active=True, notification_enabled=True),
+            User(email="d@example.com", hashed_password="x", location="Jaipur", is_active=True, notification_enabled=False),
+        ])
+        db.commit()
+
+        @contextmanager
+        def test_session():
+            session = session_factory()
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+
+        weather = {
+            "Jaipur": {"temperature": 41, "humidity": 40, "wind_speed": 5},
+            "Shimla": {"temperature": 12, "humidity": 60, "wind_speed": 5},
+        }
+
+        with patch("app.services.weather_alert_service.get_db_session", test_session), \
+             patch("app.services.weather_alert_service.get_db_session_no_commit", test_session), \
+             patch("app.services.weather_alert_service.WeatherService.prefetch_current_weather",
+                   return_value=weather) as prefetch:
+            result = WeatherAlertService().run_sweep()
+            # The afternoon run finds the same heat: nobody is told twice in a day
+            repeat = WeatherAlertService().run_sweep()
+
+        assert prefetch.call_args_list[0].args[0] == ["Jaipur", "Shimla"]
+        assert (repeat["notifications"], repeat["skipped"]) == (0, 2)
+
+        assert result["users"] == 3
+        assert result["locations"] == 2
+        assert result["notifications"] == 2
+
+        notifications = db.query(Notification).all()
+        assert {n.extra_data["alert_type"] for n in notifications} == {"extreme_heat"}
+        assert all(n.type == "weather_warning" for n in notifications)
+        db.close()
@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from app.services.weather_impact_service import WeatherImpactService
+from app.services.forecast_frame import ForecastFrame
+
+
+def reference_impact(crop, sensitivity, avg_temp_max, avg_temp_min, total_rain, days):
+    """Per-crop rule chain the vectorized evaluator must reproduce."""
+    recommendations, factors = [], []
+    opt_min, opt_max = sensitivity["optimal_temp_min"], sensitivity["optimal_temp_max"]
+
+    if avg_temp_max > opt_max + 5:
+        temp_impact = "NEGATIVE"
+        factors.append("High temperature stress")
+        recommendations.append("Consider irrigation to cool crops")
+    elif avg_temp_max > opt_max:
+        temp_impact = "MODERATE_NEGATIVE"
+        factors.append("Above optimal temperature")
+    elif avg_temp_min < opt_min - 5:
+        temp_impact = "NEGATIVE"
+        factors.append("Low temperature stress")
+        recommendations.append("Protect crops from frost")
+    elif avg_temp_min < opt_min:
+        temp_impact = "MODERATE_NEGATIVE"
+        factors.append("Below optimal temperature")
+    else:
+        temp_impact = "POSITIVE"
+        factors.append("Optimal temperature range")
+
+    rain_per_day = total_rain / days
+    rain_impact = "NEUTRAL"
+    if sensitivity["rain_tolerance"] == "low":
+        if rain_per_day > 10:
+            rain_impact = "NEGATIVE"
+            factors.append("Excessive rainfall (low tolerance)")
+            recommendations.append("Ensure proper drainage")
+    elif sensitivity["rain_tolerance"] == "medium":
+        if rain_per_day > 20:
+            rain_impact = "MODERATE_NEGATIVE"
+            factors.append("High rainfall")
+    elif rain_per_day < 2 and sensitivity["drought_sensitive"]:
+        rain_impact = "MODERATE_NEGATIVE"
+        factors.append("Low rainfall (drought sensitive)")
+        recommendations.append("Increase irrigation frequency")
+
+    if temp_impact == "NEGATIVE" or rain_impact == "NEGATIVE":
+        overall, severity, confidence = "NEGATIVE", "high", 0.75
+    elif temp_impact == "MODERATE_NEGATIVE" or rain_impact == "MODERATE_NEGATIVE":
+        overall, severity, confidence = "MODERATE", "medium", 0.65
+    elif temp_impact == "POSITIVE":
+        overall, severity, confidence = "POSITIVE", "low", 0.80
+    else:
+        overall, severity, confidence = "NEUTRAL", "low", 0.70
+
+    if not recommendations:
+        recommendations.append("Continue normal crop management practices")
+
+    return {
+        "crop": crop,
+        "impact": overall,
+        "severity": severity,
+        "confidence": confidence,
+        "message": f"{crop.upper()}: " + " | ".join(factors),
+        "recommendations": recommendations,
+    }
+
+
+@pytest.mark.unit
+class TestVectorizedImpact:
+
+    def test_matches_rule_chain_for_every_crop(self):
+        service = WeatherImpactService()
+        grid = itertools.product([5, 14, 19, 26, 31, 38, 45], [0, 8, 12, 17, 22], [0, 10, 80, 160])
+
+        for temp_max, temp_min, total_rain in grid:
+            impacts = service._evaluate_crops(temp_max, temp_min, total_rain, 7)
+            for crop, sensitivity in service.crop_weather_sensitivity.items():
+                expected = reference_impact(crop, sensitivity, temp_max, temp_min, total_rain, 7)
+                assert impacts[crop] == expected
+
+    def test_multi_crop_request_uses_one_forecast(self):
+        service = WeatherImpactService()
+        forecast = ForecastFrame(
+            city="Delhi",
+            source="open-meteo",
+            steps_per_day=2,
+            time=np.datetime64("2024-06-01") + np.arange(14) * np.timedelta64(12, "h"),
+            temperature=np.array([16, 24] * 7, dtype=np.float32),
+            precipitation=np.full(14, 0.5, dtype=np.float32),
+            rain_probability=np.zeros(14, dtype=np.float32),
+            humidity=np.full(14, 60, dtype=np.float32),
+            wind_speed=np.full(14, 3, dtype=np.float32),
+        )
+
+        with patch.object(service, "get_weather_forecast", return_value=forecast) as mock_fetch:
+            result = asyncio.run(service.analyze_crops_impact("Delhi", ["Wheat", "rice", "banana"]))
+
+        mock_fetch.assert_called_once()
+        assert [i["crop"] for i in result["impacts"]] == ["wheat", "rice"]
+        assert result["unsupported_crops"] == ["banana"]
+        assert result["weather_summary"]["total_precipitation_mm"] == 7.0
+
+    def test_unknown_crop_reports_unknown_impact(self):
+        service = WeatherImpactService()
+
+        with patch.object(service, "get_weather_forecast", return_value=service._get_default_weather()):
+            result = asyncio.run(service.analyze_weather_impact("banana", "Delhi"))
+
+        assert result["impact"] == "UNKNOWN"
@@ -0,0 +1,112 @@
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.user import User
+from app.models.price_alert import PriceAlert
+from app.services.analysis_cache import AnalysisResultCache
+from app.services.weather_prefetch_service import WeatherPrefetchService
+from app.services.weather_service import WeatherService
+from app.services.weather_impact_service import WeatherImpactService
+
+
+@pytest.mark.unit
+class TestForecastPrefetch:
+
+    @patch('app.services.weather_service.WeatherService.get_forecast_frame')
+    def test_prefetch_deduplicates_cities(self, mock_forecast):
+        mock_forecast.side_effect = lambda city, country, days: MagicMock(city=city)
+
+        forecasts = WeatherService.prefetch_forecasts(["Delhi", "Pune", "Delhi", "", None, " Pune "])
+
+        assert set(forecasts) == {"Delhi", "Pune"}
+        assert mock_forecast.call_count == 2
+
+    @patch('app.services.weather_service.WeatherService.get_forecast_frame')
+    def test_prefetch_drops_failed_cities(self, mock_forecast):
+        def fetch(city, country, days):
+            if city == "Pune":
+                raise requests.Timeout("timeout")
+            return MagicMock(city=city)
+        mock_forecast.side_effect = fetch
+
+        forecasts = WeatherService.prefetch_forecasts(["Delhi", "Pune"])
+
+        assert list(forecasts) == ["Delhi"]
+
+
+    @patch('app.services.weather_service.requests.get')
+    def test_city_spellings_share_cache_and_generation(self, mock_get):
+        store = {}
+        cache = MagicMock()
+        cache.get_raw.side_effect = lambda namespace, key: store.get((namespace, key))
+        cache.set_raw.side_effect = lambda namespace, key, value, ttl: store.__setitem__((namespace, key), value)
+        cache.incr.side_effect = lambda namespace, key: store.__setitem__((namespace, key), store.get((namespace, key), 0) + 1)
+        mock_get.return_value.json.return_value = {"city": {"name": "Delhi"}, "list": []}
+
+        with patch('app.services.weather_service.cache_manager', cache):
+            WeatherService.get_forecast_frame(" delhi ")
+            WeatherService.get_forecast_frame("Delhi")
+
+            assert mock_get.call_count == 1
+            assert WeatherService.forecast_generation("DELHI") == 1
+
+        assert AnalysisResultCache.make_key("Onion", "Delhi", 7, None, "w", 1) == \
+            AnalysisResultCache.make_key("onion", " delhi", 7, None, "w", 1)
+
+    @patch('app.services.weather_service.requests.get')
+    def test_generation_counted_locally_without_redis(self, mock_get):
+        cache = MagicMock()
+        cache.is_available.return_value = False
+        cache.get_raw.return_value = None
+        cache.incr.return_value = None
+        mock_get.return_value.json.return_value = {"city": {"name": "Nagpur"}, "list": []}
+
+        with patch('app.services.weather_service.cache_manager', cache):
+            before = WeatherService.forecast_generation("Nagpur")
+            WeatherService.get_forecast_frame("Nagpur")
+            WeatherService.get_forecast_frame(" nagpur")
+
+            assert WeatherService.forecast_generation("NAGPUR") == before + 2
+
+    def test_locations_normalized_like_monitoring_groups(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        db.add_all([
+            User(id=1, email="a@example.com", hashed_password="x", location=" Pune ", notification_enabled=True),
+            User(id=2, email="b@example.com", hashed_password="x", location="pune", notification_enabled=True),
+            User(id=3, email="c@example.com", hashed_password="x", location="  ", notification_enabled=True),
+            PriceAlert(user_id=1, crop="onion", city="Nashik ", alert_type="ABOVE", threshold_price=30.0),
+        ])
+        db.commit()
+
+        assert sorted(WeatherPrefetchService().collect_locations(db)) == ["delhi", "nashik", "pune"]
+        db.close()
+        engine.dispose()
+
+
+@pytest.mark.unit
+class TestOpenMeteoPrefetch:
+
+    @patch('app.services.weather_impact_service.requests.get')
+    def test_known_cities_share_one_request(self, mock_get):
+        response = MagicMock()
+        response.json.return_value = [
+            {"hourly": {"time": [1700000000, 1700003600], "temperature_2m": [30, 31]}},
+            {"hourly": {"time": [1700000000, 1700003600], "temperature_2m": [25, 26]}},
+        ]
+        mock_get.return_value = response
+
+        service = WeatherImpactService()
+        forecasts = service.prefetch_forecasts(["Delhi", "Atlantis", "pune", "delhi"])
+
+        assert mock_get.call_count == 1
+        params = mock_get.call_args.kwargs["params"]
+        assert params["latitude"].count(",") == 1
+        assert forecasts["delhi"].temperature.tolist() == [30, 31]
+        assert forecasts["pune"].temperature.tolist() == [25, 26]
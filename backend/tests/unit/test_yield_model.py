@@ -0,0 +1,267 @@
+import time
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.lru_cache import LRUCache
+from app.services.yield_service import (
+    FEATURE_RANGES, FEATURES, YieldService, generate_training_data, save_artifact, train_artifact
+)
+
+
+@pytest.mark.unit
+class TestYieldModelArtifact:
+
+    def test_artifact_loaded_lazily(self, tmp_path):
+        path = str(tmp_path / "yield_model.joblib")
+        artifact = train_artifact(n_samples=200, n_estimators=5)
+        save_artifact(artifact, path)
+
+        service = YieldService(artifact_path=path)
+        assert service._artifact is None
+
+        result = service.predict_yield("wheat", 2, 600, 22, 7.0, 60, 40, 40)
+
+        assert service.metadata["version"] == artifact["metadata"]["version"]
+        assert service.metadata["n_estimators"] == 5
+        assert result["predicted_total_yield"] > 0
+
+    def test_forest_memory_mapped_and_estimator_deferred(self, tmp_path):
+        path = str(tmp_path / "yield_model.joblib")
+        artifact = train_artifact(n_samples=200, n_estimators=5)
+        save_artifact(artifact, path)
+
+        service = YieldService(artifact_path=path)
+        service.predict_yield("wheat", 2, 600, 22, 7.0, 60, 40, 40)
+        stats = service.memory_stats()
+
+        assert stats["forest_memory_mapped"] and not stats["estimator_loaded"]
+        assert not service.forest.threshold.flags.writeable
+
+        X = np.random.default_rng(0).uniform(1, 100, size=(50, len(FEATURES)))
+        np.testing.assert_array_equal(service.forest.predict(X), artifact["model"].predict(X))
+        service.model
+        assert service.memory_stats()["estimator_loaded"]
+
+        # Retraining keeps the replaced version's files for workers still using them, not older ones
+        versions = {artifact["metadata"]["version"]}
+        for _ in range(2):
+            newer = train_artifact(n_samples=200, n_estimators=5)
+            versions.add(newer["metadata"]["version"])
+            save_artifact(newer, path)
+        # Back-to-back trainings (same second, same data) still get their own files
+        assert len(versions) == 3
+        assert len(list(tmp_path.glob("*.forest"))) == 2
+
+    def test_missing_or_stale_artifact_trains_in_process(self, tmp_path):
+        missing = YieldService(artifact_path=str(tmp_path / "missing.joblib"))
+        assert missing.warmup()["n_estimators"] == 100
+
+        stale_path = str(tmp_path / "stale.joblib")
+        artifact = train_artifact(n_samples=200, n_estimators=5)
+        artifact["metadata"]["sklearn_version"] = "0.0"
+        joblib.dump(artifact, stale_path)
+
+        assert YieldService(artifact_path=stale_path).warmup()["n_estimators"] == 100
+
+    def test_required_artifact_is_never_trained_in_process(self, tmp_path):
+        missing = YieldService(artifact_path=str(tmp_path / "missing.joblib"))
+
+        with patch("app.services.yield_service.train_artifact") as train, pytest.raises(FileNotFoundError):
+            missing.warmup(require_artifact=True)
+        train.assert_not_called()
+
+
+def reference_samples(n, seed):
+    # The original per-sample loop, kept as the distribution reference
+    rng = np.random.RandomState(seed)
+    crops = list(YieldService.CROP_DATA.keys())
+    rows = []
+    for _ in range(n):
+        crop = crops[rng.randint(len(crops))]
+        info = YieldService.CROP_DATA[crop]
+        area, rainfall, temperature, soil_ph, n_, p, k = (rng.uniform(*FEATURE_RANGES[f]) for f in FEATURE_RANGES)
+        per_ha = (info["min_yield"] + info["max_yield"]) / 2 \
+            * (1 - abs(temperature - info["optimal_temp"]) / 20) \
+            * (1 - abs(rainfall - info["optimal_rainfall"]) / 1000) \
+            * (1 - abs(soil_ph - 7.0) / 2) \
+            * ((n_ + p + k) / 240)
+        rows.append((crop, area, rainfall, max(info["min_yield"], min(info["max_yield"], per_ha)) * area))
+    return pd.DataFrame(rows, columns=["crop", "area", "rainfall", "yield"])
+
+
+@pytest.mark.unit
+class TestTrainingData:
+
+    def test_distribution_matches_original_generator(self):
+        n = 20000
+        new = generate_training_data(n, seed=7)
+        old = reference_samples(n, seed=7)
+
+        assert list(new.columns) == ["crop", *FEATURE_RANGES, "yield"]
+        for name, (low, high) in FEATURE_RANGES.items():
+            assert new[name].between(low, high).all()
+            assert abs(new[name].mean() - (low + high) / 2) < 0.02 * (high - low)
+
+        shares = new["crop"].value_counts(normalize=True)
+        assert shares.index.size == len(YieldService.CROP_DATA)
+        assert (shares - 1 / len(YieldService.CROP_DATA)).abs().max() < 0.015
+
+        # Per-crop yield quantiles agree with the original loop within sampling noise
+        for crop in YieldService.CROP_DATA:
+            q_new = new.loc[new["crop"] == crop, "yield"].quantile([0.1, 0.5, 0.9]).to_numpy()
+            q_old = old.loc[old["crop"] == crop, "yield"].quantile([0.1, 0.5, 0.9]).to_numpy()
+            np.testing.assert_allclose(q_new, q_old, rtol=0.08)
+
+    def test_seeded_and_configurable(self):
+        a = generate_training_data(500, seed=3, feature_ranges={"rainfall": (1000, 1100)})
+
+        pd.testing.assert_frame_equal(a, generate_training_data(500, seed=3, feature_ranges={"rainfall": (1000, 1100)}))
+        assert a["rainfall"].between(1000, 1100).all()
+        with pytest.raises(ValueError):
+            generate_training_data(10, feature_ranges={"humidity": (0, 1)})
+
+
+@pytest.fixture(scope="module")
+def small_service(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("yield") / "yield_model.joblib")
+    save_artifact(train_artifact(n_samples=300, n_estimators=10), path)
+    return YieldService(artifact_path=path)
+
+
+BASE = {"area": 2.0, "rainfall": 600, "temperature": 22, "soil_ph": 7.0, "nitrogen": 60, "phosphorus": 40, "potassium": 40}
+
+
+@pytest.mark.unit
+class TestYieldSweep:
+
+    def test_rows_match_single_predictions(self, small_service):
+        result = small_service.sweep(
+            "Wheat", BASE,
+            ranges={"nitrogen": [20, 60, 100], "rainfall": [400, 800]},
+            scenarios=[{"area": 5.0, "soil_ph": 6.0}]
+        )
+
+        assert result["scenarios"] == 7
+        assert result["columns"] == ["area", "rainfall", "soil_ph", "nitrogen",
+                                     "predicted_total_yield", "predicted_yield_per_hectare"]
+        assert result["fixed"] == {"temperature": 22.0, "phosphorus": 40.0, "potassium": 40.0}
+
+        for row in result["rows"]:
+            inputs = {**BASE, **dict(zip(result["columns"][:4], row[:4]))}
+            single = small_service.predict_yield("wheat", **inputs)
+            assert row[4] == single["predicted_total_yield"]
+
+        # Grid first (last range varies fastest), then explicit scenarios
+        assert [row[3] for row in result["rows"][:2]] == [20, 20]
+        assert result["rows"][-1][:4] == [5.0, 600, 6.0, 60]
+        best = max(result["rows"], key=lambda row: row[5])
+        assert result["best"]["predicted_yield_per_hectare"] == best[5]
+
+    def test_rejects_invalid_requests(self, small_service):
+        for kwargs in (
+            {"crop": "quinoa", "ranges": {"nitrogen": [20]}},
+            {"crop": "wheat"},
+            {"crop": "wheat", "ranges": {"humidity": [50]}},
+            {"crop": "wheat", "scenarios": [{"area": 0}]},
+            {"crop": "wheat", "ranges": {"nitrogen": list(range(101)), "rainfall": list(range(101))}},
+            # 4096**6 == 2**72 wraps to 0 in int64; must be rejected before the grid is built
+            {"crop": "wheat", "ranges": {name: [1.0] * 4096 for name in
+                                         ("area", "rainfall", "temperature", "nitrogen", "phosphorus", "potassium")},
+             "scenarios": [{"area": 2.0}]},
+        ):
+            with pytest.raises(ValueError):
+                small_service.sweep(base=BASE, **kwargs)
+
+
+@pytest.mark.unit
+class TestFlatForest:
+
+    def test_matches_sklearn_exactly(self, small_service):
+        df = generate_training_data(2000, seed=11)
+        df["crop_encoded"] = small_service.label_encoders["crop"].transform(df["crop"])
+        X = df[FEATURES].to_numpy()
+        forest = small_service.forest
+
+        np.testing.assert_array_equal(forest.predict(X), small_service.model.predict(X))
+        np.testing.assert_array_equal(forest.predict(X[0]), small_service.model.predict(X[:1]))
+        assert forest.n_trees == 10
+        assert forest.n_nodes == sum(e.tree_.node_count for e in small_service.model.estimators_)
+
+
+@pytest.mark.unit
+class TestFertilizerOptimizer:
+
+    def test_finds_best_grid_mix_within_bounds(self, small_service):
+        bounds = {"nitrogen": (30, 90), "phosphorus": (20, 60), "potassium": (25, 25)}
+        result = small_service.optimize_inputs("wheat", BASE, bounds=bounds, time_budget=5)
+        best = result["recommended"]
+
+        for name, (low, high) in bounds.items():
+            assert low <= best[name] <= high
+        assert result["improvement"] >= 0
+        assert result["search"]["candidates_evaluated"] > 10000
+
+        # No point of a fine exhaustive grid beats the refined result by more than rounding
+        sweep = small_service.sweep("wheat", BASE, ranges={
+            "nitrogen": np.linspace(30, 90, 61), "phosphorus": np.linspace(20, 60, 41), "potassium": [25]
+        })
+        assert max(row[-2] for row in sweep["rows"]) <= best["predicted_total_yield"] + 0.01
+
+    def test_profit_charges_fertilizer(self, small_service):
+        costs = {"nitrogen": 10.0, "phosphorus": 40.0, "potassium": 30.0}
+        result = small_service.optimize_inputs("wheat", BASE, objective="profit", costs=costs, price_per_quintal=2000)
+        best = result["recommended"]
+
+        expected_cost = BASE["area"] * sum(best[n] * c for n, c in costs.items())
+        assert best["fertilizer_cost"] == pytest.approx(expected_cost, abs=0.5)
+        assert best["profit"] == pytest.approx(best["predicted_total_yield"] * 2000 - expected_cost, abs=5)
+        assert best["profit"] >= result["current"]["profit"]
+
+    def test_budget_and_validation(self, small_service):
+        assert small_service.optimize_inputs("wheat", BASE, time_budget=0)["search"]["rounds"] == 1
+
+        with pytest.raises(ValueError):
+            small_service.optimize_inputs("wheat", BASE, objective="profit")
+        with pytest.raises(ValueError):
+            small_service.optimize_inputs("wheat", BASE, costs={"area": 1.0})
+
+
+@pytest.mark.unit
+class TestPredictionCache:
+
+    def test_near_identical_requests_share_an_entry(self, tmp_path):
+        path = str(tmp_path / "yield_model.joblib")
+        save_artifact(train_artifact(n_samples=300, n_estimators=10), path)
+        service = YieldService(artifact_path=path)
+
+        first = service.predict_yield("wheat", 2.0, 600.2, 22.04, 7.01, 60.3, 40, 40)
+        second = service.predict_yield("Wheat", 5.0, 598.0, 21.9, 6.98, 59.8, 40.2, 39.9)
+        stats = service.cache_stats()
+
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+        assert second["predicted_yield_per_hectare"] == first["predicted_yield_per_hectare"]
+        assert second["predicted_total_yield"] == pytest.approx(2.5 * first["predicted_total_yield"], abs=0.03)
+        # Responses echo the caller's own inputs
+        assert second["input_parameters"]["rainfall_mm"] == 598.0
+
+        first["recommendations"].clear()
+        assert service.predict_yield("wheat", 1.0, 600, 22, 7, 60, 40, 40)["recommendations"]
+
+    def test_lru_eviction_and_ttl(self, monkeypatch):
+        cache = LRUCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)  # Evicts "b", the least recently used
+
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+        assert cache.get("a") is None
+        assert len(cache) == 1